@@ -0,0 +1,100 @@
+#! /usr/bin/env python
+# -*- coding: utf-8  -*-
+"""
+Benchmark of the observer hooks: start() of each scheduler on one generated workload (recording off)
+    * none     : no observer ever registered (the main iteration with its hook checks)
+    * removed  : an observer registered and removed before start() (must cost the same as none)
+    * observed : a no-op observer registered (the cost of the per-cycle dispatch detection and of the events)
+Times are the best of --repeat runs, and the variants are interleaved so that drift affects them alike.
+
+"none" and "removed" run the same code; the reference without any hook code is the tree before the hooks.
+--tree times the schedulers of another checkout (the workload is still generated by this one), e.g.
+
+    git worktree add /tmp/before b712ef1    # parent of the commit adding the hooks
+    git worktree add /tmp/hooks 008faf4     # the commit adding the hooks
+    python bench/observers.py --tree /tmp/before
+    python bench/observers.py --tree /tmp/hooks
+
+A tree without observers only runs "none".
+
+    python bench/observers.py [--procs N] [--repeat R] [--seed S] [--tree DIR]
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from scripts import generator
+
+VARIANTS = ['none', 'removed', 'observed']
+
+def loadTree(tree):
+    """
+    Import the scheduler modules of a checkout; return (scheduler module, policies module)
+    """
+    for name in list(sys.modules):
+        if name == 'scripts' or name.startswith('scripts.'):
+            del sys.modules[name]
+    sys.path[0] = os.path.abspath(tree)
+    import scripts.scheduler
+    import scripts.policies
+    return scripts.scheduler, scripts.policies
+
+def makeInput(scheduler, records):
+    """
+    Return a function giving the input of a new scheduler: the shared Workload, or (in trees from before it)
+    a fresh copy of the process list, since those schedulers consume it
+    """
+    if hasattr(scheduler, 'Workload'):
+        workload = scheduler.Workload.fromRecords(records)
+        return lambda: workload
+    proc_list = []
+    for proc_id, cpu_time, io_time, arr_time in records:
+        proc = scheduler.Process(proc_id)
+        proc.cpu_time = cpu_time
+        proc.io_time = io_time
+        proc.arr_time = arr_time
+        proc.propagate()
+        proc_list.append(proc)
+    return lambda: copy.deepcopy(proc_list)
+
+def timeRun(make, scheduler_input, variant, observer_class):
+    scheduler = make(scheduler_input)
+    scheduler.setRecording('none')
+    if variant != 'none':
+        observer = observer_class()
+        scheduler.addObserver(observer)
+        if variant == 'removed':
+            scheduler.removeObserver(observer)
+    started = time.time()
+    scheduler.start()
+    return time.time() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Time start() without observers, with an observer removed again, and with a no-op observer")
+    parser.add_argument('--procs', type=int, default=600, help="processes in the workload (default: 600)")
+    parser.add_argument('--repeat', type=int, default=9, help="runs of each variant, the best is kept (default: 9)")
+    parser.add_argument('--seed', type=int, default=0, help="workload seed (default: 0)")
+    parser.add_argument('--tree', default=ROOT, help="checkout whose schedulers are timed (default: this one)")
+    args = parser.parse_args()
+    records = list(generator.WorkloadGenerator(args.procs, seed=args.seed))
+    scheduler, policies = loadTree(args.tree)
+    schedulers = [('FCFS', scheduler.FCFS), ('RR', scheduler.RR), ('SRJF', scheduler.SRJF),
+                  ('fcfs policy', lambda procs: policies.PolicyScheduler(procs, policies.makePolicy('fcfs')))]
+    variants = VARIANTS if hasattr(scheduler, 'Observer') else VARIANTS[:1]
+    observer_class = getattr(scheduler, 'Observer', None)
+    new_input = makeInput(scheduler, records)
+    print "%-12s %10s %10s %10s" % tuple(["scheduler"] + VARIANTS)
+    for name, make in schedulers:
+        best = dict((variant, None) for variant in variants)
+        for i in xrange(args.repeat):
+            for variant in variants:
+                seconds = timeRun(make, new_input(), variant, observer_class)
+                if best[variant] is None or seconds < best[variant]:
+                    best[variant] = seconds
+        print "%-12s" % name + "".join(" %9.3fs" % best[variant] if variant in best else " %10s" % "-" for variant in VARIANTS)
+
+if __name__ == '__main__':
+    main()
@@ -4,12 +4,27 @@ import sys
 import os
 import re
 import collections
+import itertools
 import platform
-import copy
+import signal
+import threading
+import multiprocessing
+import sqlite3
 from scripts import utilities
 try:
     import argparse
     from scripts.scheduler import *
+    from scripts import formats
+    from scripts import policies
+    from scripts import metrics
+    from scripts import gantt
+    from scripts import generator
+    from scripts import query
+    from scripts import replicate
+    from scripts import compare
+    from scripts import batch
+    from scripts import devices
+    from scripts import autotune
 except:
     utilities.check_version()
     
@@ -18,6 +33,97 @@ def detectSystem():
         print "WARNING: ANSI color may not work on Windows Command Prompt.\n\
 You may see meta-escaping characters instead of color output."
 
+def algorithmCode(value):
+    """
+    Convert the code argument: 0, 1, 2 or 3, or the name of a policy (e.g. mlfq)
+    """
+    if value in ['0', '1', '2', '3']:
+        return int(value)
+    if value in policies.POLICIES:
+        return value
+    raise argparse.ArgumentTypeError("invalid code: %r (choose from 0, 1, 2, 3, %s)" % (value, ", ".join(policies.POLICIES)))
+
+def parseOptions(items):
+    """
+    Convert KEY=VALUE policy options into keyword arguments (integers, floats, or comma-separated tuples of them)
+    """
+    def convert(value):
+        for t in [int, float]:
+            try:
+                return t(value)
+            except ValueError:
+                pass
+        return value
+    
+    options = {}
+    for item in items:
+        if "=" not in item:
+            utilities.output.error("Policy option \"%s\" is not in KEY=VALUE form" % item)
+            sys.exit(1)
+        key, value = item.split("=", 1)
+        if "," in value:
+            options[key] = tuple(convert(v) for v in value.split(","))
+        else:
+            options[key] = convert(value)
+    return options
+
+def recordingMode(value):
+    """
+    Convert the --record argument into Scheduler.setRecording() arguments:
+        full, none, ring=K, every=N[:K] or rate=P[:K] (K: cycles kept at most)
+    """
+    try:
+        if value in ['full', 'none']:
+            return {'mode': value}
+        key, number = value.split("=", 1)
+        if key == 'ring' and int(number) >= 1:
+            return {'mode': 'ring', 'capacity': int(number)}
+        number, _, capacity = number.partition(":")
+        config = {'mode': 'sample'}
+        if capacity:
+            config['capacity'] = int(capacity)
+        if config.get('capacity', 1) >= 1:
+            if key == 'every' and int(number) >= 1:
+                config['every'] = int(number)
+                return config
+            if key == 'rate' and 0 < float(number) <= 1:
+                config['rate'] = float(number)
+                return config
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError("invalid recording mode: %r (full, none, ring=K, every=N[:K] or rate=P[:K])" % value)
+
+def metricsWindow(value):
+    """
+    Convert the --metrics argument: a positive number of cycles per throughput window
+    """
+    try:
+        if int(value) >= 1:
+            return int(value)
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError("invalid window: %r (a positive number of cycles)" % value)
+
+def deviceModel(value):
+    """
+    Convert the --devices argument into Scheduler.setDevices() arguments:
+        K, K:fifo, K:priority or K:priority=KEY (KEY: io, cpu or id)
+    """
+    fields = value.split(":")
+    try:
+        config = {'count': int(fields[0])}
+        if len(fields) == 2:
+            discipline, _, priority = fields[1].partition("=")
+            config['discipline'] = discipline
+            if priority:
+                config['priority'] = priority
+        if len(fields) <= 2 and config['count'] >= 1 and config.get('discipline', 'fifo') in devices.DISCIPLINES \
+                and config.get('priority', 'io') in devices.PRIORITIES and not (config.get('priority') and config['discipline'] == 'fifo'):
+            return config
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError("invalid device model: %r (K, K:fifo, K:priority or K:priority=io|cpu|id)" % value)
+
 def getArgs():
     """Parse command-line arguments with optional functionalities"""
     
@@ -26,28 +132,55 @@ def getArgs():
                                      description="Schedule process with a specific scheduling algorithm (FCFS, RR, or SRJF)\n\n\
   FCFS : First-Come-First-Served (non-preemptive)\n\
   RR   : Round-Robin with quantum 2\n\
-  SRJF : Shortest remaining job first (preemptive)", 
-                                     usage="python %(prog)s [-hnpv] code input_file",
+  SRJF : Shortest remaining job first (preemptive)\n\n\
+Policies selected by name instead of code (options given with -o KEY=VALUE):\n\
+  fcfs, rr (quantum=2), srjf, mlfq (quanta=2,4,8 boost=100),\n\
+  priority (aging=0.1 priority=N), lottery (quantum=2 seed=0 tickets=N)", 
+                                     usage="python %(prog)s [-hnpv] [-f FORMAT] [-o KEY=VALUE] [-r MODE] [--max-cycles N] [--max-seconds S] [--progress [S]] [-m [WINDOW]] [-g {svg,html}] [-z {gz,bz2,xz,none}] [-d K[:DISCIPLINE]] code input_file",
                                      epilog="usage examples: \n\
   %(prog)s 0 input.txt                (save output without printing)\n\
   %(prog)s -p 1 input.txt             (print output)\n\
   %(prog)s -v 2 input.txt             (print verbose info)\n\
-  %(prog)s -pn 3 input.txt            (simply print and do not save output)\n"
+  %(prog)s -pn 3 input.txt            (simply print and do not save output)\n\
+  %(prog)s -f jsonl 3 input.txt       (save intervals and summaries as JSON Lines)\n\
+  %(prog)s -o quanta=2,4 mlfq input.txt (schedule with a named policy)\n\
+  %(prog)s -r ring=5000 0 input.txt   (keep only the last 5000 cycles)\n\
+  %(prog)s -r rate=0.01:5000 0 input.txt (keep a random sample of at most 5000 cycles)\n\
+  %(prog)s --max-seconds 60 --progress 5 0 input.txt (stop after a minute, report every 5 s)\n\
+  %(prog)s -m 100 2 input.txt         (add metric percentiles and throughput per 100 cycles)\n\
+  %(prog)s -g svg 0 input.txt        (also save a Gantt chart as input-0.svg)\n\
+  %(prog)s 0 input.txt.gz             (read gzip input, save input-0.txt.gz)\n\
+  %(prog)s -d 2:priority 1 input.txt  (two I/O devices serving the shortest burst first)\n\
+  %(prog)s expand input-0.ctxt        (expand compact output, see \"%(prog)s expand -h\")\n\
+  %(prog)s generate 1000 w.txt       (reproducible workload, see \"%(prog)s generate -h\")\n\
+  %(prog)s gantt input-0.bin          (Gantt chart of a saved binary timeline, see \"%(prog)s gantt -h\")\n\
+  %(prog)s query input-0.bin --at 120 (states at cycle 120, see \"%(prog)s query -h\")\n\
+  %(prog)s replicate --width 2       (compare algorithms on random workloads, see \"%(prog)s replicate -h\")\n\
+  %(prog)s diff input-0.bin input-1.bin (compare two saved timelines, see \"%(prog)s diff -h\")\n\
+  %(prog)s batch work jobs.db        (resumable batch runs, see \"%(prog)s batch -h\")\n\
+  %(prog)s autotune input.txt         (best policy for a workload, see \"%(prog)s autotune -h\")\n"
                                      )
-    parser.add_argument('code', metavar="code ({0,1,2,3})", type=int, choices=[0, 1, 2, 3], help="code (0, 1, 2, or 3) for scheduling algorithm (0: FCFS; 1: RR; 2: SRJF; 3: all of them)")    
+    parser.add_argument('code', metavar="code ({0,1,2,3} or policy)", type=algorithmCode, help="code (0, 1, 2, or 3) for scheduling algorithm (0: FCFS; 1: RR; 2: SRJF; 3: all of them), or a policy name")    
     parser.add_argument('input_file', help="/path/to/input-file.txt")
     parser.add_argument('-n','--no-save', action="store_true", dest="no_save", help="do not save output to files")
     parser.add_argument('-p','--print', action="store_true", dest="to_print", help="print output file content to standard output")
     parser.add_argument('-v','--verbose', action="store_true", dest="to_verbose", help="print verbose information")
+    parser.add_argument('-f','--format', choices=formats.FORMATS, default='text', dest="fmt", help="output file format (default: text)")
+    parser.add_argument('-r','--record', type=recordingMode, default={'mode': 'full'}, dest="recording", metavar="MODE", help="cycles to keep: full (default), none, ring=K (last K cycles), every=N[:K] or rate=P[:K] (sampled, at most K cycles, default %d); statistics stay exact" % Scheduler.SAMPLE_CAPACITY)
+    parser.add_argument('--max-cycles', type=int, dest="max_cycles", metavar="N", help="stop after simulating N cycles (partial statistics are kept)")
+    parser.add_argument('--max-seconds', type=float, dest="max_seconds", metavar="S", help="stop after S wall-clock seconds (partial statistics are kept)")
+    parser.add_argument('--progress', type=float, nargs='?', const=1.0, dest="progress", metavar="S", help="report progress on standard error every S seconds (default: 1)")
+    parser.add_argument('-m','--metrics', type=metricsWindow, nargs='?', const=0, dest="metrics", metavar="WINDOW", help="add waiting, response, turnaround and slowdown (and I/O queueing with -d) mean/p50/p95/p99 (requires NumPy), and throughput per WINDOW cycles if given")
+    parser.add_argument('-g','--gantt', choices=['svg', 'html'], dest="gantt", help="also save a Gantt chart of the timeline as PREFIX.svg or PREFIX.html (built from the per-cycle record; for very long runs use -f bin and the gantt command)")
+    parser.add_argument('-z','--compress', choices=['gz', 'bz2', 'xz', 'none'], dest="compress", help="compress output files (default: as the input file)")
+    parser.add_argument('-d','--devices', type=deviceModel, dest="devices", metavar="K[:DISCIPLINE]", help="serve I/O with K devices, each with a fifo (default) or priority[=io|cpu|id] queue, instead of infinitely parallel I/O")
+    parser.add_argument('-o','--option', action="append", default=[], dest="options", metavar="KEY=VALUE", help="policy option, e.g. quantum=4 (repeatable)")
     
     # if no argument is given, print help message
     if len(sys.argv)==1:
         parser.print_help()
         sys.exit(1)
-    args = parser.parse_args()
-
-    code, input_file, to_print, verbose, no_save = args.code, args.input_file, args.to_print, args.to_verbose, args.no_save
-    return code, input_file, to_print, verbose, no_save
+    return parser.parse_args()
 
 
 def checkPaths(input_file, verbose=False):
@@ -72,65 +205,81 @@ def checkPaths(input_file, verbose=False):
     return dir_name, base_name
 
 def readInput(input_file, verbose=False):
-    f = None
-    text = ""
+    """
+    Open the input file (plain, or compressed with gzip, bzip2 or xz) as a stream
+    """
     try:
         if verbose:
             utilities.output.debug("Opening input file \"%s\"..." %input_file)
-        f = open(input_file, "r")
-        text = f.read()
-        f.close()
+        return utilities.openFile(input_file, "rb")  # binary workloads are read as is
         
-    except:
+    except IOError:
         utilities.output.error("Cannot open the file \"%s\"" % input_file)
         sys.exit(1)
-    
+
+def inputKind(input_file):
+    """
+    Return the kind of input file from its first bytes: 'binary', 'bursts' or 'text'
+    """
+    f = readInput(input_file)
+    try:
+        head = f.read(64)
+    except IOError as e:
+        utilities.output.error("Cannot read the file \"%s\": %s" % (input_file, e))
+        sys.exit(1)
     finally:
         f.close()
+    return headKind(head)
 
-    return text
+def headKind(head):
+    """
+    Return the kind of input file starting with head: 'binary', 'bursts' or 'text'
+    """
+    if generator.isBinary(head):
+        return 'binary'
+    if head.split(None, 1)[:1] == [BURSTS_MARKER]:
+        return 'bursts'
+    return 'text'
 
-def splitInput(text, verbose=False):
+def splitInput(f, verbose=False):
+    """
+    Generate the tokens of the input file, read in chunks
+    """
     if verbose:
         utilities.output.debug("Reading input file...")
-    s = text.split()
-    return s
+    return utilities.iterTokens(f)
 
 def parseList(raw_list, verbose=False):
-    length = len(raw_list)
+    """
+    Build the process list from the tokens of the input file (id cpu io arrival per process); raise ValueError if it is invalid
+    """
     proc_list = [] # list of processes
     proc_id_set = set() # set of process IDs
     proc = None  # temporary variable for process in the iteration
-    if length % 4:
-        utilities.output.error("There seems to be syntax error in the input file: incomplete process")
-        sys.exit(1)
+    i = -1
         
-    for i in xrange(length):
+    for i, token in enumerate(raw_list):
         current = 0 # current element as integer
         try:
-            current = int(raw_list[i])
-        except: 
-            utilities.output.error("There seems to be syntax error in the input file: non-integer element %s" % raw_list[i])
-            sys.exit(1)
+            current = int(token)
+        except ValueError:
+            raise ValueError("There seems to be syntax error in the input file: non-integer element %s" % token)
         #print current
         
         if current < 0:
-            utilities.output.error("There seems to be syntax error in the input file: negative integer is meaningless %s" % raw_list[i])
-            sys.exit(1)           
+            raise ValueError("There seems to be syntax error in the input file: negative integer is meaningless %s" % token)
 
         if i % 4 == 0:
             if current not in proc_id_set:  # check whether this ID is already in the set
                 proc_id_set.add(current)
             else:
-                utilities.output.error("There seems to be syntax error in the input file: duplicate process ID %d" % current)
-                sys.exit(1)
+                raise ValueError("There seems to be syntax error in the input file: duplicate process ID %d" % current)
             #print proc_id_set
-            proc = Process(current) # initialize a Process object with the current ID
+            proc = PlannedProcess(current) # initialize a PlannedProcess object with the current ID
             
         if i % 4 == 1:
             if current == 0:
-                utilities.output.error("There seems to be syntax error in the input file: CPU time cannot be 0" )
-                sys.exit(1)
+                raise ValueError("There seems to be syntax error in the input file: CPU time cannot be 0" )
             proc.cpu_time = current
             
         if i % 4 == 2:
@@ -138,39 +287,129 @@ def parseList(raw_list, verbose=False):
             
         if i % 4 == 3:
             proc.arr_time = current
-            proc_list.append(proc) # append this Process object into proc_list
+            proc_list.append(proc) # append this PlannedProcess object into proc_list
     
+    if (i + 1) % 4:
+        raise ValueError("There seems to be syntax error in the input file: incomplete process")
+    return proc_list
+
+BURSTS_MARKER = "#bursts"
+
+def parseBursts(f, verbose=False):
+    """
+    Build the process list from the multi-burst input format:
+        #bursts
+        id arrival cpu [io cpu ...]
+        * one process per line, with alternating CPU and I/O bursts (starting and ending with CPU)
+        * raise ValueError (with the message to print) if the file is invalid
+    """
+    if verbose:
+        utilities.output.debug("Reading multi-burst input file...")
+    proc_list = []
+    proc_id_set = set()
+    marker = False  # the marker is the first non-blank line
+    for number, line in enumerate(f, 1):
+        fields = line.split()
+        if not fields:
+            continue
+        if not marker:
+            if fields != [BURSTS_MARKER]:
+                raise ValueError("There seems to be syntax error in the input file: line %d should be \"%s\"" % (number, BURSTS_MARKER))
+            marker = True
+            continue
+        try:
+            values = [int(field) for field in fields]
+        except ValueError:
+            raise ValueError("There seems to be syntax error in the input file: non-integer element on line %d" % number)
+        if len(values) < 3 or len(values) % 2 == 0:
+            raise ValueError("There seems to be syntax error in the input file: line %d needs an ID, an arrival time and an odd number of bursts" % number)
+        if min(values) < 0:
+            raise ValueError("There seems to be syntax error in the input file: negative integer is meaningless on line %d" % number)
+        if min(values[2:]) == 0:
+            raise ValueError("There seems to be syntax error in the input file: burst cannot be 0 on line %d" % number)
+        if values[0] in proc_id_set:
+            raise ValueError("There seems to be syntax error in the input file: duplicate process ID %d" % values[0])
+        proc_id_set.add(values[0])
+        proc = PlannedProcess(values[0])
+        proc.arr_time = values[1]
+        proc.bursts = values[2:]
+        proc_list.append(proc)
+    return proc_list
+
+def parseBinary(f, verbose=False):
+    """
+    Build the process list from a packed binary workload (see scripts/generator.py); raise ValueError if it is invalid
+    """
+    if verbose:
+        utilities.output.debug("Reading binary workload...")
+    proc_list = []
+    proc_id_set = set()
+    try:
+        for proc_id, cpu_time, io_time, arr_time in generator.readBinary(f):
+            if min(proc_id, cpu_time, io_time, arr_time) < 0:
+                raise ValueError("negative integer for process %d" % proc_id)
+            if cpu_time == 0:
+                raise ValueError("CPU time cannot be 0")
+            if proc_id in proc_id_set:
+                raise ValueError("duplicate process ID %d" % proc_id)
+            proc_id_set.add(proc_id)
+            proc = PlannedProcess(proc_id)
+            proc.cpu_time = cpu_time
+            proc.io_time = io_time
+            proc.arr_time = arr_time
+            proc_list.append(proc)
+    except ValueError as e:
+        raise ValueError("There seems to be error in the binary workload: %s" % e)
     return proc_list
 
 class Config(object):
-    def __init__(self, code, input_file, to_print, verbose, dir_name, base_name, no_save):
-        self.code = code
-        self.input_file = input_file
-        self.to_print = to_print
-        self.verbose = verbose
+    def __init__(self, args, dir_name, base_name):
+        self.code = args.code
+        self.input_file = args.input_file
+        self.to_print = args.to_print
+        self.verbose = args.to_verbose
         self.dir_name = dir_name
         self.base_name = base_name
-        self.no_save = no_save
+        self.no_save = args.no_save
+        self.fmt = args.fmt
+        self.options = parseOptions(args.options)
+        self.recording = args.recording
+        self.max_cycles = args.max_cycles
+        self.max_seconds = args.max_seconds
+        self.progress = args.progress
+        self.metrics = args.metrics  # None: no extended metrics; 0: no throughput windows
+        self.gantt = args.gantt
+        self.devices = args.devices  # None: infinitely parallel I/O
+        # output compression suffix: as requested, or the same as the input file
+        if args.compress is None:
+            self.compress = utilities.compression(args.input_file)
+        else:
+            self.compress = "" if args.compress == 'none' else "." + args.compress
+        self.cancel_event = threading.Event()  # set by SIGINT/SIGTERM to stop all runs
         
 def preprocess():
-    code, input_file, to_print, verbose, no_save = getArgs()
-    dir_name, base_name = checkPaths(input_file, verbose)
-    return Config(code, input_file, to_print, verbose, dir_name, base_name, no_save)
+    args = getArgs()
+    dir_name, base_name = checkPaths(args.input_file, args.to_verbose)
+    return Config(args, dir_name, base_name)
 
-def postprocess(dir_name, base_name, code, outputs, verbose=False, no_save=False):
-    s = os.path.splitext(base_name)
+def postprocess(dir_name, base_name, code, outputs, verbose=False, no_save=False, fmt='text', schedulers=None, metric_list=None, gantt_fmt=None, compress=""):
+    s = os.path.splitext(utilities.splitCompression(base_name)[0])  # e.g. input.txt.gz => input, .txt
     file_name = s[0]
     ext_name  = s[1]
-    if code in [0, 1, 2]:
-        output_file = "%s/%s-%d%s" % (dir_name, file_name, code, ext_name)         
-        if not no_save:
-            writeOutput(output_file, outputs[0], verbose)
-
-    if code == 3:
-        for i in range(3):
-            output_file = "%s/%s-%d%s" % (dir_name, file_name, i, ext_name)
-            if not no_save:
-                writeOutput(output_file, outputs[i], verbose)
+    if ext_name == ".bin":  # a binary workload still gives text output
+        ext_name = ".txt"
+    codes = range(3) if code == 3 else [code]
+    for i, c in enumerate(codes):
+        if no_save:
+            continue
+        output_prefix = "%s/%s-%s" % (dir_name, file_name, c)
+        if fmt == 'text' and outputs:
+            writeOutput(output_prefix + ext_name + compress, outputs[i], verbose)
+        else:
+            writeFormatted(output_prefix, fmt, schedulers[i], verbose, metric_list[i] if metric_list else None, ext_name, compress)
+        if gantt_fmt:
+            output_file = "%s.%s%s" % (output_prefix, gantt_fmt, compress)
+            writeGantt(output_file, gantt_fmt, schedulers[i], "%s %s" % (base_name, c), verbose)
 
 
 def writeOutput(output_file, output, verbose=False):
@@ -178,16 +417,78 @@ def writeOutput(output_file, output, verbose=False):
     try:
         if verbose:
             utilities.output.debug("Opening output file \"%s\" to write." % output_file)
-        f = open(output_file, "w")
+        f = utilities.openFile(output_file, "w")
         f.write(output)
         
-    except:
+    except (IOError, OSError):
         utilities.output.error("Cannot write output to file \"%s\"." %output_file)
         sys.exit(1)
         
     finally:
-        f.close()
+        if f:
+            f.close()
+        
+def writeFormatted(output_prefix, fmt, scheduler, verbose=False, metric=None, ext_name=".txt", compress=""):
+    """
+    Stream a format (text, compact, jsonl, csv or bin) to output_prefix + extension (+ compression suffix)
+        * text uses the extension of the input file (ext_name)
+        * csv writes intervals to PREFIX.csv and per-process summaries to PREFIX-summary.csv
+        * extended metrics (if any) follow the summary, or go to PREFIX-metrics.csv for csv
+    """
+    if fmt == 'text':
+        targets = [(output_prefix + ext_name, "w", [formats.writeText])]
+        if metric:
+            targets[0][2].append(lambda scheduler, f: f.write(metrics.formatMetrics(metric)))
+    elif fmt == 'compact':
+        targets = [(output_prefix + ".ctxt", "w", [formats.writeCompact])]
+        if metric:
+            targets[0][2].append(lambda scheduler, f: f.write(metrics.formatMetrics(metric)))
+    elif fmt == 'jsonl':
+        targets = [(output_prefix + ".jsonl", "w", [formats.writeJSONLines])]
+        if metric:
+            targets[0][2].append(lambda scheduler, f: metrics.writeJSONLines(metric, f))
+    elif fmt == 'csv':
+        targets = [(output_prefix + ".csv", "w", [formats.writeIntervalsCSV]),
+                   (output_prefix + "-summary.csv", "w", [formats.writeSummaryCSV])]
+        if metric:
+            targets.append((output_prefix + "-metrics.csv", "w", [lambda scheduler, f: metrics.writeCSV(metric, f)]))
+    else:
+        targets = [(output_prefix + ".bin", "wb", [formats.writeBinary])]
         
+    for output_file, mode, writers in targets:
+        output_file += compress
+        f = None
+        try:
+            if verbose:
+                utilities.output.debug("Opening output file \"%s\" to write." % output_file)
+            f = utilities.openFile(output_file, mode)
+            for writer in writers:
+                writer(scheduler, f)
+            
+        except IOError as e:
+            utilities.output.error("Cannot write output to file \"%s\": %s." % (output_file, e))
+            sys.exit(1)
+            
+        finally:
+            if f:
+                f.close()
+
+def writeGantt(output_file, gantt_fmt, scheduler, title, verbose=False):
+    f = None
+    try:
+        if verbose:
+            utilities.output.debug("Opening output file \"%s\" to write." % output_file)
+        f = utilities.openFile(output_file, "w")
+        gantt.renderScheduler(scheduler, f, gantt_fmt, title)
+        
+    except IOError as e:
+        utilities.output.error("Cannot write output to file \"%s\": %s." % (output_file, e))
+        sys.exit(1)
+        
+    finally:
+        if f:
+            f.close()
+
 def printOutput(code, outputs, verbose):
     messages = ["FCFS:", "RR:", "SRJF:"]
     if verbose:
@@ -195,6 +496,9 @@ def printOutput(code, outputs, verbose):
     if code in [0, 1, 2]:
         print messages[code]
         print outputs[0]
+    if code in policies.POLICIES:
+        print code.upper() + ":"
+        print outputs[0]
     if code == 3:
         for i in range(3):
             print messages[i]
@@ -202,7 +506,462 @@ def printOutput(code, outputs, verbose):
             if i in [0,1]:
                 print "-"*24
     
+def expandMain(argv):
+    """
+    expand command: restore the legacy text output from compact text output
+    """
+    parser = argparse.ArgumentParser(prog="main.py expand", description="Expand compact text output (-f compact) into the legacy one-line-per-cycle output")
+    parser.add_argument('compact_file', help="/path/to/input-CODE.ctxt")
+    parser.add_argument('output_file', nargs='?', help="/path/to/output-file.txt (default: standard output)")
+    args = parser.parse_args(argv)
+    in_f = None
+    out_f = sys.stdout
+    try:
+        in_f = utilities.openFile(args.compact_file, "r")
+        if args.output_file:
+            out_f = utilities.openFile(args.output_file, "w")
+        formats.expandCompact(in_f, out_f)
+        
+    except IOError as e:
+        utilities.output.error("Cannot expand \"%s\": %s" % (args.compact_file, e))
+        sys.exit(1)
+        
+    finally:
+        if in_f:
+            in_f.close()
+        if out_f is not sys.stdout:
+            out_f.close()
+
+def ganttMain(argv):
+    """
+    gantt command: render a saved binary timeline (-f bin) as an SVG or HTML Gantt chart
+    """
+    parser = argparse.ArgumentParser(prog="main.py gantt", description="Render a binary timeline (-f bin) as a Gantt chart aggregated to the output resolution")
+    parser.add_argument('timeline_file', help="/path/to/input-CODE.bin")
+    parser.add_argument('output_file', nargs='?', help="/path/to/chart.svg or chart.html (default: timeline file name with .svg)")
+    parser.add_argument('--width', type=int, default=1000, help="maximum number of time columns (default: 1000)")
+    parser.add_argument('--rows', type=int, default=200, help="maximum number of process rows (default: 200)")
+    args = parser.parse_args(argv)
+    if args.width < 1 or args.rows < 1:
+        utilities.output.error("--width and --rows must be positive")
+        sys.exit(1)
+    output_file = args.output_file or os.path.splitext(utilities.splitCompression(args.timeline_file)[0])[0] + ".svg"
+    gantt_fmt = 'html' if utilities.splitCompression(output_file)[0].endswith((".html", ".htm")) else 'svg'
+    in_f = None
+    out_f = None
+    try:
+        in_f = utilities.openFile(args.timeline_file, "rb")
+        out_f = utilities.openFile(output_file, "w")
+        gantt.renderBinary(in_f, out_f, gantt_fmt, os.path.basename(args.timeline_file), args.width, args.rows)
+        
+    except (IOError, ValueError) as e:
+        utilities.output.error("Cannot render \"%s\": %s" % (args.timeline_file, e))
+        sys.exit(1)
+        
+    finally:
+        if in_f:
+            in_f.close()
+        if out_f:
+            out_f.close()
+
+def generateMain(argv):
+    """
+    generate command: write a reproducible synthetic workload
+    """
+    parser = argparse.ArgumentParser(prog="main.py generate", description="Generate a reproducible workload in the input format (or packed binary with --binary), streamed in constant memory")
+    parser.add_argument('count', type=int, help="number of processes")
+    parser.add_argument('output_file', nargs='?', help="/path/to/workload.txt (default: standard output)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument('--arrivals', choices=generator.ARRIVALS, default='poisson', help="arrival process (default: poisson)")
+    parser.add_argument('--rate', type=float, default=0.5, help="arrivals per cycle, within bursts for bursty arrivals (default: 0.5)")
+    parser.add_argument('--burst', type=float, default=50, help="mean processes per burst for bursty arrivals (default: 50)")
+    parser.add_argument('--idle', type=float, default=200, help="mean idle cycles between bursts for bursty arrivals (default: 200)")
+    parser.add_argument('--cpu-alpha', type=float, default=1.5, dest="cpu_alpha", help="Pareto shape of CPU times, smaller is heavier-tailed (default: 1.5)")
+    parser.add_argument('--cpu-min', type=int, default=2, dest="cpu_min", help="minimum (Pareto scale) CPU time (default: 2)")
+    parser.add_argument('--cpu-max', type=int, dest="cpu_max", help="cap on CPU times")
+    parser.add_argument('--io-fraction', type=float, default=0.3, dest="io_fraction", help="share of processes doing I/O (default: 0.3)")
+    parser.add_argument('--io-mean', type=float, default=4, dest="io_mean", help="mean I/O time (default: 4)")
+    parser.add_argument('--layout', choices=generator.LAYOUTS, default='sequential', help="process ID layout (default: sequential)")
+    parser.add_argument('--stride', type=int, default=7, help="ID stride for the strided layout (default: 7)")
+    parser.add_argument('--binary', action="store_true", help="write a packed binary workload (also accepted as input_file)")
+    args = parser.parse_args(argv)
+    try:
+        workload = generator.WorkloadGenerator(args.count, args.seed, args.arrivals, args.rate, args.burst, args.idle,
+                                               args.cpu_alpha, args.cpu_min, args.cpu_max, args.io_fraction, args.io_mean,
+                                               args.layout, args.stride)
+    except ValueError as e:
+        utilities.output.error("Invalid workload parameters: %s" % e)
+        sys.exit(1)
+    if args.binary and not args.output_file:
+        utilities.output.error("A binary workload needs an output file")
+        sys.exit(1)
+    out_f = sys.stdout
+    try:
+        if args.output_file:
+            out_f = utilities.openFile(args.output_file, "wb" if args.binary else "w")
+        if args.binary:
+            generator.writeBinary(workload, out_f)
+        else:
+            generator.writeText(workload, out_f)
+        
+    except IOError as e:
+        utilities.output.error("Cannot write workload to \"%s\": %s" % (args.output_file, e))
+        sys.exit(1)
+        
+    except ValueError as e:
+        if out_f is not sys.stdout:
+            out_f.close()
+            os.remove(args.output_file)  # nothing was written to it
+        utilities.output.error("Cannot write binary workload: %s (write it as text instead)" % e)
+        sys.exit(1)
+        
+    finally:
+        if out_f is not sys.stdout:
+            out_f.close()
+
+def queryMain(argv):
+    """
+    query command: answer state queries against saved output
+    """
+    parser = argparse.ArgumentParser(prog="main.py query", description="Query the timeline of saved output (text, compact, jsonl, csv intervals or bin)",
+                                     epilog="examples:\n\
+  main.py query input-0.bin --at 120             (states of all processes at cycle 120)\n\
+  main.py query input-0.bin --at 120 --proc 17   (state of process 17 at cycle 120)\n\
+  main.py query input-0.bin --proc 17            (state history of process 17)\n\
+  main.py query input-0.bin --state blocked --range 100 200 (processes blocked during cycles 100-200)",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output_file', help="/path/to/input-CODE.bin (or .txt, .ctxt, .jsonl, .csv)")
+    parser.add_argument('--at', type=int, metavar="CYCLE", help="states at a cycle")
+    parser.add_argument('--proc', type=int, metavar="ID", help="one process (its state at --at, or its history)")
+    parser.add_argument('--state', choices=query.STATES, help="state for --range")
+    parser.add_argument('--range', type=int, nargs=2, metavar=("FIRST", "LAST"), help="processes in --state at some cycle of FIRST-LAST")
+    parser.add_argument('--whole', action="store_true", help="with --range: only processes in --state during all of FIRST-LAST")
+    args = parser.parse_args(argv)
+    if args.range is None and args.at is None and args.proc is None:
+        parser.error("give --at, --proc, or --state with --range")
+    if (args.range is None) != (args.state is None):
+        parser.error("--state and --range go together")
+    try:
+        index = query.load(args.output_file)
+    except (IOError, ValueError, KeyError) as e:
+        utilities.output.error("Cannot read the timeline of \"%s\": %s" % (args.output_file, e))
+        sys.exit(1)
+        
+    try:
+        if args.range is not None:
+            first, last = args.range
+            for proc_id, start, end in index.overlapping(args.state, first, last):
+                if not args.whole or (start <= first and end >= last):
+                    print "%d: %s %d-%d" % (proc_id, args.state, start, end)
+        elif args.at is not None and args.proc is not None:
+            print "%d %d: %s" % (args.at, args.proc, index.stateAt(args.proc, args.at) or "-")
+        elif args.at is not None:
+            print "%d %s" % (args.at, "".join(["%d: %s " % item for item in index.at(args.at)]))
+        else:
+            for state, start, end in index.history(args.proc):
+                print "%d-%d %s" % (start, end, state)
+    except KeyError as e:
+        utilities.output.error(e.args[0])
+        sys.exit(1)
+
+def replicateMain(argv):
+    """
+    replicate command: compare algorithms over seeded random workloads until the confidence intervals are narrow enough
+    """
+    parser = argparse.ArgumentParser(prog="main.py replicate", description="Run algorithms on seeded random workloads (see \"main.py generate -h\") across a process pool, until the confidence interval of every metric is narrower than a target width",
+                                     epilog="examples:\n\
+  main.py replicate --width 2 -m turnaround           (mean turnaround of fcfs, rr and srjf, 95%% CI narrower than 2 cycles)\n\
+  main.py replicate -a rr:quantum=2 -a rr:quantum=8 --width 0.01 --relative -w count=500 -w rate=0.3",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-a','--algorithm', action="append", dest="algorithms", metavar="SPEC", help="policy, with options as in rr:quantum=4 or mlfq:quanta=2,4,8:boost=50 (repeatable; default: fcfs, rr and srjf)")
+    parser.add_argument('-w','--workload', action="append", default=[], metavar="KEY=VALUE", help="workload generator parameter, e.g. count=500, rate=0.3, arrival=bursty (repeatable; default count: 200)")
+    parser.add_argument('-m','--metrics', default=",".join(replicate.METRICS), help="comma-separated metrics (default: %s)" % ",".join(replicate.METRICS))
+    parser.add_argument('--width', type=float, default=1.0, help="target width of every confidence interval (default: 1.0)")
+    parser.add_argument('--relative', action="store_true", help="the target width is a fraction of the mean")
+    parser.add_argument('--confidence', type=float, default=0.95, help="confidence level (default: 0.95)")
+    parser.add_argument('--min-reps', type=int, default=10, dest="min_reps", help="minimum number of replications (default: 10)")
+    parser.add_argument('--max-reps', type=int, default=1000, dest="max_reps", help="maximum number of replications (default: 1000)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first replication (default: 0)")
+    parser.add_argument('-v','--verbose', action="store_true", dest="to_verbose", help="report each replication")
+    args = parser.parse_args(argv)
+    params = {'count': 200}
+    params.update(parseOptions(args.workload))
+    if 'arrival' not in params and 'arrivals' in params:
+        params['arrival'] = params.pop('arrivals')
+    try:
+        replicator = replicate.Replicator(params, args.algorithms or ['fcfs', 'rr', 'srjf'], args.metrics.split(","),
+                                          args.width, args.relative, args.confidence, args.min_reps, args.max_reps,
+                                          args.workers, args.seed)
+    except (ValueError, TypeError) as e:
+        utilities.output.error("Invalid replication parameters: %s" % e)
+        sys.exit(1)
+    
+    def progress(replicator):
+        utilities.output.debug("Replication %d done" % replicator.replications)
+    
+    replicator.run(progress if args.to_verbose else None)
+    sys.stdout.write(replicator.output())
+
+def diffMain(argv):
+    """
+    diff command: compare the timelines of two saved outputs in one streaming pass
+    """
+    parser = argparse.ArgumentParser(prog="main.py diff", description="Compare two saved timelines (text, compact, jsonl, csv intervals or bin, of full recordings): first divergent cycle, ranges where the running process differs, and per-process finishing time and turnaround deltas")
+    parser.add_argument('output_a', help="/path/to/input-CODE.bin (or .txt, .ctxt, .jsonl, .csv)")
+    parser.add_argument('output_b', help="output to compare with")
+    parser.add_argument('--max-ranges', type=int, default=20, dest="max_ranges", help="running ranges to list (default: 20)")
+    parser.add_argument('--max-procs', type=int, default=20, dest="max_procs", help="processes to list (default: 20)")
+    args = parser.parse_args(argv)
+    
+    def onRange(first, last):
+        if diff.running_ranges <= args.max_ranges:
+            ranges.append((first, last))
+    
+    ranges = []
+    diff = compare.TimelineDiff.fromFiles(args.output_a, args.output_b)
+    try:
+        diff.run(onRange)
+    except (IOError, ValueError) as e:
+        utilities.output.error("Cannot compare \"%s\" and \"%s\": %s" % (args.output_a, args.output_b, e))
+        sys.exit(1)
+    if diff.first_divergence is None:
+        print "Timelines are identical"
+        return
+    print "First divergent cycle: %d (process %d)" % (diff.first_divergence, diff.diverged_proc)
+    print "Finishing time: %d -> %d" % tuple(diff.end_times)
+    print "Running process differs: %d cycle(s) in %d range(s)" % (diff.running_cycles, diff.running_ranges)
+    for first, last in ranges:
+        print "  %d-%d" % (first, last)
+    if diff.running_ranges > len(ranges):
+        print "  ..."
+    procs = list(itertools.islice(diff.processes(), args.max_procs + 1))
+    for proc_id, fin_a, fin_b, turnaround_a, turnaround_b in procs[:args.max_procs]:
+        print "Process %d: finish %d -> %d (%+d), turnaround %d -> %d (%+d)" % \
+            (proc_id, fin_a, fin_b, fin_b - fin_a, turnaround_a, turnaround_b, turnaround_b - turnaround_a)
+    if len(procs) > args.max_procs:
+        print "..."
+    means = [diff.meanTurnaround(side) for side in [0, 1]]
+    if None not in means:
+        print "Mean turnaround: %.2f -> %.2f" % tuple(means)
+
+def loadWorkload(input_file):
+    """
+    Parse an input file into a Workload, for batch workers: raise IOError if it cannot be read, and ValueError
+    (with the message main.py prints) if it is invalid, instead of printing and exiting
+    """
+    f = utilities.openFile(input_file, "rb")
+    try:
+        kind = headKind(f.read(64))
+    finally:
+        f.close()
+    f = utilities.openFile(input_file, "rb")
+    try:
+        if kind == 'binary':
+            proc_list = parseBinary(f)
+        elif kind == 'bursts':
+            proc_list = parseBursts(f)
+        else:
+            proc_list = parseList(splitInput(f))
+    except ValueError as e:
+        raise ValueError("%s (\"%s\")" % (e, input_file))
+    finally:
+        f.close()
+    return Workload(proc_list)
+
+def batchMain(argv):
+    """
+    batch command: record jobs in a SQLite database and run them with any number of workers
+    """
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Resumable batch runs: jobs (input file, algorithm, options) are kept in a SQLite database; workers on any number of hosts sharing it claim them atomically and store statistics and output paths",
+                                     epilog="examples:\n\
+  main.py batch add sweep.db 3 inputs/*.txt           (FCFS, RR and SRJF for every input)\n\
+  main.py batch add sweep.db mlfq inputs/*.txt -o quanta=2,4\n\
+  main.py batch work sweep.db --workers 8             (run until no job is left; run again to resume)\n\
+  main.py batch status sweep.db --jobs",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command")
+    add = commands.add_parser('add', help="add jobs (existing jobs are skipped)")
+    add.add_argument('database', help="/path/to/jobs.db (created if missing)")
+    add.add_argument('code', type=algorithmCode, help="code (0, 1, 2, or 3 for all of them) or a policy name")
+    add.add_argument('input_files', nargs="+", help="input files")
+    add.add_argument('-o','--option', action="append", default=[], dest="options", metavar="KEY=VALUE", help="policy option (repeatable)")
+    work = commands.add_parser('work', help="claim and run jobs until none is left")
+    work.add_argument('database', help="/path/to/jobs.db")
+    work.add_argument('--workers', type=int, default=1, help="worker processes on this host (default: 1)")
+    work.add_argument('-f','--format', choices=sorted(batch.WRITERS), default='text', dest="fmt", help="output file format (default: text)")
+    work.add_argument('-n','--no-save', action="store_true", dest="no_save", help="store statistics only")
+    work.add_argument('--output-dir', dest="output_dir", help="directory of the outputs (default: next to each input)")
+    work.add_argument('--lease', type=float, default=300.0, help="seconds before the job of an unresponsive worker is claimed again (default: 300)")
+    work.add_argument('--max-attempts', type=int, default=3, dest="max_attempts", help="attempts before a job is marked failed (default: 3)")
+    work.add_argument('-v','--verbose', action="store_true", dest="to_verbose", help="report each job")
+    status = commands.add_parser('status', help="show job counts")
+    status.add_argument('database', help="/path/to/jobs.db")
+    status.add_argument('--jobs', action="store_true", help="list every job")
+    status.add_argument('--status', choices=batch.STATUSES, help="list the jobs with this status")
+    retry = commands.add_parser('retry', help="make failed jobs pending again")
+    retry.add_argument('database', help="/path/to/jobs.db")
+    args = parser.parse_args(argv)
+    
+    try:
+        if args.command == 'work':
+            if args.output_dir and not os.path.isdir(args.output_dir):
+                utilities.output.error("Output directory \"%s\" does not exist." % args.output_dir)
+                sys.exit(1)
+            settings = (args.database, loadWorkload, None if args.no_save else args.fmt, args.output_dir,
+                        args.lease, args.max_attempts)
+            if args.workers > 1:
+                pool = multiprocessing.Pool(args.workers)
+                try:
+                    results = pool.map(batch.runWorker, [settings] * args.workers)
+                finally:
+                    pool.terminate()
+                done = sum([result[0] for result in results])
+                failed = sum([result[1] for result in results])
+                lost = sum([result[2] for result in results])
+            else:
+                def report(job, error):
+                    if error:
+                        utilities.output.warning("Job %d (%s %s) not done: %s" % (job[0], job[2], job[1], error))
+                    else:
+                        utilities.output.debug("Job %d (%s %s) done" % (job[0], job[2], job[1]))
+                worker = batch.Worker(*settings).run(report=report if args.to_verbose else None)
+                done, failed, lost = worker.done, worker.failed, worker.lost
+            print "Jobs done: %d, failed: %d, lost to other workers: %d" % (done, failed, lost)
+            return
+        
+        store = batch.JobStore(args.database)
+        try:
+            if args.command == 'add':
+                codes = ['0', '1', '2'] if args.code == 3 else [str(args.code)]
+                options = parseOptions(args.options)
+                if options and args.code in [0, 1, 2, 3]:
+                    utilities.output.error("Options (-o) are only for policies selected by name.")
+                    sys.exit(1)
+                added = 0
+                for input_file in args.input_files:
+                    if not os.path.isfile(input_file):
+                        utilities.output.warning("Input file \"%s\" does not exist, skipped." % input_file)
+                        continue
+                    for code in codes:
+                        added += store.add(input_file, code, options)
+                print "Jobs added: %d" % added
+            elif args.command == 'retry':
+                print "Jobs pending again: %d" % store.retry()
+            else:
+                counts = store.counts()
+                print "Jobs: " + ", ".join(["%s %d" % (status, counts[status]) for status in batch.STATUSES])
+                if args.jobs or args.status:
+                    for job in store.jobs(args.status):
+                        job_id, input_file, algorithm, params, status, attempts, end_time, utilization, mean_turnaround, output_file, error = job
+                        line = "%d %s %s %s: %s" % (job_id, input_file, algorithm, params, status)
+                        if status == 'done':
+                            line += " (finishing time %d, CPU utilization %.2f, mean turnaround %.2f%s)" % \
+                                (end_time, utilization, mean_turnaround or 0, ", output " + output_file if output_file else "")
+                        elif error:
+                            line += " (attempt %d: %s)" % (attempts, error)
+                        print line
+        finally:
+            store.close()
+    except sqlite3.Error as e:
+        utilities.output.error("Job database \"%s\": %s" % (args.database, e))
+        sys.exit(1)
+
+def autotuneMain(argv):
+    """
+    autotune command: pick the best policy and options for a workload by successive halving on prefixes
+    """
+    parser = argparse.ArgumentParser(prog="main.py autotune", description="Find the best candidate policy for a workload: candidates run on growing prefixes of the workload (by arrival time), the worst are dropped at each stage, and only the finalists are simulated in full, in a process pool",
+                                     epilog="examples:\n\
+  main.py autotune input.txt                          (fcfs, rr with quanta 1 to 16, srjf and mlfq on mean turnaround)\n\
+  main.py autotune input.txt -a rr:quantum=2|4|8 -a mlfq:quanta=2,4,8|4,8,16:boost=50|100 --finalists 3\n\
+  main.py autotune input.txt --objective utilization -d 2",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input_file', help="/path/to/input-file.txt")
+    parser.add_argument('-a','--algorithm', action="append", dest="algorithms", metavar="SPEC", help="candidate policy with options as in rr:quantum=4, alternatives separated by | as in rr:quantum=2|4|8 (repeatable; default: %s)" % ", ".join(autotune.DEFAULTS).replace("%", "%%"))
+    parser.add_argument('--objective', choices=replicate.METRICS, default='turnaround', help="metric to optimize; utilization is maximized, the others minimized (default: turnaround)")
+    parser.add_argument('--eta', type=int, default=3, help="keep the best 1/ETA candidates at each stage, on a prefix ETA times longer (default: 3)")
+    parser.add_argument('--min-procs', type=int, default=100, dest="min_procs", help="processes in the shortest prefix (default: 100)")
+    parser.add_argument('--finalists', type=int, default=1, help="candidates simulated on the whole workload (default: 1)")
+    parser.add_argument('-d','--devices', type=deviceModel, dest="devices", metavar="K[:DISCIPLINE]", help="serve I/O with K devices in every run (see \"main.py -h\")")
+    parser.add_argument('--workers', type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument('-v','--verbose', action="store_true", dest="to_verbose", help="report each stage")
+    args = parser.parse_args(argv)
+    if not os.path.isfile(args.input_file):
+        utilities.output.error("Input file \"%s\" does not exist." % args.input_file)
+        sys.exit(1)
+    try:
+        workload = loadWorkload(args.input_file)
+    except IOError as e:
+        utilities.output.error("Cannot read the file \"%s\": %s" % (args.input_file, e))
+        sys.exit(1)
+    except ValueError as e:
+        utilities.output.error(str(e))
+        sys.exit(1)
+    try:
+        tuner = autotune.Tuner(workload, args.algorithms, args.objective, args.eta, args.min_procs, args.finalists,
+                               args.devices, args.workers)
+    except (ValueError, TypeError) as e:
+        utilities.output.error("Invalid autotuning parameters: %s" % e)
+        sys.exit(1)
+    
+    def progress(tuner):
+        processes, cutoff, ranked = tuner.stages[-1]
+        utilities.output.debug("Stage %d done: %d candidates on %d processes" % (len(tuner.stages), len(ranked), processes))
+    
+    tuner.run(progress if args.to_verbose else None)
+    sys.stdout.write(tuner.output())
+
+COMMANDS = {
+    'expand': expandMain,
+    'gantt': ganttMain,
+    'generate': generateMain,
+    'query': queryMain,
+    'replicate': replicateMain,
+    'diff': diffMain,
+    'batch': batchMain,
+    'autotune': autotuneMain,
+}
+
+def configure(scheduler, config):
+    """
+    Apply recording mode, budgets and progress reporting from config to a scheduler
+    """
+    scheduler.setRecording(**config.recording)
+    scheduler.setBudget(config.max_cycles, config.max_seconds, config.cancel_event)
+    if config.devices:
+        scheduler.setDevices(**config.devices)
+    if config.progress:
+        scheduler.setProgress(interval=config.progress)
+
+def simulate(scheduler, config):
+    """
+    Run a configured scheduler; SIGINT/SIGTERM cooperatively stop the simulation (partial results are
+    still written) while it runs, and the previous handlers are restored afterwards
+    """
+    def cancel(signum, frame):
+        config.cancel_event.set()
+    previous = [(signum, signal.signal(signum, cancel)) for signum in [signal.SIGINT, signal.SIGTERM]]
+    try:
+        scheduler.start()
+    finally:
+        for signum, handler in previous:
+            signal.signal(signum, handler)
+
+def reportStopped(name, scheduler):
+    """
+    Warn about a simulation stopped by a budget or cancellation
+    """
+    if scheduler.stopped():
+        scheduler.getStat()
+        utilities.output.warning("%s: %s" % (name, scheduler._stoppedLine()))
+
 def main():
+    # commands other than scheduling, e.g. "main.py expand ..."
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+    
     detectSystem()
     # get config
     config = preprocess()
@@ -213,51 +972,102 @@ def main():
     dir_name = config.dir_name
     base_name = config.base_name
     no_save = config.no_save
+    fmt = config.fmt
+    if config.options and code in [0, 1, 2, 3]:
+        utilities.output.error("Options (-o) are only for policies selected by name.")
+        sys.exit(1)
+    if config.metrics is not None and metrics.numpy is None:
+        utilities.output.error("Extended metrics (-m) require NumPy, which cannot be imported.")
+        sys.exit(1)
+        
     # process input file
-    text = readInput(input_file, verbose)
-    s = splitInput(text, verbose)
-    proc_list0 = parseList(s, verbose)
-    for p in proc_list0:
-        p.propagate()
+    kind = inputKind(input_file)
+    f = readInput(input_file, verbose)
+    try:
+        if kind == 'binary':
+            proc_list0 = parseBinary(f, verbose)
+        elif kind == 'bursts':
+            proc_list0 = parseBursts(f, verbose)
+        else:
+            s = splitInput(f, verbose)
+            proc_list0 = parseList(s, verbose)
+    except IOError as e:
+        utilities.output.error("Cannot read the file \"%s\": %s" % (input_file, e))
+        sys.exit(1)
+    except ValueError as e:
+        utilities.output.error(str(e))
+        sys.exit(1)
+    finally:
+        f.close()
+    # planned parameters are held once; each scheduler gets its own runtime state over them
+    workload = Workload(proc_list0)
+    del proc_list0
     
-    proc_list1 = copy.deepcopy(proc_list0)
-    proc_list2 = copy.deepcopy(proc_list0)
     fcfs  = None
     rr    = None
     srjf  = None
-    outputs = []
+    schedulers = []
     
     # FCFS
     if code == 0 or code == 3:
         if verbose:
             utilities.output.debug("Scheduling with FCFS (non-preemptive) algorithm")
-        fcfs = FCFS(proc_list0)
-        fcfs.start()
-        output = fcfs.output()
-        outputs.append(output)
+        fcfs = FCFS(workload)
+        configure(fcfs, config)
+        simulate(fcfs, config)
+        reportStopped("FCFS", fcfs)
+        schedulers.append(fcfs)
         
     # RR (or all)
     if code == 1 or code == 3:
         if verbose:
             utilities.output.debug("Scheduling with RR (Round-Robin with quantum 2) algorithm")
-        rr = RR(proc_list1)
-        rr.start()
-        output = rr.output()
-        outputs.append(output)
+        rr = RR(workload)
+        configure(rr, config)
+        simulate(rr, config)
+        reportStopped("RR", rr)
+        schedulers.append(rr)
         
     # SRJF (or all)
     if code == 2 or code == 3:
         if verbose:
             utilities.output.debug("Scheduling with SRJF (preemptive) algorithm")
-        srjf = SRJF(proc_list2)
-        srjf.start()
-        output = srjf.output()
-        outputs.append(output)
+        srjf = SRJF(workload)
+        configure(srjf, config)
+        simulate(srjf, config)
+        reportStopped("SRJF", srjf)
+        schedulers.append(srjf)
+        
+    # policy selected by name
+    if code in policies.POLICIES:
+        if verbose:
+            utilities.output.debug("Scheduling with %s policy %s" % (code, config.options))
+        try:
+            policy = policies.makePolicy(code, **config.options)
+        except (TypeError, ValueError) as e:
+            utilities.output.error("Invalid options for policy %s: %s" % (code, e))
+            sys.exit(1)
+        scheduler = policies.PolicyScheduler(workload, policy)
+        configure(scheduler, config)
+        simulate(scheduler, config)
+        reportStopped(code, scheduler)
+        schedulers.append(scheduler)
+
+    # the text form is only built when it is printed; saved outputs are streamed
+    metric_list = None
+    if config.metrics is not None:
+        metric_list = [metrics.schedulerMetrics(scheduler, config.metrics or None) for scheduler in schedulers]
+    
+    outputs = []
+    if to_print:
+        outputs = [scheduler.output() for scheduler in schedulers]
+        if metric_list:
+            outputs = [output + metrics.formatMetrics(metric) for output, metric in zip(outputs, metric_list)]
 
     if to_print:
         printOutput(code, outputs, verbose)
         
-    postprocess(dir_name, base_name, code, outputs, verbose, no_save)
+    postprocess(dir_name, base_name, code, outputs, verbose, no_save, fmt, schedulers, metric_list, config.gantt, config.compress)
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
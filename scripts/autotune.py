@@ -0,0 +1,215 @@
+# -*- coding: utf-8  -*-
+"""
+Policy autotuning by successive halving on workload prefixes
+
+Every candidate (a policy with options, see replicate.parseAlgorithm()) is first simulated on a short
+prefix of the workload: the processes arriving before some cycle. The best 1/eta of the candidates on
+the objective go on to a prefix eta times longer, and so on until only the finalists are left, and
+only they are simulated on the whole workload. Each stage costs about as much as one full run, so
+tuning many candidates costs a few full runs instead of one per candidate. The candidates of a stage
+run in a process pool; ties go to the candidate given first, so the result does not depend on the
+number of workers.
+"""
+import bisect
+import itertools
+import math
+import multiprocessing
+import policies
+import replicate
+import utilities
+
+DEFAULTS = ['fcfs', 'rr:quantum=1|2|3|4|6|8|12|16', 'srjf', 'mlfq']
+MAXIMIZED = ['utilization']  # the other metrics of replicate.METRICS are minimized
+
+def expandGrid(spec):
+    """
+    Expand the option alternatives of an algorithm spec, e.g. "rr:quantum=1|2|4" gives "rr:quantum=1",
+    "rr:quantum=2" and "rr:quantum=4" (the alternatives of several options are combined)
+    """
+    fields = spec.split(":")
+    choices = [[fields[0]]]
+    for item in fields[1:]:
+        key, sep, values = item.partition("=")
+        choices.append([key + sep + value for value in values.split("|")])
+    return [":".join(combination) for combination in itertools.product(*choices)]
+
+def formatMetric(metric, value):
+    """
+    Return "LABEL VALUE" for a metric (the finishing time is a cycle)
+    """
+    if metric == 'makespan':
+        return "%s %d" % (replicate.LABELS[metric], value)
+    return "%s %.4f" % (replicate.LABELS[metric], value)
+
+_workload = None     # workload of this process (set by initWorker())
+_prefix = (None, None)  # (cutoff, workload) of the last prefix simulated in this process
+
+def initWorker(workload):
+    """
+    Keep the workload in this process (pool initializer: the workload is not sent with every task)
+    """
+    global _workload, _prefix
+    _workload = workload
+    _prefix = (None, None)
+
+def runCandidate(task):
+    """
+    Simulate one candidate on the processes arriving before cutoff (None: the whole workload)
+        * task: (candidate index, (spec, name, options), cutoff, device arguments or None); a module-level
+          function for the pool
+        * return (candidate index, metrics as in replicate.runMetrics())
+    """
+    global _prefix
+    index, (spec, name, options), cutoff, devices = task
+    if cutoff is None:
+        workload = _workload
+    else:
+        if _prefix[0] != cutoff:
+            _prefix = (cutoff, _workload.prefix(cutoff))
+        workload = _prefix[1]
+    scheduler = policies.PolicyScheduler(workload, policies.makePolicy(name, **options))
+    scheduler.setRecording('none')
+    if devices:
+        scheduler.setDevices(**devices)
+    scheduler.start()
+    return index, replicate.runMetrics(scheduler)
+
+class Tuner(object):
+    """
+    Tuner: find the best candidate for a workload by successive halving
+        * algorithms: algorithm specs, with option alternatives (see expandGrid())
+        * objective : a metric of replicate.METRICS (utilization is maximized, the others minimized)
+        * eta       : the best 1/eta of the candidates are kept at each stage, whose prefix is eta times longer
+        * min_procs : processes in the shortest prefix (at least)
+        * finalists : candidates simulated on the whole workload
+        * devices   : Scheduler.setDevices() arguments for every run, or None
+        * workers   : pool size (default: number of CPUs; 1 runs in this process)
+        After run():
+            * stages  : per stage, (number of processes, cutoff cycle, [(candidate index, metrics)] best first)
+            * ranking : [(candidate index, metrics)] of the finalists on the whole workload, best first
+    """
+    def __init__(self, workload, algorithms=None, objective='turnaround', eta=3, min_procs=100, finalists=1,
+                 devices=None, workers=None):
+        if objective not in replicate.METRICS:
+            raise ValueError("unknown objective %r (choose from %s)" % (objective, ", ".join(replicate.METRICS)))
+        if eta < 2:
+            raise ValueError("eta must be at least 2")
+        if min_procs < 1 or finalists < 1:
+            raise ValueError("min_procs and finalists must be positive")
+        specs = []
+        for spec in algorithms or DEFAULTS:
+            for expanded in expandGrid(spec):
+                if expanded not in specs:
+                    specs.append(expanded)
+        self.candidates = [replicate.parseAlgorithm(spec) for spec in specs]
+        self.workload = workload
+        self.objective = objective
+        self.eta = eta
+        self.min_procs = min_procs
+        self.finalists = finalists
+        self.devices = devices
+        self.workers = workers or multiprocessing.cpu_count()
+        self.stages = []
+        self.ranking = []
+        self.simulated = 0  # processes simulated over all runs
+
+    def plan(self):
+        """
+        Return the number of processes of each halving stage, shortest prefix first
+            * as many stages as halvings needed to come down to the finalists, the last one eta times
+              shorter than the whole workload, and none shorter than min_procs
+            * a stage that would cover the whole workload is left out (its candidates all run in full)
+        """
+        halvings = 0
+        alive = len(self.candidates)
+        while alive > self.finalists:
+            alive = max(self.finalists, int(math.ceil(alive / float(self.eta))))
+            halvings += 1
+        total = len(self.workload)
+        counts = []
+        for stage in xrange(halvings):
+            count = max(self.min_procs, int(total / float(self.eta) ** (halvings - stage)))
+            if count >= total:
+                break
+            counts.append(count)
+        return counts
+
+    def _score(self, ranked_item):
+        index, metrics = ranked_item
+        value = metrics[self.objective]
+        return (-value if self.objective in MAXIMIZED else value, index)
+
+    def _evaluate(self, pool, alive, cutoff, processes):
+        """
+        Simulate the candidates alive on a prefix (or the whole workload); return [(index, metrics)] best first
+        """
+        tasks = [(index, self.candidates[index], cutoff, self.devices) for index in alive]
+        if pool is not None:
+            results = list(pool.imap_unordered(runCandidate, tasks))
+        else:
+            results = [runCandidate(task) for task in tasks]
+        self.simulated += processes * len(tasks)
+        return sorted(results, key=self._score)
+
+    def run(self, progress=None):
+        """
+        Run the halving stages and the full runs of the finalists; progress (if given) is called with the Tuner
+        after each stage
+        """
+        arr_times = sorted(self.workload.arr_times)
+        alive = range(len(self.candidates))
+        pool = None
+        if self.workers > 1 and len(alive) > 1:
+            pool = multiprocessing.Pool(self.workers, initWorker, (self.workload,))
+        else:
+            initWorker(self.workload)
+        try:
+            for count in self.plan():
+                cutoff = arr_times[count - 1] + 1  # every process arriving at the same cycle as the last one is in
+                processes = bisect.bisect_left(arr_times, cutoff)
+                if processes == len(arr_times):
+                    break
+                ranked = self._evaluate(pool, alive, cutoff, processes)
+                self.stages.append((processes, cutoff, ranked))
+                keep = max(self.finalists, int(math.ceil(len(alive) / float(self.eta))))
+                alive = [index for index, metrics in ranked[:keep]]
+                if progress:
+                    progress(self)
+            self.ranking = self._evaluate(pool, alive, None, len(arr_times))
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        return self
+
+    def best(self):
+        """
+        Return the spec of the best candidate (None before run())
+        """
+        return self.candidates[self.ranking[0][0]][0] if self.ranking else None
+
+    def output(self):
+        """
+        Return the stages and the ranking of the finalists as text
+        """
+        label = replicate.LABELS[self.objective]
+        lines = ["Candidates: %d (objective: %s, %s)" %
+                 (len(self.candidates), label, "maximized" if self.objective in MAXIMIZED else "minimized")]
+        for number, (processes, cutoff, ranked) in enumerate(self.stages):
+            keep = len(self.stages[number + 1][2]) if number + 1 < len(self.stages) else len(self.ranking)
+            kept = ", ".join(["%s (%.4f)" % (self.candidates[index][0], metrics[self.objective])
+                              for index, metrics in ranked[:keep]])
+            lines.append("Stage %d: %d candidates on %d of %d processes (arrivals before cycle %d), kept %s" %
+                         (number + 1, len(ranked), processes, len(self.workload), cutoff, kept))
+        lines.append("Whole workload (%d processes):" % len(self.workload))
+        shown = [self.objective] + [metric for metric in ['utilization', 'makespan'] if metric != self.objective]
+        for index, metrics in self.ranking:
+            lines.append("  %s: %s" % (self.candidates[index][0], ", ".join([formatMetric(metric, metrics[metric]) for metric in shown])))
+        full = len(self.workload) * len(self.candidates)
+        lines.append("Simulated processes: %d (%.0f%% of running every candidate in full)" %
+                     (self.simulated, 100.0 * self.simulated / full if full else 100.0))
+        lines.append("Best: %s" % self.best())
+        return "".join([line + "\n" for line in lines])
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
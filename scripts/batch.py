@@ -0,0 +1,302 @@
+# -*- coding: utf-8  -*-
+"""
+Resumable batch runs backed by a SQLite job table
+
+Jobs (input file, algorithm, parameters) are rows of a local SQLite database. Any number of workers,
+in one process pool or on several hosts sharing the database file, claim jobs one at a time in an
+IMMEDIATE transaction, so no job is claimed twice. A claim is a lease: a worker renews it while the
+simulation runs, and the job of a worker that crashed is claimed again once its lease expires.
+Outputs are written to a temporary file and renamed when complete, and adding a job that already
+exists does nothing, so a sweep can be restarted at any time and only unfinished work is run.
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+import formats
+import policies
+from scheduler import FCFS, RR, SRJF
+import utilities
+
+CODES = {'0': FCFS, '1': RR, '2': SRJF}
+STATUSES = ['pending', 'running', 'done', 'failed']
+EXTENSIONS = {'compact': '.ctxt', 'jsonl': '.jsonl', 'csv': '.csv', 'bin': '.bin'}
+WRITERS = {'text': formats.writeText, 'compact': formats.writeCompact, 'jsonl': formats.writeJSONLines,
+           'csv': formats.writeIntervalsCSV, 'bin': formats.writeBinary}
+# files written next to the output, as in main.py: (suffix replacing the extension, writer)
+COMPANIONS = {'csv': [("-summary.csv", formats.writeSummaryCSV)]}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    input_file TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    end_time INTEGER,
+    utilization REAL,
+    mean_turnaround REAL,
+    output_file TEXT,
+    error TEXT,
+    started REAL,
+    finished REAL,
+    UNIQUE (input_file, algorithm, params)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+class LeaseLost(Exception):
+    """
+    The lease of a running job expired and the job may have been claimed by another worker
+    """
+
+class JobStore(object):
+    """
+    JobStore: the job table of one SQLite database file (created if missing)
+        * add()      : record a job unless the same (input file, algorithm, parameters) exists
+        * claim()    : atomically take the next pending job, or a running one whose lease expired
+        * renew(), complete(), fail(): only act on a job still leased to the calling worker
+    """
+    def __init__(self, path, timeout=60.0):
+        # autocommit mode: transactions are opened explicitly where several statements must be atomic
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def add(self, input_file, algorithm, params=None):
+        """
+        Record a job; return True if it is new
+        """
+        cursor = self._db.execute("INSERT OR IGNORE INTO jobs (input_file, algorithm, params) VALUES (?, ?, ?)",
+                                  (os.path.abspath(input_file), algorithm, json.dumps(params or {}, sort_keys=True)))
+        return cursor.rowcount == 1
+
+    def claim(self, worker, lease=300.0, max_attempts=3):
+        """
+        Take the next job for worker for lease seconds; return (id, input_file, algorithm, params) or None
+        """
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")  # write lock: no other worker claims in between
+        try:
+            # a job whose workers crashed max_attempts times is given up
+            self._db.execute("UPDATE jobs SET status = 'failed', error = 'lease expired', lease_until = NULL "
+                             "WHERE status = 'running' AND lease_until < ? AND attempts >= ?", (now, max_attempts))
+            row = self._db.execute("SELECT id, input_file, algorithm, params FROM jobs "
+                                   "WHERE (status = 'pending' OR (status = 'running' AND lease_until < ?)) AND attempts < ? "
+                                   "ORDER BY id LIMIT 1", (now, max_attempts)).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                                 "started = ?, error = NULL WHERE id = ?", (worker, now + lease, now, row[0]))
+            self._db.execute("COMMIT")
+        except:
+            self._db.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return (row[0], row[1], row[2], json.loads(row[3]))
+
+    def renew(self, job_id, worker, lease=300.0):
+        """
+        Extend the lease of a running job; return False if the job is no longer leased to worker
+        """
+        cursor = self._db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                                  (time.time() + lease, job_id, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, stat, mean_turnaround, output_file):
+        """
+        Store the statistics and output path of a finished job
+        """
+        cursor = self._db.execute("UPDATE jobs SET status = 'done', end_time = ?, utilization = ?, mean_turnaround = ?, "
+                                  "output_file = ?, finished = ?, lease_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                                  (stat[0], float(stat[1]), mean_turnaround, output_file, time.time(), job_id, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error, max_attempts=3, final=False):
+        """
+        Record a failed attempt: the job is pending again, or failed after max_attempts attempts (or at once if final);
+        return True if the job is now failed
+        """
+        cursor = self._db.execute("UPDATE jobs SET status = CASE WHEN ? OR attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                                  "error = ?, lease_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                                  (final, max_attempts, error, job_id, worker))
+        if cursor.rowcount != 1:
+            return False
+        # only retry() makes a failed job pending again
+        return self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] == 'failed'
+
+    def retry(self):
+        """
+        Make failed jobs pending again (with their attempts reset); return how many
+        """
+        return self._db.execute("UPDATE jobs SET status = 'pending', attempts = 0 WHERE status = 'failed'").rowcount
+
+    def counts(self):
+        """
+        Return {status: number of jobs}
+        """
+        counts = dict((status, 0) for status in STATUSES)
+        counts.update(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return counts
+
+    def jobs(self, status=None):
+        """
+        Generate job rows (id, input_file, algorithm, params, status, attempts, end_time, utilization,
+        mean_turnaround, output_file, error), by ID
+        """
+        query = "SELECT id, input_file, algorithm, params, status, attempts, end_time, utilization, " \
+                "mean_turnaround, output_file, error FROM jobs"
+        if status:
+            return self._db.execute(query + " WHERE status = ? ORDER BY id", (status,))
+        return self._db.execute(query + " ORDER BY id")
+
+def workerName():
+    """
+    Return a name for this worker, unique across hosts sharing the database
+    """
+    return "%s:%d" % (socket.gethostname(), os.getpid())
+
+def makeScheduler(workload, algorithm, params):
+    """
+    Create the scheduler of a job: algorithm is a code (0, 1 or 2) or a policy name with params as options
+    """
+    if algorithm in CODES:
+        return CODES[algorithm](workload)
+    if algorithm not in policies.POLICIES:
+        raise ValueError("unknown algorithm %r" % algorithm)
+    return policies.PolicyScheduler(workload, policies.makePolicy(algorithm, **params))
+
+def outputName(input_file, job_id, algorithm, params, fmt, output_dir=None):
+    """
+    Return the output path of a job: DIR/INPUT-ALGORITHM.EXT (like main.py), with the job ID added when
+    the algorithm has parameters
+    """
+    dir_name, base_name = os.path.split(input_file)
+    name, ext = os.path.splitext(utilities.splitCompression(base_name)[0])
+    if fmt != 'text' or ext in ['', '.bin']:
+        ext = EXTENSIONS.get(fmt, '.txt')
+    label = algorithm if not params else "%s-job%d" % (algorithm, job_id)
+    return os.path.join(os.path.abspath(output_dir) if output_dir else dir_name, "%s-%s%s" % (name, label, ext))
+
+class Worker(object):
+    """
+    Worker: claim and run jobs until none is left
+        * load      : function returning a Workload for an input file (raising ValueError or IOError if invalid)
+        * fmt       : output format (text, compact, jsonl, csv or bin), or None to save no output
+        * output_dir: directory of the outputs (default: next to each input file)
+        * lease     : seconds a claim lasts without renewal; it is renewed every lease / 3 seconds while running
+        An invalid input file or parameter (ValueError, TypeError) fails the job at once; an I/O error (IOError,
+        OSError) is retried until max_attempts. done and failed count the jobs this worker took to that status.
+        A job whose lease cannot be renewed is given up (counted as lost): the simulation is cancelled, and
+        no output is written or stored for it, since another worker may be running it
+    """
+    def __init__(self, path, load, fmt='text', output_dir=None, lease=300.0, max_attempts=3, name=None):
+        self._path = path
+        self._load = load
+        self._fmt = fmt
+        self._output_dir = output_dir
+        self._lease = lease
+        self._max_attempts = max_attempts
+        self.name = name or workerName()
+        self.done = 0
+        self.failed = 0
+        self.lost = 0
+
+    def run(self, max_jobs=None, report=None):
+        """
+        Run jobs until none is left (or max_jobs have been claimed); report (if given) is called with (job, error or None) after each job
+        """
+        store = JobStore(self._path)
+        claimed = 0
+        try:
+            while max_jobs is None or claimed < max_jobs:
+                job = store.claim(self.name, self._lease, self._max_attempts)
+                if job is None:
+                    break
+                claimed += 1
+                error = self._runJob(store, job)
+                if report:
+                    report(job, error)
+        finally:
+            store.close()
+        return self
+
+    def _runJob(self, store, job):
+        job_id, input_file, algorithm, params = job
+        try:
+            scheduler = makeScheduler(self._load(input_file), algorithm, params)
+            if self._fmt is None:
+                scheduler.setRecording('none')
+            lost = []
+            def renew(progress):
+                if not store.renew(job_id, self.name, self._lease):
+                    lost.append(progress['cycle'])
+                    scheduler.cancel()
+            scheduler.setProgress(renew, self._lease / 3.0)
+            scheduler.start()
+            if lost:
+                raise LeaseLost("lease lost at cycle %d" % lost[0])
+            output_file = None
+            if self._fmt is not None:
+                output_file = outputName(input_file, job_id, algorithm, params, self._fmt, self._output_dir)
+                self._write(store, job_id, scheduler, output_file)
+            turnarounds = [turnaround for proc_id, arr_time, fin_time, turnaround in scheduler.summary()]
+            mean_turnaround = float(sum(turnarounds)) / len(turnarounds) if turnarounds else None
+            if not store.complete(job_id, self.name, scheduler.getStat(), mean_turnaround, output_file):
+                raise LeaseLost("lease lost before the result was stored")
+            self.done += 1
+            return None
+        except LeaseLost as e:
+            self.lost += 1
+            return str(e)
+        except (ValueError, TypeError, IOError, OSError) as e:
+            final = not isinstance(e, EnvironmentError)  # invalid input or parameters: another attempt fails the same way
+            if store.fail(job_id, self.name, str(e), self._max_attempts, final):
+                self.failed += 1
+            return str(e)
+
+    def _write(self, store, job_id, scheduler, output_file):
+        """
+        Write the output (and its companion files) to temporary files and rename them while the lease is held,
+        so that an output file is always complete and never replaces the output of the worker that took the job over
+        """
+        targets = [(output_file, WRITERS[self._fmt])]
+        for suffix, writer in COMPANIONS.get(self._fmt, []):
+            targets.append((os.path.splitext(output_file)[0] + suffix, writer))
+        if not store.renew(job_id, self.name, self._lease):
+            raise LeaseLost("lease lost before the output was written")
+        tmp_files = []
+        try:
+            for path, writer in targets:
+                tmp_file = "%s.%s.tmp" % (path, self.name.replace(":", "-"))
+                tmp_files.append(tmp_file)
+                f = open(tmp_file, "wb" if self._fmt == 'bin' else "w")
+                try:
+                    writer(scheduler, f)
+                finally:
+                    f.close()
+            if not store.renew(job_id, self.name, self._lease):
+                raise LeaseLost("lease lost while the output was written")
+            for (path, writer), tmp_file in zip(targets, tmp_files):
+                os.rename(tmp_file, path)
+        except:
+            for tmp_file in tmp_files:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+            raise
+
+def runWorker(args):
+    """
+    Run one Worker with (path, load, fmt, output_dir, lease, max_attempts) and return (done, failed, lost); for process pools
+    """
+    worker = Worker(*args).run()
+    return (worker.done, worker.failed, worker.lost)
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
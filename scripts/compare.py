@@ -0,0 +1,226 @@
+# -*- coding: utf-8  -*-
+"""
+Streaming diff of two timelines (state intervals of two runs)
+
+Both interval streams are merged by end cycle, as written by a full recording in every format
+(see query.iterIntervals()), and compared in one pass:
+    * first divergent cycle: the intervals of each process are matched in order; only the first
+      unmatched interval of a process is kept, since later ones cannot diverge earlier
+    * running assignment: the 'running' intervals of each run never overlap and come in cycle order;
+      they are swept together up to the cycle both runs are known to, and the cycles where the running
+      process differs are reported as ranges
+    * finishing time and turnaround per process (arrival: first interval, finish: last 'running' cycle)
+
+A 'running' interval only shows up when it ends, but a 'ready' interval is always followed by 'running':
+when the 'ready' interval of a process ends, that process is known to run from the next cycle on, for as
+long as the run goes on past it (the next interval of the run ends later). So the sweep does not wait for
+running intervals to end, and memory is bounded by the number of processes: at most one pending interval
+and one open running interval per process and run.
+
+Limitation: a process dispatched with no 'ready' interval before it (on arrival or at the end of its I/O,
+with the CPU free) is only seen running when that running interval ends, and nothing else in the stream
+tells it apart from an idle CPU before then. The running intervals the other run ends meanwhile are queued
+until it does, so for such intervals memory grows with their length (the cycles are unknown, not lost: no
+one-pass diff over end-ordered streams can do without them).
+"""
+import collections
+import query
+import utilities
+
+def tagIntervals(intervals, side):
+    """
+    Generate (end, side, proc_id, state, start) from (proc_id, state, start, end), for merging by end cycle
+    """
+    for proc_id, state, start, end in intervals:
+        yield (end, side, proc_id, state, start)
+
+class TimelineDiff(object):
+    """
+    TimelineDiff: compare timeline A with timeline B
+        * a, b: iterables of (proc_id, state, start, end), ordered by end cycle
+        After run():
+            * first_divergence: first cycle at which the state of some process differs (None if identical)
+            * diverged_proc: a process whose state differs at that cycle
+            * running_cycles, running_ranges: number of cycles and of ranges where the running process differs
+            * processes(): per-process (proc_id, fin_a, fin_b, turnaround_a, turnaround_b) for differing processes
+        Memory is bounded by the number of processes (see the module docstring for the one exception)
+    """
+    def __init__(self, a, b):
+        self._streams = [a, b]
+        self.first_divergence = None
+        self.diverged_proc = None
+        self.running_cycles = 0
+        self.running_ranges = 0
+        self.end_times = [-1, -1]
+        self._arrivals = [{}, {}]  # proc_id => first cycle in the timeline
+        self._finishes = [{}, {}]  # proc_id => last 'running' cycle
+        self._pending = [{}, {}]   # proc_id => first unmatched interval (start, state, end)
+        self._diverged = set()     # processes whose divergence point is known
+        self._running = [collections.deque(), collections.deque()]  # running intervals [start, end, proc_id] not swept
+                                   # yet (end None: open, inferred from the end of a 'ready' interval)
+        self._opened = [{}, {}]    # proc_id => its open running interval
+        self._last_open = [0, 0]   # start of the latest open running interval
+        self._known = [-1, -1]     # last cycle up to which the running process of each run is known
+        self._cursor = 0           # first cycle not swept yet
+        self._range = None         # open range [first, last] of differing running cycles
+        self._on_range = None
+
+    @classmethod
+    def fromSchedulers(cls, a, b):
+        return cls(a.intervals(), b.intervals())
+
+    @classmethod
+    def fromFiles(cls, path_a, path_b):
+        return cls(query.iterIntervals(path_a), query.iterIntervals(path_b))
+
+    def run(self, on_range=None):
+        """
+        Compare the two timelines in one pass
+            * on_range (if given) is called with (first, last) for each range of cycles where the running process differs
+        """
+        self._on_range = on_range
+        tagged = [tagIntervals(stream, side) for side, stream in enumerate(self._streams)]
+        heads = [next(stream, None) for stream in tagged]  # next interval of each run (merged as heapq.merge does)
+        while heads[0] or heads[1]:
+            side = 0 if heads[1] is None or (heads[0] is not None and heads[0] < heads[1]) else 1
+            end, side, proc_id, state, start = heads[side]
+            heads[side] = next(tagged[side], None)
+            self._addInterval(side, proc_id, state, start, end)
+            # an open running interval ends no earlier than the next interval of its run, and once that one ends
+            # at or after the start of the latest open interval, every interval before it has been seen
+            for run_side, head in enumerate(heads):
+                if self._opened[run_side] and head is not None and head[0] >= self._last_open[run_side] and \
+                        head[0] - 1 > self._known[run_side]:
+                    self._known[run_side] = head[0] - 1
+                    self._sweep()
+        # 'ready' intervals at the end of a stopped run are not followed by 'running'
+        for side in [0, 1]:
+            self._running[side] = collections.deque(interval for interval in self._running[side] if interval[1] is not None)
+        # a process with intervals left in one run only diverges at the first of them
+        for side in [0, 1]:
+            for proc_id, (start, state, end) in self._pending[side].items():
+                self._diverge(proc_id, start)
+        self._known = [max(self.end_times), max(self.end_times)]
+        self._sweep()
+        if self._range:
+            self._closeRange()
+        return self
+
+    def _addInterval(self, side, proc_id, state, start, end):
+        if end > self.end_times[side]:
+            self.end_times[side] = end
+        arrivals = self._arrivals[side]
+        if proc_id not in arrivals or start < arrivals[proc_id]:
+            arrivals[proc_id] = start
+        if state == 'running':
+            if end > self._finishes[side].get(proc_id, -1):
+                self._finishes[side][proc_id] = end
+            opened = self._opened[side].pop(proc_id, None)
+            if opened is not None and opened[0] == start:
+                opened[1] = end  # (possibly swept already)
+            else:
+                # after any open interval inferred from a 'ready' interval ending at the same cycle
+                queue = self._running[side]
+                later = []
+                while queue and queue[-1][0] > start:
+                    later.append(queue.pop())
+                queue.append([start, end, proc_id])
+                queue.extend(reversed(later))
+            self._known[side] = max(self._known[side], end)
+            self._sweep()
+        elif state == 'ready':
+            self._last_open[side] = end + 1
+            opened = [end + 1, None, proc_id]
+            self._opened[side][proc_id] = opened
+            self._running[side].append(opened)
+        if proc_id in self._diverged:
+            return
+        other = self._pending[1 - side]
+        if proc_id in other:
+            other_start, other_state, other_end = other.pop(proc_id)
+            if other_start != start:
+                self._diverge(proc_id, min(start, other_start))
+            elif other_state != state:
+                self._diverge(proc_id, start)
+            elif other_end != end:
+                self._diverge(proc_id, min(end, other_end) + 1)
+        elif proc_id in self._pending[side]:
+            # the other run has not closed a matching interval by now: diverged at or before the pending one ends,
+            # and this later interval cannot diverge earlier
+            pass
+        else:
+            self._pending[side][proc_id] = (start, state, end)
+
+    def _diverge(self, proc_id, cycle):
+        self._diverged.add(proc_id)
+        self._pending[0].pop(proc_id, None)
+        self._pending[1].pop(proc_id, None)
+        if self.first_divergence is None or cycle < self.first_divergence or \
+                (cycle == self.first_divergence and proc_id < self.diverged_proc):
+            self.first_divergence = cycle
+            self.diverged_proc = proc_id
+
+    def _runningAt(self, side, cycle):
+        """
+        Return (proc_id or None, last cycle of that assignment) for one run at cycle (the queue is swept up to cycle)
+        """
+        queue = self._running[side]
+        while queue and (queue[0][1] < cycle if queue[0][1] is not None else len(queue) > 1 and queue[1][0] <= cycle):
+            queue.popleft()
+        if queue and queue[0][0] <= cycle:
+            start, end, proc_id = queue[0]
+            if end is None:  # open: runs until the next running interval starts (or as far as known)
+                end = queue[1][0] - 1 if len(queue) > 1 else self._known[side]
+            return proc_id, end
+        # idle until the next running interval (or as far as known)
+        return None, (queue[0][0] - 1 if queue else self._known[side])
+
+    def _sweep(self):
+        """
+        Compare the running process of both runs from the cursor up to the cycle both are known to
+        """
+        limit = min(self._known)
+        while self._cursor <= limit:
+            proc_a, last_a = self._runningAt(0, self._cursor)
+            proc_b, last_b = self._runningAt(1, self._cursor)
+            last = min(last_a, last_b, limit)
+            if proc_a != proc_b:
+                self.running_cycles += last - self._cursor + 1
+                if self._range and self._range[1] == self._cursor - 1:
+                    self._range[1] = last
+                else:
+                    if self._range:
+                        self._closeRange()
+                    self._range = [self._cursor, last]
+            self._cursor = last + 1
+
+    def _closeRange(self):
+        self.running_ranges += 1
+        if self._on_range:
+            self._on_range(self._range[0], self._range[1])
+        self._range = None
+
+    def processes(self):
+        """
+        Generate (proc_id, fin_a, fin_b, turnaround_a, turnaround_b) for the processes whose finishing time
+        or turnaround differs, by process ID (-1 for a process missing from a run or not finished)
+        """
+        proc_ids = set(self._arrivals[0]) | set(self._arrivals[1])
+        for proc_id in sorted(proc_ids):
+            values = []
+            for side in [0, 1]:
+                fin = self._finishes[side].get(proc_id, -1)
+                arr = self._arrivals[side].get(proc_id)
+                values.append((fin, fin - arr + 1 if fin >= 0 and arr is not None else -1))
+            if values[0] != values[1]:
+                yield (proc_id, values[0][0], values[1][0], values[0][1], values[1][1])
+
+    def meanTurnaround(self, side):
+        """
+        Return the mean turnaround of the finished processes of one run (0: A, 1: B), or None
+        """
+        turnarounds = [fin - self._arrivals[side][proc_id] + 1 for proc_id, fin in self._finishes[side].iteritems()]
+        return float(sum(turnarounds)) / len(turnarounds) if turnarounds else None
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
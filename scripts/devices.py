@@ -0,0 +1,161 @@
+# -*- coding: utf-8  -*-
+"""
+I/O device contention: K devices serving I/O bursts one at a time
+
+Without a device model every 'Blocked' process counts its own I/O down each cycle, as if I/O were
+infinitely parallel. With one (see Scheduler.setDevices()), a process that blocks joins the service
+queue of the device with the fewest processes (waiting or in service, lowest index on ties), and each
+device serves its queue one burst at a time:
+    * fifo     : in the order the processes joined
+    * priority : smallest key first (see PRIORITIES), then in the order they joined
+A process waiting in a device queue is still 'Blocked'. The model is event-driven: a device only acts
+when a burst starts or ends, and completions are kept in one heap by cycle, so waiting processes cost
+nothing per cycle.
+"""
+import heapq
+import utilities
+
+DISCIPLINES = ['fifo', 'priority']
+
+def ioKey(proc):
+    return proc.rem_io_time
+
+def cpuKey(proc):
+    return proc.rem_cpu_time
+
+def idKey(proc):
+    return proc.proc_id
+
+# priority keys (taken when the process joins a queue): shortest I/O burst, shortest remaining CPU time, lowest ID
+PRIORITIES = {'io': ioKey, 'cpu': cpuKey, 'id': idKey}
+
+class DeviceModel(object):
+    """
+    DeviceModel: count I/O devices with one service queue each
+        * submit()  : a process blocked at a cycle joins a queue (its I/O can start at the next cycle)
+        * finished(): the processes whose I/O burst ends with a cycle (the devices then start their next bursts)
+        * stat()    : device utilization and queueing delay
+    """
+    def __init__(self, count, discipline='fifo', priority='io'):
+        if count < 1:
+            raise ValueError("the number of devices must be positive")
+        if discipline not in DISCIPLINES:
+            raise ValueError("unknown device discipline %r (choose from %s)" % (discipline, ", ".join(DISCIPLINES)))
+        if priority not in PRIORITIES:
+            raise ValueError("unknown device priority %r (choose from %s)" % (priority, ", ".join(sorted(PRIORITIES))))
+        self.count = count
+        self.discipline = discipline
+        self.priority = priority  # a name, not the function, so that engine snapshots can copy the model
+        self._queues = [[] for d in xrange(count)]    # heaps of (key, sequence number, process, cycle joined)
+        self._serving = [None] * count                # (process, first cycle, last cycle) of the burst in service
+        self._loads = [0] * count  # processes waiting or in service per device
+        self._by_load = [(0, device) for device in xrange(count)]  # heap of (load, device); outdated entries are skipped
+        self._events = []    # heap of (last cycle of a burst in service, device)
+        self._sequence = 0   # join order (FIFO within equal keys)
+        self._busy = [0] * count  # cycles of service started on each device
+        self.bursts = 0      # bursts started
+        self.total_delay = 0 # cycles waited in queues by the started bursts
+        self.max_delay = 0
+
+    def _shortest(self):
+        """
+        Return the device with the fewest processes (the lowest index on ties)
+        """
+        by_load = self._by_load
+        while by_load[0][0] != self._loads[by_load[0][1]]:
+            heapq.heappop(by_load)
+        return by_load[0][1]
+
+    def _changeLoad(self, device, delta):
+        self._loads[device] += delta
+        if len(self._by_load) > 4 * self.count + 64:
+            # rebuilt from the loads, so that outdated entries do not pile up
+            self._by_load = [(load, d) for d, load in enumerate(self._loads)]
+            heapq.heapify(self._by_load)
+        else:
+            heapq.heappush(self._by_load, (self._loads[device], device))
+
+    def submit(self, proc, cycle):
+        """
+        Queue the I/O burst of a process that blocks at cycle ('Blocked' from the next cycle)
+        """
+        device = self._shortest()
+        self._changeLoad(device, 1)
+        key = PRIORITIES[self.priority](proc) if self.discipline == 'priority' else 0
+        heapq.heappush(self._queues[device], (key, self._sequence, proc, cycle + 1))
+        self._sequence += 1
+        if self._serving[device] is None:
+            self._startNext(device, cycle + 1)
+
+    def _startNext(self, device, cycle):
+        """
+        Start the next queued burst of a device at cycle (the device stays idle if its queue is empty)
+        """
+        if not self._queues[device]:
+            self._serving[device] = None
+            return
+        key, sequence, proc, joined = heapq.heappop(self._queues[device])
+        last = cycle + proc.rem_io_time - 1
+        self._serving[device] = (proc, cycle, last)
+        heapq.heappush(self._events, (last, device))
+        self._busy[device] += last - cycle + 1
+        delay = cycle - joined
+        proc.queued(delay)
+        self.bursts += 1
+        self.total_delay += delay
+        if delay > self.max_delay:
+            self.max_delay = delay
+
+    def finished(self, cycle):
+        """
+        Return the processes whose I/O burst ends with cycle ('Ready' from the next cycle)
+        """
+        procs = []
+        events = self._events
+        while events and events[0][0] <= cycle:
+            last, device = heapq.heappop(events)
+            proc = self._serving[device][0]
+            proc.endIO()
+            procs.append(proc)
+            self._changeLoad(device, -1)
+            self._startNext(device, last + 1)
+        return procs
+
+    def utilization(self, end_time):
+        """
+        Return the share of cycles 0..end_time each device was serving (bursts still in service
+        after end_time, in a stopped simulation, only count up to end_time)
+        """
+        cycles = end_time + 1
+        result = []
+        for device in xrange(self.count):
+            busy = self._busy[device]
+            serving = self._serving[device]
+            if serving is not None:
+                busy -= max(0, serving[2] - max(end_time, serving[1] - 1))
+            result.append(utilities.roundup_2(float(busy) / cycles) if cycles > 0 else 0)
+        return result
+
+    def meanDelay(self):
+        return float(self.total_delay) / self.bursts if self.bursts else 0.0
+
+    def stat(self, end_time):
+        """
+        Return {'utilization': [per device], 'bursts', 'mean_delay', 'max_delay'} (delays in cycles, of the started bursts)
+        """
+        return {'utilization': self.utilization(end_time), 'bursts': self.bursts,
+                'mean_delay': self.meanDelay(), 'max_delay': self.max_delay}
+
+    def lines(self, end_time):
+        """
+        Return the summary lines of the devices
+        """
+        lines = ["Device %d utilization: %.2f" % (device, utilization)
+                 for device, utilization in enumerate(self.utilization(end_time))]
+        lines.append("I/O queueing delay: mean %.2f, max %d (%d bursts, %d device(s), %s)" %
+                     (self.meanDelay(), self.max_delay, self.bursts, self.count,
+                      self.discipline if self.discipline == 'fifo' else "priority=%s" % self.priority))
+        return lines
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
@@ -0,0 +1,206 @@
+# -*- coding: utf-8  -*-
+"""
+Machine-readable output formats for a finished Scheduler run
+
+    * compact : legacy text with consecutive identical cycles collapsed into ranges (see writeCompact)
+    * jsonl : JSON Lines, one object per interval, per process and one run summary
+    * csv   : state intervals (and per-process summaries in a companion file)
+    * bin   : packed binary timeline (see BinaryWriter)
+
+All writers stream straight from the scheduler's record into a file object.
+"""
+import json
+import struct
+import utilities
+
+FORMATS = ['text', 'compact', 'jsonl', 'csv', 'bin']
+
+STATES = ['running', 'blocked', 'ready']  # state codes used by the binary timeline
+STATE_CODES = dict((state, code) for code, state in enumerate(STATES))
+
+def writeText(scheduler, f):
+    """
+    Write the legacy text output (same content as Scheduler.output()) line by line
+    """
+    for cycle, item in scheduler._iterPrintable():
+        f.write("%d %s\n" % (cycle, item))
+    _writeTextSummary(scheduler, f)
+
+def _writeTextSummary(scheduler, f):
+    stat = scheduler.getStat()
+    f.write("\n")
+    f.write("Finishing time: %d\n" % stat[0])
+    f.write("CPU utilization: %.2f\n" % stat[1])
+    for item in stat[2].items():
+        f.write("Turnaround process %d: %d\n" % (item[0], item[1]))
+    for line in scheduler._deviceLines():
+        f.write(line + "\n")
+    if scheduler.stopped():
+        f.write(scheduler._stoppedLine() + "\n")
+
+def writeCompact(scheduler, f):
+    """
+    Write the legacy text output with runs of identical cycles collapsed, e.g. "120-4519 3: running 5: ready "
+        * single cycles keep the legacy form ("7 3: running ")
+        * only consecutive kept cycles are collapsed (see Scheduler.setRecording())
+        * the summary is written unchanged; expandCompact() restores the legacy output byte for byte
+    """
+    def writeRun(first, last, item):
+        if first == last:
+            f.write("%d %s\n" % (first, item))
+        else:
+            f.write("%d-%d %s\n" % (first, last, item))
+            
+    first, last, previous = 0, -1, None
+    for cycle, item in scheduler._iterPrintable():
+        if item != previous or cycle != last + 1:
+            if previous is not None:
+                writeRun(first, last, previous)
+            first, previous = cycle, item
+        last = cycle
+    if previous is not None:
+        writeRun(first, last, previous)
+    _writeTextSummary(scheduler, f)
+
+def expandCompact(in_f, out_f, chunk=65536):
+    """
+    Expand compact text output (see writeCompact) into the legacy one-line-per-cycle output
+    """
+    lines = iter(in_f)
+    for line in lines:
+        if line == "\n":  # the blank line separating the cycles from the summary
+            out_f.write(line)
+            break
+        head, item = line.split(" ", 1)
+        if "-" in head:
+            first, last = head.split("-")
+            for start in xrange(int(first), int(last) + 1, chunk):
+                stop = min(start + chunk, int(last) + 1)
+                out_f.write("".join(["%d %s" % (i, item) for i in xrange(start, stop)]))
+        else:
+            out_f.write(line)
+    for line in lines:
+        out_f.write(line)
+
+def writeJSONLines(scheduler, f):
+    """
+    Write intervals, per-process summaries and the run summary as JSON Lines
+    """
+    for interval in scheduler.intervals():
+        f.write('{"type":"interval","proc_id":%d,"state":"%s","start":%d,"end":%d}\n' % interval)
+    for summary in scheduler.summary():
+        f.write('{"type":"process","proc_id":%d,"arr_time":%d,"fin_time":%d,"turnaround":%d}\n' % summary)
+    stat = scheduler.getStat()
+    stopped = ',"stopped":"%s"' % scheduler.stopped() if scheduler.stopped() else ''
+    devices = ''
+    device_stat = scheduler.deviceStat()
+    if device_stat:
+        devices = ',"device_utilization":%s,"io_bursts":%d,"io_delay_mean":%s,"io_delay_max":%d' % \
+            (json.dumps([float(u) for u in device_stat['utilization']]), device_stat['bursts'],
+             json.dumps(device_stat['mean_delay']), device_stat['max_delay'])
+    f.write('{"type":"summary","finishing_time":%d,"cpu_utilization":%s%s%s}\n' %
+            (stat[0], json.dumps(float(stat[1])), devices, stopped))
+
+def writeIntervalsCSV(scheduler, f):
+    """
+    Write state intervals as CSV (proc_id,state,start,end)
+    """
+    f.write("proc_id,state,start,end\n")
+    for interval in scheduler.intervals():
+        f.write("%d,%s,%d,%d\n" % interval)
+
+def writeSummaryCSV(scheduler, f):
+    """
+    Write per-process summaries as CSV (proc_id,arr_time,fin_time,turnaround)
+    """
+    f.write("proc_id,arr_time,fin_time,turnaround\n")
+    for summary in scheduler.summary():
+        f.write("%d,%d,%d,%d\n" % summary)
+
+class BinaryWriter(object):
+    """
+    Packed binary timeline (little-endian):
+        * header    : magic 'SCHT', version (uint16), reserved (uint16), finishing time (int32), CPU work cycles (int32)
+        * intervals : (proc_id int32, state uint8, start int32, end int32) ..., closed by a record with proc_id -1
+        * processes : (proc_id int32, arr_time int32, fin_time int32) ..., closed by a record with proc_id -1
+    """
+    MAGIC = 'SCHT'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHii')
+    INTERVAL = struct.Struct('<iBii')
+    PROCESS = struct.Struct('<iii')
+    CHUNK = 4096  # records packed before each write
+
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, scheduler):
+        stat = scheduler.getStat()
+        self._f.write(self.HEADER.pack(self.MAGIC, self.VERSION, 0, stat[0], scheduler._cpuWork()))
+        pack = self.INTERVAL.pack
+        self._writeChunked(pack(proc_id, STATE_CODES[state], start, end)
+                           for proc_id, state, start, end in scheduler.intervals())
+        self._f.write(pack(-1, 0, 0, 0))
+        pack = self.PROCESS.pack
+        self._writeChunked(pack(proc_id, arr_time, fin_time)
+                           for proc_id, arr_time, fin_time, turnaround in scheduler.summary())
+        self._f.write(pack(-1, 0, 0))
+
+    def _writeChunked(self, packed):
+        chunk = []
+        for record in packed:
+            chunk.append(record)
+            if len(chunk) == self.CHUNK:
+                self._f.write(''.join(chunk))
+                chunk = []
+        self._f.write(''.join(chunk))
+
+class BinaryReader(object):
+    """
+    Read a packed binary timeline written by BinaryWriter
+        * header fields are available right after construction
+        * intervals() must be consumed before processes()
+    """
+    def __init__(self, f):
+        self._f = f
+        header = f.read(BinaryWriter.HEADER.size)
+        if len(header) != BinaryWriter.HEADER.size:
+            raise ValueError("truncated binary timeline header")
+        magic, version, reserved, self.end_time, self.cpu_work = BinaryWriter.HEADER.unpack(header)
+        if magic != BinaryWriter.MAGIC or version != BinaryWriter.VERSION:
+            raise ValueError("not a binary timeline (version %d)" % BinaryWriter.VERSION)
+
+    def _records(self, record_struct):
+        size = record_struct.size
+        unpack = record_struct.unpack
+        while True:
+            data = self._f.read(size)
+            if len(data) != size:
+                raise ValueError("truncated binary timeline")
+            record = unpack(data)
+            if record[0] == -1:
+                break
+            yield record
+
+    def intervals(self):
+        """
+        Generate (proc_id, state, start, end) tuples
+        """
+        for proc_id, state, start, end in self._records(BinaryWriter.INTERVAL):
+            yield (proc_id, STATES[state], start, end)
+
+    def processes(self):
+        """
+        Generate (proc_id, arr_time, fin_time, turnaround) tuples
+        """
+        for proc_id, arr_time, fin_time in self._records(BinaryWriter.PROCESS):
+            yield (proc_id, arr_time, fin_time, fin_time - arr_time + 1 if fin_time >= 0 else -1)
+
+def writeBinary(scheduler, f):
+    """
+    Write the packed binary timeline
+    """
+    BinaryWriter(f).write(scheduler)
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
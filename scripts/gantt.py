@@ -0,0 +1,175 @@
+# -*- coding: utf-8  -*-
+import array
+from xml.sax.saxutils import escape
+import utilities
+import formats
+
+STATES = ['running', 'blocked', 'ready']
+COLORS = {'running': '#2ca02c', 'blocked': '#d62728', 'ready': '#e6b800'}
+LEVELS = 4  # opacity levels of a cell (share of the cell covered by its state)
+
+def niceStep(span, ticks=10):
+    """
+    Return a tick step of the form 1, 2 or 5 * 10^k giving about ticks ticks over span
+    """
+    step = 1
+    while True:
+        for factor in [1, 2, 5]:
+            if span / (step * factor) <= ticks:
+                return step * factor
+        step *= 10
+
+class GanttChart(object):
+    """
+    GanttChart: level-of-detail Gantt chart of 'Running', 'Blocked' and 'Ready' intervals per process
+        * the timeline is aggregated to at most width columns (bucket cycles each)
+          and max_rows rows (consecutive process IDs share a row)
+        * each cell shows its dominant state, with an opacity giving how much of the cell it covers
+        * runs of identical cells in a row become one SVG element, so the file size is bounded by
+          the resolution, not by the number of cycles or processes
+    """
+    def __init__(self, proc_ids, end_time, width=1000, max_rows=200):
+        proc_ids = sorted(proc_ids)
+        cycles = max(end_time + 1, 1)
+        self._bucket = -(-cycles // max(1, min(width, cycles)))  # cycles per column (ceiling division)
+        self._cols = -(-cycles // self._bucket)
+        self._group = -(-len(proc_ids) // max_rows) if proc_ids else 1  # processes per row
+        self._rows = -(-len(proc_ids) // self._group)
+        self._row_of = dict((proc_id, rank // self._group) for rank, proc_id in enumerate(proc_ids))
+        self._labels = [proc_ids[row * self._group:(row + 1) * self._group] for row in range(self._rows)]
+        self._cycles = cycles
+        self._counts = [array.array('l', [0]) * (self._rows * self._cols) for state in STATES]
+
+    def add(self, proc_id, state, start, end):
+        """
+        Add one interval (start and end cycles inclusive)
+        """
+        row = self._row_of.get(proc_id)
+        if row is None:
+            return
+        counts = self._counts[STATES.index(state)]
+        bucket = self._bucket
+        base = row * self._cols
+        first, last = start // bucket, end // bucket
+        if first == last:
+            counts[base + first] += end - start + 1
+            return
+        counts[base + first] += (first + 1) * bucket - start
+        for col in xrange(first + 1, last):
+            counts[base + col] += bucket
+        counts[base + last] += end - last * bucket + 1
+
+    def addAll(self, intervals):
+        for proc_id, state, start, end in intervals:
+            self.add(proc_id, state, start, end)
+
+    def _runs(self, row):
+        """
+        Generate (first column, number of columns, state, level) for runs of identical cells in a row
+        """
+        capacity = self._bucket * len(self._labels[row])
+        base = row * self._cols
+        current, first = None, 0
+        for col in xrange(self._cols + 1):
+            cell = None
+            if col < self._cols:
+                occupancy = [counts[base + col] for counts in self._counts]
+                top = max(occupancy)
+                if top:
+                    state = occupancy.index(top)
+                    cell = (state, min(LEVELS, -(-top * LEVELS // capacity)))
+            if cell != current:
+                if current is not None:
+                    yield first, col - first, STATES[current[0]], current[1]
+                current, first = cell, col
+
+    def _label(self, row):
+        procs = self._labels[row]
+        return "%d" % procs[0] if len(procs) == 1 else "%d-%d" % (procs[0], procs[-1])
+
+    def writeSVG(self, f, title=None, plot_width=1200):
+        """
+        Write the chart as a standalone SVG document
+        """
+        row_height = max(2, min(16, 800 // max(self._rows, 1)))
+        left, top = 80, 40 if title else 24
+        height = top + self._rows * row_height + 30
+        scale = float(plot_width) / self._cols
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" font-family="monospace" font-size="10">\n'
+                % (left + plot_width + 10, height))
+        f.write('<style>%s</style>\n' % " ".join([".%s{fill:%s}" % (state, COLORS[state]) for state in STATES]))
+        if title:
+            f.write('<text x="%d" y="16" font-size="14">%s</text>\n' % (left, escape(title)))
+
+        # time axis
+        step = niceStep(self._cycles)
+        axis_y = top + self._rows * row_height
+        for cycle in xrange(0, self._cycles, step):
+            x = left + cycle / float(self._bucket) * scale
+            f.write('<line x1="%.1f" y1="%d" x2="%.1f" y2="%d" stroke="#ccc"/><text x="%.1f" y="%d">%d</text>\n'
+                    % (x, top, x, axis_y + 4, x, axis_y + 14, cycle))
+
+        # rows: a label every few rows so labels never overlap
+        label_every = -(-12 // row_height)
+        for row in xrange(self._rows):
+            y = top + row * row_height
+            if row % label_every == 0:
+                f.write('<text x="4" y="%d">%s</text>\n' % (y + min(row_height, 12) - 2, self._label(row)))
+            for first, length, state, level in self._runs(row):
+                opacity = '' if level == LEVELS else ' fill-opacity="%.2f"' % (float(level) / LEVELS)
+                f.write('<rect class="%s" x="%.2f" y="%d" width="%.2f" height="%d"%s/>\n'
+                        % (state, left + first * scale, y, length * scale, max(1, row_height - 1), opacity))
+
+        # legend
+        x = left
+        for state in STATES:
+            f.write('<rect class="%s" x="%d" y="%d" width="10" height="10"/><text x="%d" y="%d">%s</text>\n'
+                    % (state, x, height - 12, x + 14, height - 3, state))
+            x += 90
+        f.write('<text x="%d" y="%d">%d cycle(s) per column, %d process(es) per row</text>\n'
+                % (x, height - 3, self._bucket, self._group))
+        f.write('</svg>\n')
+
+    def writeHTML(self, f, title=None, plot_width=1200):
+        """
+        Write the chart as an HTML page embedding the SVG
+        """
+        f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>%s</title></head><body>\n'
+                % escape(title or "Gantt chart"))
+        self.writeSVG(f, title, plot_width)
+        f.write('</body></html>\n')
+
+def _write(chart, f, fmt, title):
+    if fmt == 'html':
+        chart.writeHTML(f, title)
+    else:
+        chart.writeSVG(f, title)
+
+def renderScheduler(scheduler, f, fmt='svg', title=None, width=1000, max_rows=200):
+    """
+    Render the recorded timeline of a finished Scheduler run as SVG or HTML
+        * the intervals are rebuilt from the per-cycle record, in time and memory proportional to
+          cycles x processes: for very long runs save a binary timeline (-f bin) and use renderBinary()
+    """
+    chart = GanttChart([proc.proc_id for proc in scheduler._proc_list], scheduler._end_time, width, max_rows)
+    chart.addAll(scheduler.intervals())
+    _write(chart, f, fmt, title)
+
+def renderBinary(in_f, f, fmt='svg', title=None, width=1000, max_rows=200):
+    """
+    Render a packed binary timeline (see formats.BinaryWriter) as SVG or HTML
+        * two streaming passes: the process IDs (stored after the intervals) size the chart,
+          then the intervals are aggregated into it
+    """
+    reader = formats.BinaryReader(in_f)
+    for interval in reader.intervals():
+        pass
+    proc_ids = [proc_id for proc_id, arr_time, fin_time, turnaround in reader.processes()]
+    in_f.seek(0)
+    reader = formats.BinaryReader(in_f)
+    chart = GanttChart(proc_ids, reader.end_time, width, max_rows)
+    chart.addAll(reader.intervals())
+    _write(chart, f, fmt, title)
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
@@ -0,0 +1,176 @@
+# -*- coding: utf-8  -*-
+"""
+Reproducible workload generator
+
+    * emits processes in the input format "id cpu io arrival", or as a packed binary workload (see BINARY_HEADER)
+    * everything is drawn from one seeded random.Random, so a seed and the parameters define a workload
+    * processes are generated and written one chunk at a time: memory use does not depend on the count
+"""
+import math
+import random
+import struct
+import utilities
+
+ARRIVALS = ['poisson', 'bursty']
+LAYOUTS = ['sequential', 'strided', 'permuted']
+
+# packed binary workload (little-endian): magic 'SCHW', version (uint16), reserved (uint16), process count (int64),
+# then (proc_id, cpu_time, io_time, arr_time) as int32 per process
+BINARY_MAGIC = 'SCHW'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHq')
+BINARY_RECORD = struct.Struct('<iiii')
+INT32_MAX = 2 ** 31 - 1  # largest value of a binary record field
+CHUNK = 4096  # processes formatted before each write
+
+def gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+class WorkloadGenerator(object):
+    """
+    WorkloadGenerator: stream of (proc_id, cpu_time, io_time, arr_time) for count processes
+        * arrivals: 'poisson' (exponential gaps, rate processes per cycle), or 'bursty' (on/off:
+          bursts of about burst processes arriving at rate, separated by idle periods of about idle cycles)
+        * CPU time: Pareto with shape cpu_alpha and scale cpu_min (heavy tail), capped at cpu_max if given
+          and always at INT32_MAX (so that text and binary output describe the same workload)
+        * I/O: a share io_fraction of the processes does I/O, for about io_mean cycles (geometric)
+        * IDs: 'sequential' (0, 1, ...), 'strided' (0, stride, 2 * stride, ...) or 'permuted'
+          (a seeded affine permutation of 0..count-1, computed per process)
+    """
+    def __init__(self, count, seed=0, arrival='poisson', rate=0.5, burst=50, idle=200,
+                 cpu_alpha=1.5, cpu_min=2, cpu_max=None, io_fraction=0.3, io_mean=4,
+                 layout='sequential', stride=7):
+        if count < 0:
+            raise ValueError("process count must not be negative")
+        if arrival not in ARRIVALS:
+            raise ValueError("unknown arrival process %r (choose from %s)" % (arrival, ", ".join(ARRIVALS)))
+        if layout not in LAYOUTS:
+            raise ValueError("unknown ID layout %r (choose from %s)" % (layout, ", ".join(LAYOUTS)))
+        if rate <= 0 or burst <= 0 or idle < 0 or cpu_alpha <= 0 or cpu_min < 1 or io_mean < 1:
+            raise ValueError("rate, burst, cpu_alpha, io_mean and cpu_min must be positive, idle not negative")
+        if not 0 <= io_fraction <= 1:
+            raise ValueError("io_fraction must be between 0 and 1")
+        if layout == 'strided' and stride < 1:
+            raise ValueError("stride must be positive")
+        if count and (count - 1) * stride > INT32_MAX and layout == 'strided':
+            raise ValueError("strided IDs do not fit in 32 bits")
+        self.count = count
+        self.seed = seed
+        self._arrival = arrival
+        self._rate = float(rate)
+        self._burst = burst
+        self._idle = idle
+        self._cpu_alpha = cpu_alpha
+        self._cpu_min = cpu_min
+        self._cpu_max = min(cpu_max, INT32_MAX) if cpu_max else INT32_MAX
+        self._io_fraction = io_fraction
+        self._io_mean = io_mean
+        self._layout = layout
+        self._stride = stride
+
+    def _idFunction(self, rand):
+        """
+        Return the function mapping the i-th generated process to its ID
+        """
+        if self._layout == 'sequential':
+            return lambda i: i
+        if self._layout == 'strided':
+            stride = self._stride
+            return lambda i: i * stride
+        # permuted: i => (a * i + b) mod count with a coprime to count is a bijection
+        n = max(self.count, 1)
+        a = rand.randrange(1, n) if n > 1 else 1
+        while gcd(a, n) != 1:
+            a += 1
+        b = rand.randrange(n)
+        return lambda i: (a * i + b) % n
+
+    def __iter__(self):
+        rand = random.Random(self.seed)
+        proc_id = self._idFunction(rand)
+        expovariate = rand.expovariate
+        paretovariate = rand.paretovariate
+        uniform = rand.random
+        rate = self._rate
+        bursty = self._arrival == 'bursty'
+        burst_end_prob = 1.0 / self._burst  # burst lengths are geometric with mean burst
+        io_log = math.log(1 - 1.0 / self._io_mean) if self._io_mean > 1 else None
+
+        clock = 0.0
+        for i in xrange(self.count):
+            if bursty and i and uniform() < burst_end_prob:
+                clock += expovariate(1.0 / self._idle) if self._idle else 0
+            clock += expovariate(rate)
+            cpu_time = int(math.ceil(self._cpu_min * paretovariate(self._cpu_alpha)))
+            if cpu_time > self._cpu_max:
+                cpu_time = self._cpu_max
+            io_time = 0
+            if uniform() < self._io_fraction:
+                # geometric with mean io_mean, at least 1
+                io_time = 1 if io_log is None else 1 + int(math.log(1 - uniform()) / io_log)
+            yield (proc_id(i), cpu_time, io_time, int(clock))
+
+def writeText(generator, f):
+    """
+    Write the workload in the input format, one process per line
+    """
+    chunk = []
+    for record in generator:
+        chunk.append("%d %d %d %d\n" % record)
+        if len(chunk) == CHUNK:
+            f.write("".join(chunk))
+            chunk = []
+    f.write("".join(chunk))
+
+def writeBinary(generator, f):
+    """
+    Write the workload as a packed binary workload
+        * raise ValueError for a process that does not fit in int32 fields (an arrival time past INT32_MAX);
+          the workload is generated twice, checked before anything is written, so that no truncated file is left
+    """
+    for record in generator:
+        if max(record) > INT32_MAX:
+            raise ValueError("process %d (CPU time %d, I/O time %d, arrival %d) does not fit in a binary workload" % record)
+    f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, generator.count))
+    pack = BINARY_RECORD.pack
+    chunk = []
+    for record in generator:
+        chunk.append(pack(*record))
+        if len(chunk) == CHUNK:
+            f.write("".join(chunk))
+            chunk = []
+    f.write("".join(chunk))
+
+def isBinary(data):
+    """
+    Whether data (the start of an input file) is a packed binary workload
+    """
+    return data[:len(BINARY_MAGIC)] == BINARY_MAGIC
+
+def readBinary(f):
+    """
+    Generate (proc_id, cpu_time, io_time, arr_time) from a packed binary workload, read from a file object in chunks
+    """
+    header = f.read(BINARY_HEADER.size)
+    if len(header) != BINARY_HEADER.size:
+        raise ValueError("truncated binary workload header")
+    magic, version, reserved, count = BINARY_HEADER.unpack(header)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("not a binary workload (version %d)" % BINARY_VERSION)
+    size = BINARY_RECORD.size
+    unpack_from = BINARY_RECORD.unpack_from
+    read = 0
+    while read < count:
+        data = f.read(size * min(CHUNK, count - read))
+        if not data or len(data) % size:
+            raise ValueError("binary workload size does not match its %d process(es)" % count)
+        for offset in xrange(0, len(data), size):
+            yield unpack_from(data, offset)
+        read += len(data) // size
+    if f.read(1):
+        raise ValueError("binary workload size does not match its %d process(es)" % count)
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
@@ -0,0 +1,185 @@
+# -*- coding: utf-8  -*-
+"""
+Lockstep batch engine: many small independent workloads simulated at once with NumPy
+
+The state of a batch is held in 2-D arrays (workload x process, processes sorted by ID in each
+workload) and every step of a cycle (arrivals, I/O, selection, running, scheduling the next cycle)
+is one vectorized operation over the whole batch. The rules are those of the FCFS, RR and SRJF
+classes, so every workload gets the statistics its own Scheduler run would give.
+"""
+import itertools
+import utilities
+try:
+    import numpy
+except ImportError:
+    numpy = None  # the lockstep engine is optional and needs NumPy
+
+ALGORITHMS = ['fcfs', 'rr', 'srjf']
+
+# process states
+NEW, READY, RUNNING, BLOCKED, DONE = range(5)
+
+class LockstepBatch(object):
+    """
+    LockstepBatch: simulate a batch of workloads with 'fcfs', 'rr' (quantum) or 'srjf'
+        * workloads: list of workloads, each a list of (proc_id, cpu_time, io_time, arr_time)
+          in the legacy model (I/O between two halves of the CPU time)
+        * workloads are simulated chunk workloads at a time; finished workloads leave the arrays
+        After run():
+            * proc_ids, arr_times, fin_times: (workload x process) arrays sorted by process ID, padded with -1
+            * end_times, cpu_work: per-workload finishing time and number of running cycles
+            * getStat(w): statistics of workload w, as Scheduler.getStat() returns them
+    """
+    def __init__(self, workloads, algorithm='fcfs', quantum=2, chunk=4096):
+        if numpy is None:
+            raise ImportError("the lockstep engine requires NumPy")
+        if algorithm not in ALGORITHMS:
+            raise ValueError("unknown algorithm %r (choose from %s)" % (algorithm, ", ".join(ALGORITHMS)))
+        self.algorithm = algorithm
+        self.quantum = quantum
+        self._chunk = chunk
+        n = len(workloads)
+        width = max([len(workload) for workload in workloads] or [0])
+        lengths = numpy.array([len(workload) for workload in workloads], numpy.int64)
+        flat = numpy.array([process for workload in workloads for process in sorted(workload)], numpy.int64).reshape(-1, 4)
+        rows = numpy.repeat(numpy.arange(n), lengths)
+        cols = numpy.arange(len(flat)) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+        invalid = (flat[:, 1] < 1) | (flat[:, 2] < 0) | (flat[:, 3] < 0)
+        if invalid.any():
+            k = numpy.nonzero(invalid)[0][0]
+            raise ValueError("workload %d: invalid process %d" % (rows[k], flat[k, 0]))
+        self.proc_ids = numpy.full((n, width), -1, numpy.int64)
+        self.proc_ids[rows, cols] = flat[:, 0]
+        self._planned = numpy.zeros((3, n, width), numpy.int64)  # cpu_time, io_time, arr_time
+        self._planned[:, rows, cols] = flat[:, 1:].T
+        self.arr_times = numpy.where(self.proc_ids >= 0, self._planned[2], -1)
+        self.fin_times = numpy.full((n, width), -1, numpy.int64)
+        self.end_times = numpy.full(n, -1, numpy.int64)
+        self.cpu_work = numpy.zeros(n, numpy.int64)
+
+    def run(self):
+        """
+        Simulate every workload to completion
+        """
+        for first in xrange(0, len(self.proc_ids), self._chunk):
+            self._runChunk(numpy.arange(first, min(first + self._chunk, len(self.proc_ids))))
+        self.end_times = self.fin_times.max(axis=1) if self.fin_times.size else self.end_times
+        return self
+
+    def _runChunk(self, rows):
+        valid = self.proc_ids[rows] >= 0
+        cpu_time, io_time, arr_time = self._planned[:, rows]
+        half = (cpu_time + 1) // 2  # each half of the CPU time, rounded up
+        has_io = io_time > 0
+        rem = numpy.where(has_io, 2 * half, cpu_time)  # remaining CPU time
+        block_at = numpy.where(has_io, half, -1)  # remaining CPU time at which the I/O starts
+        rem_io = numpy.zeros_like(rem)
+        state = numpy.where(valid, NEW, DONE).astype(numpy.int8)
+        key = numpy.zeros_like(rem)  # queue order: ready time and ID (fcfs, rr), or insertion order (srjf)
+        consecutive = numpy.zeros_like(rem)
+        fin = numpy.full_like(rem, -1)
+        cpu_work = numpy.zeros(len(rows), numpy.int64)
+        width = rem.shape[1]
+        col = numpy.arange(width, dtype=numpy.int64)
+        big = numpy.iinfo(numpy.int64).max
+        srjf = self.algorithm == 'srjf'
+        quantum = self.quantum if self.algorithm == 'rr' else None
+
+        i = 0
+        while len(rows):
+            # workloads with nothing but future arrivals: jump to the next arrival
+            new = state == NEW
+            if new.any() and not (state != NEW)[state != DONE].any():
+                i = max(i, arr_time[new].min())
+
+            # arrivals ('Ready' from this cycle, by process ID)
+            arriving = new & (arr_time == i)
+            state[arriving] = READY
+            if srjf:
+                # order of the ready list: arrivals of cycle i, then (at the end of the cycle)
+                # the preempted process, then processes finishing I/O, by process ID
+                key[arriving] = (2 * i * (width + 1) + col)[numpy.nonzero(arriving)[1]]
+            else:
+                key[arriving] = (i * width + col)[numpy.nonzero(arriving)[1]]
+
+            # I/O for one cycle
+            blocked = state == BLOCKED
+            rem_io -= blocked
+
+            # selection
+            ready = state == READY
+            if srjf:
+                select = ready.any(axis=1)  # the running process competes again every cycle
+                shortest = numpy.where(ready, rem, big).min(axis=1)[:, None]
+                candidates = numpy.where(ready & (rem == shortest), key, big)
+            else:
+                select = ~(state == RUNNING).any(axis=1) & ready.any(axis=1)
+                candidates = numpy.where(ready, key, big)
+            selected = numpy.nonzero(select)[0]
+            if len(selected):
+                state[selected, candidates[selected].argmin(axis=1)] = RUNNING
+
+            # running for one cycle
+            running = state == RUNNING
+            rem -= running
+            consecutive += running
+            cpu_work += running.any(axis=1)
+
+            # schedule the next cycle
+            to_block = running & (rem == block_at)
+            to_finish = running & ~to_block & (rem == 0)
+            state[to_block] = BLOCKED
+            rem_io[to_block] = io_time[to_block]
+            block_at[to_block] = -1
+            consecutive[to_block] = 0
+            state[to_finish] = DONE
+            fin[to_finish] = i
+            if srjf:
+                again = running & ~to_block & ~to_finish
+                state[again] = READY
+                key[again] = (2 * i + 1) * (width + 1)
+            elif quantum is not None:
+                expire = running & ~to_block & ~to_finish & (consecutive == quantum)
+                state[expire] = READY
+                key[expire] = ((i + 1) * width + col)[numpy.nonzero(expire)[1]]
+                consecutive[expire] = 0
+            unblock = blocked & (rem_io == 0)
+            state[unblock] = READY
+            if srjf:
+                key[unblock] = ((2 * i + 1) * (width + 1) + 1 + col)[numpy.nonzero(unblock)[1]]
+            else:
+                key[unblock] = ((i + 1) * width + col)[numpy.nonzero(unblock)[1]]
+            consecutive[unblock] = 0
+
+            # finished workloads leave the batch
+            done = (state == DONE).all(axis=1)
+            if done.any():
+                self.fin_times[rows[done]] = fin[done]
+                self.cpu_work[rows[done]] = cpu_work[done]
+                keep = ~done
+                rows = rows[keep]
+                (arr_time, io_time, rem, block_at, rem_io, state, key, consecutive, fin) = \
+                    [array[keep] for array in (arr_time, io_time, rem, block_at, rem_io, state, key, consecutive, fin)]
+                cpu_work = cpu_work[keep]
+            i += 1
+
+    def turnaround(self, w):
+        """
+        Return {proc_id: turnaround} of workload w
+        """
+        valid = self.proc_ids[w] >= 0
+        turnaround = self.fin_times[w][valid] - self.arr_times[w][valid] + 1
+        return dict(itertools.izip(self.proc_ids[w][valid].tolist(), turnaround.tolist()))
+
+    def getStat(self, w):
+        """
+        Return the statistics of workload w: [finishing time, CPU utilization, {proc_id: turnaround}]
+        """
+        end_time = int(self.end_times[w])
+        return [end_time, utilities.roundup_2(float(self.cpu_work[w]) / (end_time + 1)), self.turnaround(w)]
+
+    def getStats(self):
+        return [self.getStat(w) for w in xrange(len(self.proc_ids))]
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
@@ -0,0 +1,135 @@
+# -*- coding: utf-8  -*-
+import collections
+import itertools
+import utilities
+try:
+    import numpy
+except ImportError:
+    numpy = None  # extended metrics are optional and need NumPy
+
+PERCENTILES = [50, 95, 99]
+METRICS = ['waiting', 'response', 'turnaround', 'slowdown']
+LABELS = {'waiting': 'Waiting time', 'response': 'Response time', 'turnaround': 'Turnaround', 'slowdown': 'Slowdown',
+          'io_wait': 'I/O queueing'}
+FIELDS = ['arr_time', 'first_run', 'fin_time', 'total_cpu_time', 'io_time', 'io_wait']
+
+def timingArrays(proc_list):
+    """
+    Gather per-process timing into a dict of int64 arrays (one pass over the processes)
+        * arr_time, first_run, fin_time, total_cpu_time (rounded CPU cycles), io_time, io_wait (device queue cycles)
+        * first_run and fin_time are -1 for processes that never ran or never finished
+    """
+    if numpy is None:
+        raise ImportError("extended metrics require NumPy")
+    n = len(proc_list)
+    flat = numpy.fromiter(itertools.chain.from_iterable(
+        (p.arr_time, p.first_run, p.fin_time, p.total_cpu_time, p.io_time, p.io_wait) for p in proc_list),
+        numpy.int64, n * len(FIELDS))
+    table = flat.reshape(n, len(FIELDS))
+    return dict((field, table[:, i]) for i, field in enumerate(FIELDS))
+
+def computeMetrics(arrays, window=None, devices=False):
+    """
+    Compute mean and percentiles of waiting time, response time, turnaround and slowdown over finished processes,
+    and the number of completions per window of cycles (if window is given)
+        * turnaround = fin_time - arr_time + 1 (as in the summary)
+        * response   = first_run - arr_time
+        * waiting    = turnaround - CPU cycles - I/O cycles - I/O queueing (cycles spent 'Ready')
+        * slowdown   = turnaround / (CPU cycles + I/O cycles)
+        * I/O queueing = cycles spent 'Blocked' in device queues (only with devices, see Scheduler.setDevices())
+        Return an ordered dict: metric => {'mean', 'p50', 'p95', 'p99'} (None if no process finished),
+        plus 'throughput' => list of (window start, completions) if window is given
+    """
+    if window is not None and window < 0:
+        raise ValueError("the throughput window must be positive")
+    finished = arrays['fin_time'] >= 0
+    arr = arrays['arr_time'][finished]
+    fin = arrays['fin_time'][finished]
+    service = arrays['total_cpu_time'][finished] + arrays['io_time'][finished]
+    io_wait = arrays['io_wait'][finished]
+    turnaround = fin - arr + 1
+    rows = [turnaround - service - io_wait,
+            arrays['first_run'][finished] - arr,
+            turnaround,
+            turnaround / service.astype(numpy.float64)]
+    names = list(METRICS)
+    if devices:
+        rows.append(io_wait)
+        names.append('io_wait')
+    values = numpy.vstack(rows).astype(numpy.float64)
+
+    result = collections.OrderedDict()
+    if values.shape[1]:
+        means = values.mean(axis=1)
+        percentiles = numpy.percentile(values, PERCENTILES, axis=1)
+        for i, metric in enumerate(names):
+            stats = collections.OrderedDict([('mean', means[i])])
+            for j, q in enumerate(PERCENTILES):
+                stats['p%d' % q] = percentiles[j, i]
+            result[metric] = stats
+    else:
+        for metric in names:
+            result[metric] = None
+
+    if window:
+        counts = numpy.bincount(fin // window) if len(fin) else numpy.zeros(0, numpy.int64)
+        result['throughput'] = [(i * window, int(count)) for i, count in enumerate(counts)]
+    return result
+
+def schedulerMetrics(scheduler, window=None):
+    """
+    Compute extended metrics of a finished Scheduler run
+    """
+    metrics = computeMetrics(timingArrays(scheduler._proc_list), window, scheduler._devices is not None)
+    metrics['window'] = window
+    return metrics
+
+def reported(metrics):
+    """
+    Return the names of the metrics computed (METRICS, then I/O queueing with devices)
+    """
+    return [metric for metric in METRICS + ['io_wait'] if metric in metrics]
+
+def formatMetrics(metrics):
+    """
+    Format extended metrics as text lines following the summary
+    """
+    lines = []
+    for metric in reported(metrics):
+        stats = metrics[metric]
+        if stats is None:
+            lines.append("%s: no finished process" % LABELS[metric])
+        else:
+            lines.append("%s: " % LABELS[metric] + " ".join(["%s %.2f" % item for item in stats.items()]))
+    if metrics.get('window'):
+        completions = [count for start, count in metrics['throughput']] or [0]
+        window = metrics['window']
+        lines.append("Throughput (window %d): mean %.4f min %.4f max %.4f processes/cycle" %
+                     (window, float(sum(completions)) / (len(completions) * window),
+                      float(min(completions)) / window, float(max(completions)) / window))
+    return "".join([line + "\n" for line in lines])
+
+def writeJSONLines(metrics, f):
+    """
+    Write extended metrics as JSON Lines ("metric" and "throughput" records)
+    """
+    for metric in reported(metrics):
+        stats = metrics[metric]
+        if stats is not None:
+            f.write('{"type":"metric","metric":"%s",' % metric +
+                    ",".join(['"%s":%r' % (key, float(value)) for key, value in stats.items()]) + "}\n")
+    for start, count in metrics.get('throughput', []):
+        f.write('{"type":"throughput","start":%d,"end":%d,"completions":%d}\n' % (start, start + metrics['window'] - 1, count))
+
+def writeCSV(metrics, f):
+    """
+    Write extended metrics as CSV (metric,mean,p50,p95,p99)
+    """
+    f.write("metric,mean," + ",".join(["p%d" % q for q in PERCENTILES]) + "\n")
+    for metric in reported(metrics):
+        stats = metrics[metric]
+        if stats is not None:
+            f.write(metric + "," + ",".join(["%r" % float(value) for value in stats.values()]) + "\n")
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
@@ -0,0 +1,495 @@
+# -*- coding: utf-8  -*-
+import collections
+import heapq
+import itertools
+import random
+from operator import attrgetter
+import utilities
+from scheduler import Scheduler
+
+def checkCount(name, value, allow_none=False):
+    """
+    Return value if it is a positive integer (or None when allow_none), raise ValueError otherwise
+    """
+    if value is None and allow_none:
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, long)) or value < 1:
+        raise ValueError("%s must be a positive integer, not %r" % (name, value))
+    return value
+
+def checkNumber(name, value, minimum=None):
+    """
+    Return value if it is a number (at least minimum if given), raise ValueError otherwise
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, long, float)) or (minimum is not None and value < minimum):
+        raise ValueError("%s must be a number%s, not %r" % (name, "" if minimum is None else " >= %s" % minimum, value))
+    return value
+
+def perProcess(name, value, default, check):
+    """
+    Return a function of the process for a per-process option given as:
+        * None          : default(proc)
+        * a number      : the same value for every process
+        * a mapping     : process ID => value, default(proc) for the processes it leaves out
+        * a function    : called with the process
+    Numbers are validated with check(name, number), which raises ValueError
+    """
+    if value is None:
+        return default
+    if callable(value):
+        return value
+    if isinstance(value, dict):
+        for proc_id, number in value.items():
+            check("%s of process %r" % (name, proc_id), number)
+        return lambda p: value[p.proc_id] if p.proc_id in value else default(p)
+    check(name, value)
+    return lambda p: value
+
+class HeapQueue(object):
+    """
+    HeapQueue: 'Ready' processes ordered by key(proc), ties broken by insertion order
+    """
+    def __init__(self, key):
+        self._key = key
+        self._heap = []
+        self._counter = itertools.count()
+
+    def push(self, proc):
+        heapq.heappush(self._heap, (self._key(proc), next(self._counter), proc))
+
+    def pop(self):
+        return heapq.heappop(self._heap)[2]
+
+    def peek(self):
+        """
+        Return (key, proc) of the first process without removing it
+        """
+        key, order, proc = self._heap[0]
+        return key, proc
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __iter__(self):
+        return (entry[2] for entry in self._heap)
+
+class MultiLevelQueue(object):
+    """
+    MultiLevelQueue: one FIFO queue per level, level 0 first
+    """
+    def __init__(self, levels):
+        self._levels = [collections.deque() for i in range(levels)]
+        self._count = 0
+
+    def push(self, proc, level, front=False):
+        if front:
+            self._levels[level].appendleft(proc)
+        else:
+            self._levels[level].append(proc)
+        self._count += 1
+
+    def topLevel(self):
+        """
+        Return the first non-empty level (None if all levels are empty)
+        """
+        if self._count:
+            for level, queue in enumerate(self._levels):
+                if queue:
+                    return level
+        return None
+
+    def pop(self):
+        """
+        Remove and return the first process of the first non-empty level
+        """
+        level = self.topLevel()
+        self._count -= 1
+        return self._levels[level].popleft()
+
+    def merge(self):
+        """
+        Move all processes to level 0, keeping level order
+        """
+        top = self._levels[0]
+        for queue in self._levels[1:]:
+            top.extend(queue)
+            queue.clear()
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return itertools.chain(*self._levels)
+
+class TicketTree(object):
+    """
+    TicketTree: Fenwick tree over ticket counts for O(log n) weighted lottery draws
+    """
+    def __init__(self, capacity=64):
+        self._size = 0
+        self._tree = [0]
+        self._tickets = []
+        self._procs = []
+        self._free = []
+        self.total = 0
+        self._grow(capacity)
+
+    def _grow(self, size):
+        """
+        Resize to size slots (a power of two) and rebuild the tree in O(size)
+        """
+        self._tickets += [0] * (size - self._size)
+        self._procs += [None] * (size - self._size)
+        self._free = range(size - 1, self._size - 1, -1) + self._free
+        self._size = size
+        tree = [0] + self._tickets
+        for i in xrange(1, size + 1):
+            j = i + (i & -i)
+            if j <= size:
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _update(self, slot, delta):
+        i = slot + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+        self.total += delta
+
+    def add(self, proc, tickets):
+        if not self._free:
+            self._grow(self._size * 2)
+        slot = self._free.pop()
+        self._procs[slot] = proc
+        self._tickets[slot] = tickets
+        self._update(slot, tickets)
+
+    def draw(self, number):
+        """
+        Remove and return the process holding ticket number (0 <= number < total)
+        """
+        pos = 0
+        step = self._size
+        while step:
+            if pos + step <= self._size and self._tree[pos + step] <= number:
+                pos += step
+                number -= self._tree[pos]
+            step >>= 1
+        proc = self._procs[pos]
+        self._update(pos, -self._tickets[pos])
+        self._procs[pos] = None
+        self._tickets[pos] = 0
+        self._free.append(pos)
+        return proc
+
+    def __len__(self):
+        return self._size - len(self._free)
+
+    def __iter__(self):
+        return (proc for proc in self._procs if proc is not None)
+
+class Policy(object):
+    """
+    Policy: selection logic plugged into PolicyScheduler
+        * add(proc, cycle)     : proc becomes 'Ready' at cycle (arrival or end of I/O)
+        * select(cycle)        : remove and return the process to run at cycle (only called when ready processes exist)
+        * quantum(proc)        : time slice of proc (None: run until it blocks or terminates)
+        * expire(proc, cycle)  : proc used up its time slice and is 'Ready' again at cycle
+        * requeue(proc, cycle) : (preemptive policies) the running proc competes again at cycle
+        * len() and iteration over the 'Ready' processes
+    """
+    name = None
+    preemptive = False  # if True, the running process is requeued and select() is called at every cycle
+    sequence_options = ()  # options taking a sequence (a single value given for one is a one-item tuple)
+
+    def add(self, proc, cycle):
+        raise NotImplementedError
+
+    def select(self, cycle):
+        raise NotImplementedError
+
+    def quantum(self, proc):
+        return None
+
+    def expire(self, proc, cycle):
+        self.add(proc, cycle)
+
+    def requeue(self, proc, cycle):
+        self.add(proc, cycle)
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        raise NotImplementedError
+
+class FCFSPolicy(Policy):
+    """
+    FCFS: smallest ready time first, then smallest process ID
+    """
+    name = 'fcfs'
+
+    def __init__(self):
+        self._queue = HeapQueue(lambda p: (p.ready_time, p.proc_id))  # key functions are plain functions: policies are copied by snapshots
+
+    def add(self, proc, cycle):
+        self._queue.push(proc)
+
+    def select(self, cycle):
+        return self._queue.pop()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+class RRPolicy(FCFSPolicy):
+    """
+    RR: FCFS order with a time slice of quantum cycles
+    """
+    name = 'rr'
+
+    def __init__(self, quantum=2):
+        super(RRPolicy, self).__init__()
+        self._quantum = checkCount("quantum", quantum)
+
+    def quantum(self, proc):
+        return self._quantum
+
+class SRJFPolicy(Policy):
+    """
+    SRJF: smallest remaining CPU time first (preemptive), ties go to the process that has waited longest
+    """
+    name = 'srjf'
+    preemptive = True
+
+    def __init__(self):
+        self._queue = HeapQueue(lambda p: p.rem_cpu_time)
+
+    def add(self, proc, cycle):
+        self._queue.push(proc)
+
+    def select(self, cycle):
+        return self._queue.pop()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+class MLFQPolicy(Policy):
+    """
+    MLFQ: multi-level feedback queue
+        * new processes start at level 0; a process that uses up its time slice moves one level down
+        * a process keeps its level across I/O
+        * a ready process at a higher level preempts the running process
+        * every boost cycles all processes move back to level 0 (never if boost is None)
+    """
+    name = 'mlfq'
+    preemptive = True
+    sequence_options = ('quanta',)
+
+    def __init__(self, quanta=(2, 4, 8), boost=100):
+        self._quanta = tuple(checkCount("quanta", quantum) for quantum in quanta)
+        if not self._quanta:
+            raise ValueError("quanta must give at least one level")
+        self._boost = checkCount("boost", boost, allow_none=True)
+        self._next_boost = boost
+        self._queue = MultiLevelQueue(len(self._quanta))
+        self._level = {}  # proc_id => level (absent means level 0)
+
+    def _checkBoost(self, cycle):
+        if self._boost and cycle >= self._next_boost:
+            self._queue.merge()
+            self._level = {}
+            self._next_boost = cycle - cycle % self._boost + self._boost
+
+    def add(self, proc, cycle):
+        self._checkBoost(cycle)
+        self._queue.push(proc, self._level.get(proc.proc_id, 0))
+
+    def expire(self, proc, cycle):
+        self._checkBoost(cycle)
+        level = min(self._level.get(proc.proc_id, 0) + 1, len(self._quanta) - 1)
+        self._level[proc.proc_id] = level
+        self._queue.push(proc, level)
+
+    def requeue(self, proc, cycle):
+        self._checkBoost(cycle)
+        self._queue.push(proc, self._level.get(proc.proc_id, 0), front=True)  # keeps the CPU unless a higher level is ready
+
+    def select(self, cycle):
+        self._checkBoost(cycle)
+        return self._queue.pop()
+
+    def quantum(self, proc):
+        return self._quanta[self._level.get(proc.proc_id, 0)]
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+class PriorityPolicy(Policy):
+    """
+    Priority with aging (non-preemptive): smallest effective priority first
+        * effective priority = priority - aging * (cycles spent waiting)
+        * priority defaults to the planned CPU time; a number, a mapping (process ID => priority) or a function
+          of the process replaces it
+        * ordering by priority + aging * ready_time is equivalent and does not change while waiting,
+          so the queue is a plain heap
+    """
+    name = 'priority'
+
+    def __init__(self, aging=0.1, priority=None):
+        self._aging = checkNumber("aging", aging, minimum=0)
+        self._priority = perProcess("priority", priority, lambda p: p.cpu_time, checkNumber)
+        self._queue = HeapQueue(lambda p: (self._priority(p) + self._aging * p.ready_time, p.proc_id))
+
+    def add(self, proc, cycle):
+        self._queue.push(proc)
+
+    def select(self, cycle):
+        return self._queue.pop()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+class LotteryPolicy(Policy):
+    """
+    Lottery: draw the next process with probability proportional to its tickets, run it for one time slice
+        * tickets defaults to one ticket per process; a positive integer, a mapping (process ID => tickets) or a
+          function of the process replaces it
+        * draws use a random.Random(seed) generator, so runs are reproducible
+    """
+    name = 'lottery'
+
+    def __init__(self, quantum=2, seed=0, tickets=None):
+        self._quantum = checkCount("quantum", quantum)
+        self._random = random.Random(seed)
+        self._tickets = perProcess("tickets", tickets, lambda p: 1, checkCount)
+        self._tree = TicketTree()
+
+    def add(self, proc, cycle):
+        self._tree.add(proc, self._tickets(proc))
+
+    def select(self, cycle):
+        return self._tree.draw(self._random.randrange(self._tree.total))
+
+    def quantum(self, proc):
+        return self._quantum
+
+    def __len__(self):
+        return len(self._tree)
+
+    def __iter__(self):
+        return iter(self._tree)
+
+POLICIES = collections.OrderedDict((policy.name, policy) for policy in
+    [FCFSPolicy, RRPolicy, SRJFPolicy, MLFQPolicy, PriorityPolicy, LotteryPolicy])
+
+def makePolicy(name, **options):
+    """
+    Create a policy by name, passing options (e.g. quantum=4, seed=7) to its constructor
+        * a single value given for a sequence option (e.g. quanta=4 from "-o quanta=4") becomes a one-item tuple
+        * raise TypeError for an unknown option, ValueError for an invalid option value
+    """
+    policy = POLICIES[name]
+    for key in policy.sequence_options:
+        if key in options and not isinstance(options[key], (tuple, list)):
+            options[key] = (options[key],)
+    return policy(**options)
+
+class PolicyScheduler(Scheduler):
+    """
+    PolicyScheduler: generic scheduling engine driven by a Policy
+        Each cycle:
+            * enqueue new arrivals (sorted by process ID)
+            * if no process is 'Running' (or the policy is preemptive), select one from the policy
+            * execute 'Running' and 'Blocked' processes and record the cycle
+            * schedule the next cycle: block, terminate, expire or requeue the running process,
+              and hand processes finishing I/O back to the policy
+    """
+    def __init__(self, proc_list, policy):
+        super(PolicyScheduler, self).__init__(proc_list)
+        self.__algorithm = policy.name
+        self._policy = policy
+        self._requeued = None  # running process handed back to a preemptive policy
+
+    def start(self):
+        """
+        Main running cycle driven by the policy
+        """
+        super(PolicyScheduler, self).start()
+        policy = self._policy
+        running_proc = self._running_proc  # None unless resumed from a snapshot
+
+        # main iteration (from the cycle of the restored state when resumed)
+        for i in itertools.count(self._cycle):
+            if i >= self._next_check:
+                self._running_proc = running_proc  # part of the engine state kept by snapshots
+                if self._checkpoint(i):
+                    self._terminate(i)
+                    break
+            if not (running_proc or policy or self._arrivals or self._getScBlockedProcs()):
+                self._terminate(i)  # update end time with (i-1)
+                break
+
+            if i in self._arrivals:
+                for proc in self._getArrivalProcs(i):
+                    policy.add(proc.waiting(i), i)
+
+            if running_proc is None and policy:
+                running_proc = policy.select(i)
+                requeued = self._requeued
+                if requeued is not None and requeued is not running_proc:
+                    requeued.waiting(i)  # preempted: it has been 'Ready' since this cycle
+                self._requeued = None
+
+            if running_proc:
+                running_proc.running()
+            blocked_procs = self._executeBlockedProcs()
+            self._recordCycle(running_proc, blocked_procs, policy)
+            running_proc = self._scheduleNextCycle(i, running_proc, blocked_procs)
+
+    def _scheduleNextCycle(self, this_cycle, running_proc, blocked_procs):
+        """
+        Schedule for the next cycle and return the scheduled 'Running' process (None to let the policy select)
+        """
+        policy = self._policy
+        next_cycle = this_cycle + 1
+        if running_proc:
+            quantum = policy.quantum(running_proc)
+            # from 'Running' to 'Blocked'
+            if not running_proc.hasNoIO() and running_proc.toBlocked():
+                self._block(running_proc, this_cycle)
+                running_proc = None
+            # from 'Running' to terminate
+            elif running_proc.toTerminate():
+                self._finish(running_proc, this_cycle)
+                running_proc = None
+            # time slice used up: from 'Running' to 'Ready'
+            elif quantum is not None and running_proc.consecutive >= quantum:
+                policy.expire(running_proc.waiting(next_cycle), next_cycle)
+                running_proc = None
+            # compete again with the 'Ready' processes
+            elif policy.preemptive:
+                policy.requeue(running_proc, next_cycle)
+                self._requeued = running_proc
+                running_proc = None
+
+        # from 'Blocked' to 'Ready' (Ready at next cycle), by process ID
+        unblocked = self._finishedIO(blocked_procs, this_cycle)
+        for proc in sorted(unblocked, key=attrgetter('proc_id')):
+            self._unblock(proc, this_cycle)
+            policy.add(proc.waiting(next_cycle), next_cycle)
+        return running_proc
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
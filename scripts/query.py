@@ -0,0 +1,238 @@
+# -*- coding: utf-8  -*-
+"""
+Index over a recorded timeline (state intervals), for queries after a run
+
+    * per process: intervals sorted by start, for O(log n) state lookups and the history
+    * per state: a static interval tree (intervals sorted by start, implicit balanced tree
+      augmented with the largest end of each subtree), for point and range queries in O(log n + k)
+    * 'running' intervals never overlap (one CPU), so the running process at a cycle is one bisection
+
+Timelines come from a Scheduler, or from saved output in any format (see load()).
+"""
+import array
+import bisect
+import json
+import os
+import formats
+import utilities
+
+STATES = formats.STATES
+
+class IntervalTree(object):
+    """
+    IntervalTree: static interval tree over (proc_id, start, end) with inclusive ends
+        * the intervals sorted by start form an implicit balanced binary tree (the middle index is the root
+          of each range); max_end[i] is the largest end in the subtree rooted at i
+    """
+    def __init__(self, intervals):
+        intervals = sorted(intervals, key=lambda interval: (interval[1], interval[0]))
+        self.proc_ids = array.array('l', [interval[0] for interval in intervals])
+        self.starts = array.array('l', [interval[1] for interval in intervals])
+        self.ends = array.array('l', [interval[2] for interval in intervals])
+        self._max_end = array.array('l', self.ends)
+        self._augment(0, len(intervals))
+
+    def _augment(self, lo, hi):
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        self._max_end[mid] = max(self.ends[mid], self._augment(lo, mid), self._augment(mid + 1, hi))
+        return self._max_end[mid]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def maxEnd(self):
+        """
+        Return the largest end (-1 if empty)
+        """
+        return self._max_end[len(self.starts) // 2] if len(self.starts) else -1
+
+    def overlapping(self, first, last):
+        """
+        Generate (proc_id, start, end) of the intervals overlapping [first, last], by start
+        """
+        stack = [(0, len(self.starts))]
+        found = []
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] < first:  # nothing in this subtree reaches first
+                continue
+            stack.append((lo, mid))
+            if self.starts[mid] <= last:
+                if self.ends[mid] >= first:
+                    found.append(mid)
+                stack.append((mid + 1, hi))
+        for i in sorted(found):
+            yield (self.proc_ids[i], self.starts[i], self.ends[i])
+
+class TimelineIndex(object):
+    """
+    TimelineIndex: queries over the state intervals of a run
+        * stateAt(proc_id, cycle), runningAt(cycle), at(cycle): states at one cycle
+        * during(state, first, last, whole=False): processes in a state during a range of cycles
+        * history(proc_id): the state intervals of one process
+    """
+    def __init__(self, intervals):
+        by_state = dict((state, []) for state in STATES)
+        by_proc = {}
+        for proc_id, state, start, end in intervals:
+            by_state[state].append((proc_id, start, end))
+            by_proc.setdefault(proc_id, []).append((start, end, state))
+
+        self._procs = {}
+        for proc_id, history in by_proc.iteritems():
+            history.sort()
+            self._procs[proc_id] = (array.array('l', [start for start, end, state in history]),
+                                    array.array('l', [end for start, end, state in history]),
+                                    [state for start, end, state in history])
+        self._trees = dict((state, IntervalTree(by_state[state])) for state in STATES)
+        self.end_time = max([tree.maxEnd() for tree in self._trees.values()])  # last cycle in the timeline
+
+    @classmethod
+    def fromScheduler(cls, scheduler):
+        return cls(scheduler.intervals())
+
+    def processes(self):
+        """
+        Return the sorted IDs of the processes in the timeline
+        """
+        return sorted(self._procs)
+
+    def stateAt(self, proc_id, cycle):
+        """
+        Return the state of a process at a cycle (None if it was not in the timeline then)
+        """
+        if proc_id not in self._procs:
+            raise KeyError("no process %d in the timeline" % proc_id)
+        starts, ends, states = self._procs[proc_id]
+        i = bisect.bisect_right(starts, cycle) - 1
+        if i >= 0 and ends[i] >= cycle:
+            return states[i]
+        return None
+
+    def runningAt(self, cycle):
+        """
+        Return the ID of the process running at a cycle (None if the CPU was idle or the cycle not recorded)
+        """
+        tree = self._trees['running']  # sorted by start and never overlapping
+        i = bisect.bisect_right(tree.starts, cycle) - 1
+        if i >= 0 and tree.ends[i] >= cycle:
+            return tree.proc_ids[i]
+        return None
+
+    def at(self, cycle):
+        """
+        Return the sorted list of (proc_id, state) at a cycle
+        """
+        found = []
+        for state in STATES:
+            found += [(proc_id, state) for proc_id, start, end in self._trees[state].overlapping(cycle, cycle)]
+        return sorted(found)
+
+    def during(self, state, first, last, whole=False):
+        """
+        Return the sorted IDs of the processes in a state at some cycle of [first, last]
+        (at every cycle of it if whole is True)
+        """
+        if state not in self._trees:
+            raise KeyError("unknown state %r (choose from %s)" % (state, ", ".join(STATES)))
+        proc_ids = set()
+        for proc_id, start, end in self._trees[state].overlapping(first, last):
+            if not whole or (start <= first and end >= last):
+                proc_ids.add(proc_id)
+        return sorted(proc_ids)
+
+    def overlapping(self, state, first, last):
+        """
+        Generate (proc_id, start, end) of the intervals of a state overlapping [first, last]
+        """
+        return self._trees[state].overlapping(first, last)
+
+    def history(self, proc_id):
+        """
+        Return the list of (state, start, end) of a process
+        """
+        if proc_id not in self._procs:
+            raise KeyError("no process %d in the timeline" % proc_id)
+        starts, ends, states = self._procs[proc_id]
+        return zip(states, starts, ends)
+
+def textIntervals(f):
+    """
+    Generate (proc_id, state, start, end) from text or compact text output
+        * intervals are closed when the state of a process changes, or a cycle is missing
+    """
+    open_intervals = {}  # proc_id => [state, start, end]
+    for line in f:
+        if line == "\n":  # the blank line separating the cycles from the summary
+            break
+        fields = line.split()
+        if "-" in fields[0]:
+            first, last = [int(cycle) for cycle in fields[0].split("-")]
+        else:
+            first = last = int(fields[0])
+        states = dict((int(fields[i][:-1]), fields[i + 1]) for i in xrange(1, len(fields), 2))
+        for proc_id, interval in open_intervals.items():
+            if states.get(proc_id) != interval[0] or interval[2] != first - 1:
+                yield (proc_id, interval[0], interval[1], interval[2])
+                del open_intervals[proc_id]
+        for proc_id, state in states.iteritems():
+            if proc_id in open_intervals:
+                open_intervals[proc_id][2] = last
+            else:
+                open_intervals[proc_id] = [state, first, last]
+    for proc_id, interval in sorted(open_intervals.items()):
+        yield (proc_id, interval[0], interval[1], interval[2])
+
+def jsonIntervals(f):
+    """
+    Generate (proc_id, state, start, end) from JSON Lines output
+    """
+    for line in f:
+        record = json.loads(line)
+        if record['type'] == 'interval':
+            yield (record['proc_id'], record['state'], record['start'], record['end'])
+
+def csvIntervals(f):
+    """
+    Generate (proc_id, state, start, end) from CSV intervals output
+    """
+    f.readline()  # header
+    for line in f:
+        proc_id, state, start, end = line.strip().split(",")
+        yield (int(proc_id), state, int(start), int(end))
+
+def iterIntervals(path):
+    """
+    Generate (proc_id, state, start, end) from saved output, by extension: .bin, .jsonl, .csv, or text (.txt, .ctxt, ...)
+        * compressed output (.gz, .bz2, .xz after the extension) is read as it is decompressed
+        * intervals come in the order they were written (by end cycle for output of a full recording)
+    """
+    ext = os.path.splitext(utilities.splitCompression(path)[0])[1]
+    f = utilities.openFile(path, "rb" if ext == ".bin" else "r")
+    try:
+        if ext == ".bin":
+            intervals = formats.BinaryReader(f).intervals()
+        elif ext == ".jsonl":
+            intervals = jsonIntervals(f)
+        elif ext == ".csv":
+            intervals = csvIntervals(f)
+        else:
+            intervals = textIntervals(f)
+        for interval in intervals:
+            yield interval
+    finally:
+        f.close()
+
+def load(path):
+    """
+    Build a TimelineIndex from saved output (see iterIntervals())
+    """
+    return TimelineIndex(iterIntervals(path))
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
@@ -0,0 +1,280 @@
+# -*- coding: utf-8  -*-
+"""
+Monte Carlo replication: compare scheduling algorithms over many seeded random workloads
+
+Replication r draws a workload from the generator (scripts/generator.py) with seed + r and runs
+every algorithm on it. Running means and variances of the chosen metrics are kept per algorithm
+(Welford), and replication stops once the confidence interval of every metric is narrower than the
+target width. Replications run in a process pool but are accounted in seed order, so the result
+(and the replication at which it stops) does not depend on the number of workers.
+"""
+import math
+import multiprocessing
+import generator
+import policies
+from scheduler import Workload
+import utilities
+
+METRICS = ['makespan', 'utilization', 'turnaround', 'waiting', 'response', 'slowdown']
+LABELS = {'makespan': 'Finishing time', 'utilization': 'CPU utilization', 'turnaround': 'Mean turnaround',
+          'waiting': 'Mean waiting time', 'response': 'Mean response time', 'slowdown': 'Mean slowdown'}
+
+class RunningStat(object):
+    """
+    RunningStat: running mean and variance of a stream of values (Welford's algorithm, numerically stable)
+    """
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+
+    def variance(self):
+        """
+        Return the sample variance (None with fewer than two values)
+        """
+        return self._m2 / (self.n - 1) if self.n > 1 else None
+
+    def stddev(self):
+        variance = self.variance()
+        return None if variance is None else math.sqrt(variance)
+
+    def halfWidth(self, confidence=0.95):
+        """
+        Return the half width of the Student t confidence interval of the mean (None with fewer than two values)
+        """
+        if self.n < 2:
+            return None
+        return tQuantile(0.5 + confidence / 2.0, self.n - 1) * self.stddev() / math.sqrt(self.n)
+
+def normalQuantile(p):
+    """
+    Return the p-quantile of the standard normal distribution (Acklam's rational approximation, relative error < 1.2e-9)
+    """
+    if not 0 < p < 1:
+        raise ValueError("probability must be between 0 and 1")
+    a = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+    b = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01]
+    c = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+    d = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00]
+    if p < 0.02425:
+        q = math.sqrt(-2 * math.log(p))
+        return (((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) / \
+            ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1)
+    if p > 1 - 0.02425:
+        return -normalQuantile(1 - p)
+    q = p - 0.5
+    r = q * q
+    return (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q / \
+        (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1)
+
+def tQuantile(p, df):
+    """
+    Return the p-quantile of Student's t distribution with df degrees of freedom
+        * exact for 1 and 2 degrees of freedom, Cornish-Fisher expansion of the normal quantile otherwise
+          (error below 0.5% from 3 degrees of freedom at 95%)
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) * math.sqrt(2.0 / (4 * p * (1 - p)))
+    z = normalQuantile(p)
+    z2 = z * z
+    g1 = (z2 + 1) * z / 4.0
+    g2 = ((5 * z2 + 16) * z2 + 3) * z / 96.0
+    g3 = (((3 * z2 + 19) * z2 + 17) * z2 - 15) * z / 384.0
+    g4 = ((((79 * z2 + 776) * z2 + 1482) * z2 - 1920) * z2 - 945) * z / 92160.0
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+def parseAlgorithm(spec):
+    """
+    Parse an algorithm spec: a policy name, optionally followed by options, e.g. "rr:quantum=4" or
+    "mlfq:quanta=2,4,8:boost=50"; return (spec, name, options)
+    """
+    fields = spec.split(":")
+    name = fields[0]
+    if name not in policies.POLICIES:
+        raise ValueError("unknown policy %r (choose from %s)" % (name, ", ".join(policies.POLICIES)))
+    options = {}
+    for item in fields[1:]:
+        if "=" not in item:
+            raise ValueError("policy option %r is not in KEY=VALUE form" % item)
+        key, value = item.split("=", 1)
+        values = [convert(v) for v in value.split(",")]
+        options[key] = tuple(values) if len(values) > 1 else values[0]
+    policies.makePolicy(name, **options)  # raises TypeError for unknown options, ValueError for invalid values
+    return (spec, name, options)
+
+def convert(value):
+    """
+    Convert an option value to an integer or a float if it is one
+    """
+    for t in [int, float]:
+        try:
+            return t(value)
+        except ValueError:
+            pass
+    return value
+
+def runMetrics(scheduler):
+    """
+    Return the replication metrics of a finished scheduler run as a dict
+        * makespan (finishing time) and utilization as in the summary
+        * means over the processes of turnaround, waiting time ('Ready' cycles), response time and slowdown
+    """
+    stat = scheduler.getStat()
+    turnaround = waiting = response = slowdown = 0.0
+    procs = scheduler._proc_list
+    for proc in procs:
+        proc_turnaround = proc.fin_time - proc.arr_time + 1
+        service = proc.total_cpu_time + proc.io_time
+        turnaround += proc_turnaround
+        waiting += proc_turnaround - service - proc.io_wait
+        response += proc.first_run - proc.arr_time
+        slowdown += float(proc_turnaround) / service
+    n = float(len(procs) or 1)
+    return {'makespan': stat[0], 'utilization': float(stat[1]), 'turnaround': turnaround / n,
+            'waiting': waiting / n, 'response': response / n, 'slowdown': slowdown / n}
+
+def runReplication(task):
+    """
+    Run every algorithm on the workload of one seed; return a list of metric dicts (one per algorithm)
+        * task: (workload parameters, seed, list of (spec, name, options)); a module-level function for the pool
+    """
+    params, seed, algorithms = task
+    workload = Workload.fromRecords(generator.WorkloadGenerator(seed=seed, **params))
+    results = []
+    for spec, name, options in algorithms:
+        scheduler = policies.PolicyScheduler(workload, policies.makePolicy(name, **options))
+        scheduler.setRecording('none')
+        scheduler.start()
+        results.append(runMetrics(scheduler))
+    return results
+
+class Replicator(object):
+    """
+    Replicator: replicate seeded workloads until every confidence interval is narrow enough
+        * params    : WorkloadGenerator parameters (count, arrival, rate, ...), without seed
+        * algorithms: algorithm specs (see parseAlgorithm())
+        * metrics   : names from METRICS (default: all)
+        * width     : target width of the confidence intervals (the whole interval, i.e. twice the half width);
+                      a fraction of the mean if relative is True
+        * confidence: confidence level of the intervals (default: 0.95)
+        * at least min_reps and at most max_reps replications; seeds are seed, seed + 1, ...
+        * workers   : pool size (default: number of CPUs; 1 runs in this process)
+    """
+    def __init__(self, params, algorithms, metrics=None, width=1.0, relative=False, confidence=0.95,
+                 min_reps=10, max_reps=1000, workers=None, seed=0):
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        if width <= 0:
+            raise ValueError("target width must be positive")
+        if min_reps < 2 or max_reps < min_reps:
+            raise ValueError("need 2 <= min_reps <= max_reps")
+        self.metrics = list(metrics or METRICS)
+        unknown = set(self.metrics) - set(METRICS)
+        if unknown:
+            raise ValueError("unknown metric(s): %s (choose from %s)" % (", ".join(sorted(unknown)), ", ".join(METRICS)))
+        self.params = dict(params)
+        generator.WorkloadGenerator(seed=seed, **self.params)  # raises ValueError or TypeError for bad parameters
+        self.algorithms = [parseAlgorithm(spec) for spec in algorithms]
+        self.width = width
+        self.relative = relative
+        self.confidence = confidence
+        self.min_reps = min_reps
+        self.max_reps = max_reps
+        self.workers = workers or multiprocessing.cpu_count()
+        self.seed = seed
+        self.stats = [dict((metric, RunningStat()) for metric in self.metrics) for algorithm in self.algorithms]
+        self.replications = 0
+        self.converged = False
+
+    def targetWidth(self, stat):
+        """
+        Return the target interval width for a metric (absolute, or relative to its mean)
+        """
+        return self.width * abs(stat.mean) if self.relative else self.width
+
+    def isConverged(self):
+        """
+        Check whether every confidence interval is narrower than its target width
+        """
+        for stats in self.stats:
+            for stat in stats.values():
+                half_width = stat.halfWidth(self.confidence)
+                if half_width is None or 2 * half_width > self.targetWidth(stat):
+                    return False
+        return True
+
+    def add(self, results):
+        """
+        Account the results of one replication
+        """
+        for stats, result in zip(self.stats, results):
+            for metric, stat in stats.iteritems():
+                stat.add(result[metric])
+        self.replications += 1
+
+    def run(self, progress=None):
+        """
+        Replicate until converged or max_reps; progress (if given) is called with the Replicator after each replication
+        """
+        tasks = ((self.params, self.seed + r, self.algorithms) for r in xrange(self.replications, self.max_reps))
+        pool = None
+        if self.workers > 1:
+            pool = multiprocessing.Pool(self.workers)
+            results = pool.imap(runReplication, tasks)  # in seed order, whatever the worker that ran it
+        else:
+            results = (runReplication(task) for task in tasks)
+        try:
+            for result in results:
+                self.add(result)
+                if progress:
+                    progress(self)
+                if self.replications >= self.min_reps and self.isConverged():
+                    self.converged = True
+                    break
+        finally:
+            if pool is not None:
+                pool.terminate()  # replications still running are not needed
+                pool.join()
+        return self
+
+    def summary(self):
+        """
+        Return a list of (spec, metric, mean, half width, standard deviation) rows
+        """
+        rows = []
+        for (spec, name, options), stats in zip(self.algorithms, self.stats):
+            for metric in self.metrics:
+                stat = stats[metric]
+                rows.append((spec, metric, stat.mean, stat.halfWidth(self.confidence), stat.stddev()))
+        return rows
+
+    def output(self):
+        """
+        Return the summary as text
+        """
+        if self.converged:
+            status = "every %g%% confidence interval narrower than %g%s" % \
+                (self.confidence * 100, self.width, " of the mean" if self.relative else "")
+        else:
+            status = "not converged after the maximum number of replications"
+        lines = ["Replications: %d (%s)" % (self.replications, status)]
+        for spec, metric, mean, half_width, stddev in self.summary():
+            if half_width is None:
+                lines.append("%s %s: %.4f" % (spec, LABELS[metric], mean))
+            else:
+                lines.append("%s %s: %.4f +- %.4f (sd %.4f)" % (spec, LABELS[metric], mean, half_width, stddev))
+        return "".join([line + "\n" for line in lines])
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
@@ -1,20 +1,32 @@
 # -*- coding: utf-8  -*-
+import array
+import bisect
 import collections
 import decimal
 import itertools
 import copy
+import math
+import random
+import threading
+import time
 from operator import attrgetter
+import devices
 import utilities
 
 class PlannedProcess(object):
     """
     PlannedProcess: a single process with planned CPU, I/O and Arrival Time
+        * bursts (optional): alternating CPU and I/O burst lengths [cpu, io, cpu, ..., cpu];
+          when not set, I/O splits the CPU time in two halves (cpu_time / 2 rounded up each)
     """
+    __slots__ = ('__proc_id', '__cpu_time', '__io_time', '__arr_time', '__bursts')
+    
     def __init__(self, proc_id=-1):
         self.__proc_id = proc_id
         self.__cpu_time = -1
         self.__io_time = -1
         self.__arr_time = -1
+        self.__bursts = None
     
     @property
     def proc_id(self):
@@ -48,37 +60,238 @@ class PlannedProcess(object):
     def arr_time(self, value):
         self.__arr_time = value     
     
+    @property
+    def bursts(self):
+        return self.__bursts
+    
+    @bursts.setter
+    def bursts(self, value):
+        """
+        Set the burst sequence (odd length: starts and ends with a CPU burst);
+        cpu_time and io_time become the total CPU and I/O time
+        """
+        self.__bursts = list(value)
+        self.__cpu_time = sum(self.__bursts[0::2])
+        self.__io_time = sum(self.__bursts[1::2])
+    
     def __str__(self):
         return "Process ID: %d    CPU Time: %d    I/O Time: %d    Arrival Time: %d" % \
             (self.proc_id, self.cpu_time, self.io_time, self.arr_time)
         
+class Workload(object):
+    """
+    Workload: the planned parameters of a list of processes, held once and shared read-only by any number of runs
+        * proc_ids, cpu_times, io_times, arr_times: arrays with one entry per process (in input order)
+        * the burst plan of each process is computed once (equal plans are shared)
+        * processes() returns fresh Process objects for one run; each holds only its runtime state and reads
+          its planned parameters from the workload. Setting a planned parameter of one of them first copies
+          the process out of the workload (copy-on-write), so the workload never changes
+    """
+    def __init__(self, procs=()):
+        self.proc_ids = array.array('l')
+        self.cpu_times = array.array('l')
+        self.io_times = array.array('l')
+        self.arr_times = array.array('l')
+        self._bursts = {}  # index => bursts (multi-burst processes only)
+        self._plans = []   # index => (total CPU time, I/O bursts, remaining CPU time at the start of each I/O burst)
+        self._shared = True
+        plans = {}
+        for proc in procs:
+            self._append(proc.proc_id, proc.cpu_time, proc.io_time, proc.arr_time, proc.bursts, plans)
+    
+    @classmethod
+    def fromRecords(cls, records):
+        """
+        Build a workload from (proc_id, cpu_time, io_time, arr_time) tuples
+        """
+        workload = cls()
+        plans = {}
+        for proc_id, cpu_time, io_time, arr_time in records:
+            workload._append(proc_id, cpu_time, io_time, arr_time, None, plans)
+        return workload
+    
+    @classmethod
+    def _private(cls, proc_id, cpu_time=-1, io_time=-1, arr_time=-1, bursts=None):
+        """
+        One-process workload owned by a single Process (planned parameters may still be set)
+        """
+        workload = cls()
+        workload._shared = False
+        workload._append(proc_id, cpu_time, io_time, arr_time, bursts, None)
+        return workload
+    
+    def _append(self, proc_id, cpu_time, io_time, arr_time, bursts, plans):
+        i = len(self.proc_ids)
+        self.proc_ids.append(proc_id)
+        self.cpu_times.append(cpu_time)
+        self.io_times.append(io_time)
+        self.arr_times.append(arr_time)
+        if bursts is not None:
+            self._bursts[i] = tuple(bursts)
+        self._plans.append(None if plans is None else self._plan(i, plans))
+    
+    def _plan(self, i, plans=None):
+        """
+        Compute the burst plan of process i (shared with equal plans found in plans)
+        """
+        bursts = self._bursts.get(i)
+        key = (self.cpu_times[i], self.io_times[i]) if bursts is None else bursts  # bursts have odd length
+        if plans is not None and key in plans:
+            return plans[key]
+        if bursts is None:
+            if self.io_times[i] == 0:
+                bursts = (self.cpu_times[i],)
+            else:
+                half = utilities.roundup(self.cpu_times[i] / 2.0)  # each half of the CPU time (rounded up)
+                bursts = (half, self.io_times[i], half)
+        total = sum(bursts[0::2])
+        block_rems = []
+        rem = total
+        for cpu_burst in bursts[0:-1:2]:
+            rem -= cpu_burst
+            block_rems.append(rem)
+        plan = (total, tuple(bursts[1::2]), tuple(block_rems))
+        if plans is not None:
+            plans[key] = plan
+        return plan
+    
+    def __len__(self):
+        return len(self.proc_ids)
+    
+    def bursts(self, i):
+        """
+        Return the bursts of process i (None if given by CPU and I/O time)
+        """
+        bursts = self._bursts.get(i)
+        return None if bursts is None else list(bursts)
+    
+    def prefix(self, cutoff):
+        """
+        Return the workload of the processes arriving before cycle cutoff (sharing the burst plans of this one)
+        """
+        workload = type(self)()
+        for i, arr_time in enumerate(self.arr_times):
+            if arr_time < cutoff:
+                if i in self._bursts:
+                    workload._bursts[len(workload.proc_ids)] = self._bursts[i]
+                workload.proc_ids.append(self.proc_ids[i])
+                workload.cpu_times.append(self.cpu_times[i])
+                workload.io_times.append(self.io_times[i])
+                workload.arr_times.append(arr_time)
+                workload._plans.append(self._plans[i])
+        return workload
+    
+    def processes(self):
+        """
+        Return a new list of Process objects (ready to be scheduled) for one run
+        """
+        return [Process(proc_id, self, i) for i, proc_id in enumerate(self.proc_ids)]
+
 class Process(PlannedProcess):
     """
     Process: a single process which is being scheduled and updated in each cycle clock
+        * the planned parameters (proc_id, cpu_time, io_time, arr_time, bursts) live in a Workload, shared
+          with the other runs of that workload; the process itself only holds the runtime state
+        * Process(proc_id) alone owns a private one-process workload, so that its planned parameters can be set
+        * a PlannedProcess whose planned parameters are read from the workload (the slots of the base class are unused)
     """
-    def __init__(self, proc_id=-1):
-        super(Process, self).__init__(proc_id)
+    __slots__ = ('__proc_id', '__workload', '__index', '__plan', '__fin_time', '__phase', '__block_at',
+                 '__rem_cpu_time', '__rem_io_time', '__ready_time', '__state', '__consecutive', '__first_run', '__io_wait')
+    _SLOTS = tuple('_Process' + name for name in __slots__)  # mangled attribute names, for copies
+    
+    def __init__(self, proc_id=-1, workload=None, index=0):
+        if workload is None:
+            workload = Workload._private(proc_id)
+        self.__proc_id = proc_id
+        self.__workload = workload
+        self.__index = index
         self.__fin_time = -1  # cycle this process finished (last running cycle before it terminated)
-        self.__first_half = 0
-        self.__second_half = 0
-        self.__total_cpu_time = 0
-        self.__rem_cpu_time = 0
-        self.__rem_io_time = 0
         self.__ready_time = -1  # the first cycle at which this process becomes 'Ready' 
         self.__state = None  #  current state (Running, Ready and Blocked)
         self.__consecutive = 0  # consecutive running cycles
-
+        self.__first_run = -1  # first cycle this process was 'Running'
+        self.__io_wait = 0  # cycles spent 'Blocked' in I/O device queues (see scripts/devices.py)
+        self.propagate()
     
-    def propagate(self):
+    def _own(self):
+        """
+        Copy the planned parameters out of a shared workload before one of them is changed
+        """
+        if self.__workload._shared:
+            workload, i = self.__workload, self.__index
+            self.__workload = Workload._private(self.__proc_id, workload.cpu_times[i], workload.io_times[i],
+                                                workload.arr_times[i], workload._bursts.get(i))
+            self.__index = 0
+        self.__workload._plans[0] = None
+        return self.__workload
+    
+    @property
+    def proc_id(self):
+        return self.__proc_id
+    
+    @proc_id.setter
+    def proc_id(self, value):
+        self._own().proc_ids[0] = value
+        self.__proc_id = value
+    
+    @property
+    def cpu_time(self):
+        return self.__workload.cpu_times[self.__index]
+    
+    @cpu_time.setter
+    def cpu_time(self, value):
+        self._own().cpu_times[0] = value
+           
+    @property
+    def io_time(self):
+        return self.__workload.io_times[self.__index]
+    
+    @io_time.setter
+    def io_time(self, value):
+        self._own().io_times[0] = value
+    
+    @property
+    def arr_time(self):
+        return self.__workload.arr_times[self.__index]
+    
+    @arr_time.setter
+    def arr_time(self, value):
+        self._own().arr_times[0] = value
+    
+    @property
+    def bursts(self):
+        return self.__workload.bursts(self.__index)
+    
+    @bursts.setter
+    def bursts(self, value):
         """
-        Propagate planned parameters (in base class) to current class
-            * Called after planned parameters (cpu_time, io_time) are set
+        Set the burst sequence (odd length: starts and ends with a CPU burst);
+        cpu_time and io_time become the total CPU and I/O time
         """
-        self.__first_half = utilities.roundup(self.cpu_time / 2.0)   # first half cycles of CPU time
-        self.__second_half = utilities.roundup(self.cpu_time / 2.0)  # second half cycles of CPU time
-        self.__total_cpu_time = self.__first_half + self.__second_half if not self.hasNoIO() else self.cpu_time # total CPU cycles (rounded up)
-        self.__rem_cpu_time = self.__total_cpu_time  # remaining CPU cycles
-        self.__rem_io_time = self.io_time
+        workload = self._own()
+        workload._bursts[0] = tuple(value)
+        workload.cpu_times[0] = sum(workload._bursts[0][0::2])
+        workload.io_times[0] = sum(workload._bursts[0][1::2])
+    
+    def propagate(self):
+        """
+        Propagate planned parameters (in the workload) to the runtime state
+            * Called after planned parameters (cpu_time, io_time, or bursts) are set
+            * burst boundaries are computed once per workload, so that toBlocked() is a single comparison
+        """
+        plans = self.__workload._plans
+        if plans[self.__index] is None:
+            if self.cpu_time < 0:
+                self.__plan = (0, (), ())  # planned parameters not set yet
+                self.__rem_cpu_time = self.__rem_io_time = self.__phase = 0
+                self.__block_at = -1
+                return
+            plans[self.__index] = self.__workload._plan(self.__index)
+        self.__plan = plans[self.__index]
+        self.__rem_cpu_time = self.__plan[0]  # remaining CPU cycles
+        self.__phase = 0  # number of I/O bursts started
+        self.__block_at = self.__plan[2][0] if self.__plan[2] else -1  # remaining CPU time at which the next I/O burst starts (-1: no more I/O)
+        self.__rem_io_time = 0
                    
     @property
     def state(self):
@@ -92,20 +305,40 @@ class Process(PlannedProcess):
     def rem_cpu_time(self):
         return self.__rem_cpu_time
     
+    @property
+    def rem_io_time(self):
+        return self.__rem_io_time
+    
     @property
     def ready_time(self):
         return self.__ready_time
     
+    @property
+    def consecutive(self):
+        return self.__consecutive
+    
+    @property
+    def first_run(self):
+        return self.__first_run
+    
+    @property
+    def io_wait(self):
+        return self.__io_wait
+    
+    @property
+    def total_cpu_time(self):
+        return self.__plan[0]
+    
+    @property
+    def phase(self):
+        return self.__phase
+    
     def isFirstHalf(self):
         """
         For processes that have I/O time
-            Check whether this process is in still the first half of CPU cycles
+            Check whether this process has not started its first I/O burst yet
         """
-        passed_time = self.__total_cpu_time - self.__rem_cpu_time
-        if passed_time < self.__first_half:
-            return True
-        else:
-            return False
+        return self.__phase == 0
     
     def hasNoIO(self):
         """
@@ -120,12 +353,9 @@ class Process(PlannedProcess):
         """
         For 'Running' process:
             Check whether this 'Running' process is to transit from 'Running' to 'Blocked' in the next cycle
-            If this 'Running' process has finished its "First Half" and has full I/O time remained, it is to be 'Blocked'
+            It is to be 'Blocked' when it has just finished a CPU burst followed by an I/O burst
         """
-        if not self.isFirstHalf():
-            if self.__rem_io_time == self.io_time:
-                return True
-        return False
+        return self.__rem_cpu_time == self.__block_at
     
     def toTerminate(self):
         """
@@ -163,6 +393,15 @@ class Process(PlannedProcess):
             utilities.output.error("Cannot run this process any more: CPU time exhausted.")
         return self
     
+    def startIO(self):
+        """
+        Start the next I/O burst (when the process is moved to 'Blocked')
+        """
+        total, io_bursts, block_rems = self.__plan
+        self.__rem_io_time = io_bursts[self.__phase]
+        self.__phase += 1
+        self.__block_at = block_rems[self.__phase] if self.__phase < len(block_rems) else -1
+
     def blocked(self):
         """
         Blocked for one cycle
@@ -175,6 +414,20 @@ class Process(PlannedProcess):
             utilities.output.error("Cannot block this process any more: I/O time exhausted.")
         return self
     
+    def queued(self, cycles):
+        """
+        Add cycles waited in an I/O device queue before a burst started
+        """
+        self.__io_wait += cycles
+    
+    def endIO(self):
+        """
+        End the current I/O burst at once (served by an I/O device, see scripts/devices.py)
+        """
+        self.__rem_io_time = 0
+        self.__state = 'Blocked'
+        self.__consecutive = 0
+    
     def waiting(self, ready_time):
         """
         Waiting in the queue (Ready)
@@ -184,24 +437,77 @@ class Process(PlannedProcess):
         self.__consecutive = 0  # clear consecutive running
         return self
     
+    def dispatch(self, cycle):
+        """
+        Note the first cycle at which this process is 'Running'
+        """
+        if self.__first_run < 0:
+            self.__first_run = cycle
+    
     def finish(self, fin_time):
         """
         Finish at fin_time (last 'Running' cycle)
         """
         self.__fin_time = fin_time
         
+    def __deepcopy__(self, memo):
+        """
+        Copy for snapshots: the runtime state is numbers and strings, and a shared workload is never changed,
+        so it is kept; a private workload (whose planned parameters may still be set) is copied with the process
+        """
+        proc = object.__new__(type(self))
+        for name in self._SLOTS:
+            setattr(proc, name, getattr(self, name))
+        if not self.__workload._shared:
+            proc.__workload = copy.deepcopy(self.__workload, memo)
+        memo[id(self)] = proc
+        return proc
+    
     def __str__(self):
-        planned = super(Process, self).__str__()
+        planned = "Process ID: %d    CPU Time: %d    I/O Time: %d    Arrival Time: %d" % \
+            (self.proc_id, self.cpu_time, self.io_time, self.arr_time)
         realtime = "State: %s    Remaining CPU Time: %d    Ready Time: %d    Finishing Time: %d" % \
             (self.state, self.rem_cpu_time, self.ready_time, self.fin_time)
         return planned + '\n' + realtime + '\n'
         
+class Observer(object):
+    """
+    Observer: receives scheduling events from a Scheduler (see Scheduler.addObserver())
+        Override any of the methods; each gets the cycle of the event and the process ID
+            * onArrival  : the process arrives
+            * onDispatch : the process starts 'Running' (first time or after preemption, I/O or waiting)
+            * onPreempt  : the process stops 'Running' while it still has CPU time left and is not blocked
+            * onBlock    : the process is 'Blocked' from this cycle
+            * onUnblock  : the process is 'Ready' again from this cycle (I/O done)
+            * onComplete : the process finished (last 'Running' cycle)
+    """
+    def onArrival(self, cycle, proc_id):
+        pass
+    
+    def onDispatch(self, cycle, proc_id):
+        pass
+    
+    def onPreempt(self, cycle, proc_id):
+        pass
+    
+    def onBlock(self, cycle, proc_id):
+        pass
+    
+    def onUnblock(self, cycle, proc_id):
+        pass
+    
+    def onComplete(self, cycle, proc_id):
+        pass
+
 class Scheduler(object):
     """
-    Scheduler: schedule a list Process objects
+    Scheduler: schedule a list Process objects, or a Workload (each scheduler then gets its own
+    Process objects over the shared planned parameters)
         To be extended by different algorithm scheduler classes
     """
     def __init__(self, proc_list):
+        if isinstance(proc_list, Workload):
+            proc_list = proc_list.processes()
         self._proc_list = proc_list
         self._arrivals = collections.OrderedDict()  # ordered dictionary mapping arrival time to a list of processes
         self._arr_times = []  # list of times at which new process(es) will arrive
@@ -213,6 +519,284 @@ class Scheduler(object):
         self._end_time = 0   # ending cycle
         self._reformat = []
         self._stat = []  # statistics
+        self._cycle = 0      # number of cycles recorded so far
+        self._cpu_work = 0   # number of cycles with a 'Running' process
+        self._record_mode = 'full'
+        self._record_cycles = None  # cycles of the kept records (None: every cycle is kept, index is the cycle)
+        self._next_kept = 0  # next cycle to keep (when not every cycle is kept)
+        self._next_kept_step = None  # function returning the cycle to keep after a kept cycle
+        self._reservoir = None     # (capacity, random generator) when sampled cycles are kept by reservoir sampling
+        self._sampled = 0
+        self._max_cycles = None   # budget: maximum number of simulated cycles
+        self._max_seconds = None  # budget: maximum wall-clock seconds
+        self._cancel = threading.Event()
+        self._progress = None     # progress callback
+        self._progress_interval = 1.0
+        self._next_progress = 0
+        self._next_check = 0      # next cycle at which budgets, cancellation and progress are checked
+        self._started = None      # wall-clock time at start()
+        self._stopped = None      # reason the simulation stopped early (None if it ran to completion)
+        self._observers = []
+        self._last_running = None  # 'Running' process of the previous cycle (only tracked with observers)
+        self._prepared = False     # prolog() done (a run resumed from a snapshot skips it)
+        self._snapshot_interval = None
+        self._next_snapshot = 0
+        self._snapshots = []       # list of (cycle, engine state at the start of that cycle)
+        self._devices = None       # DeviceModel when I/O devices are modelled (see setDevices())
+    
+    def addObserver(self, observer):
+        """
+        Register an Observer for scheduling events
+            Dispatch and preemption are detected per cycle, so that detection is only switched in
+            while at least one observer is registered: without observers the main iteration is unchanged
+        """
+        self._observers.append(observer)
+        self._recordCycle = self._observedRecordCycle  # shadows the class method for this scheduler only
+    
+    def removeObserver(self, observer):
+        self._observers.remove(observer)
+        if not self._observers:
+            del self._recordCycle
+    
+    def _notify(self, event, cycle, proc_id):
+        for observer in self._observers:
+            getattr(observer, event)(cycle, proc_id)
+    
+    def _observedRecordCycle(self, running_proc=None, blocked_procs=[], ready_procs=[]):
+        """
+        _recordCycle() with dispatch and preemption events
+        """
+        cycle = self._cycle
+        last = self._last_running
+        if running_proc is not last:
+            # the last 'Running' process neither finished nor blocked: preempted
+            if last is not None and last.fin_time < 0 and last not in self._blocked_procs:
+                self._notify('onPreempt', cycle, last.proc_id)
+            if running_proc is not None:
+                self._notify('onDispatch', cycle, running_proc.proc_id)
+            self._last_running = running_proc
+        type(self)._recordCycle(self, running_proc, blocked_procs, ready_procs)
+    
+    def _finish(self, proc, this_cycle):
+        """
+        Terminate a process whose last 'Running' cycle is this_cycle
+        """
+        proc.finish(this_cycle)
+        if self._observers:
+            self._notify('onComplete', this_cycle, proc.proc_id)
+    
+    def _block(self, proc, this_cycle):
+        """
+        Move the 'Running' process to 'Blocked' (for its next I/O burst) from the next cycle
+        """
+        proc.startIO()
+        self._setScBlockedProc(proc)
+        if self._devices is not None:
+            self._devices.submit(proc, this_cycle)
+        if self._observers:
+            self._notify('onBlock', this_cycle + 1, proc.proc_id)
+    
+    def _unblock(self, proc, this_cycle):
+        """
+        Remove a process that finished its I/O from 'Blocked' ('Ready' from the next cycle)
+        """
+        self._unsetScBlockedProc(proc)
+        if self._observers:
+            self._notify('onUnblock', this_cycle + 1, proc.proc_id)
+    
+    CHECK_CYCLES = 256  # cycles between two checks of budgets, cancellation and progress
+    
+    def setBudget(self, max_cycles=None, max_seconds=None, cancel_event=None):
+        """
+        Limit the simulation (to be called before start())
+            * max_cycles  : stop after simulating this many cycles
+            * max_seconds : stop after this many wall-clock seconds
+            * cancel_event: threading.Event shared with other runs (default: own event, set by cancel())
+            A stopped simulation keeps partial statistics (see stopped())
+        """
+        self._max_cycles = max_cycles
+        self._max_seconds = max_seconds
+        if cancel_event is not None:
+            self._cancel = cancel_event
+    
+    def setProgress(self, callback=None, interval=1.0):
+        """
+        Report progress every interval seconds (to be called before start())
+            * callback receives a dict with cycle, finished, remaining, elapsed and rate (cycles per second)
+            * the default callback writes a line to standard error
+        """
+        self._progress = callback or printProgress
+        self._progress_interval = interval
+    
+    def cancel(self):
+        """
+        Cooperatively cancel a running simulation (safe to call from another thread or a signal handler)
+        """
+        self._cancel.set()
+    
+    def stopped(self):
+        """
+        Return why the simulation stopped early ('cycle budget', 'time budget' or 'cancelled'), or None
+        """
+        return self._stopped
+    
+    def progress(self, cycle=None):
+        """
+        Return the current progress as a dict
+        """
+        if cycle is None:
+            cycle = self._cycle
+        finished = sum(1 for proc in self._proc_list if proc.fin_time >= 0)
+        elapsed = time.time() - self._started if self._started else 0.0
+        return {'cycle': cycle, 'finished': finished, 'remaining': len(self._proc_list) - finished,
+                'elapsed': elapsed, 'rate': cycle / elapsed if elapsed > 0 else 0.0}
+    
+    def _checkpoint(self, cycle):
+        """
+        Check budgets, cancellation and progress (called from the main iteration when cycle reaches self._next_check)
+        and take a snapshot if one is due
+            Return True if the simulation is to stop; the reason is kept in self._stopped
+        """
+        if self._snapshot_interval and cycle >= self._next_snapshot:
+            self._next_snapshot = cycle + self._snapshot_interval
+            self._snapshots.append((cycle, self.saveState()))
+        self._next_check = cycle + self.CHECK_CYCLES
+        reason = None
+        if self._max_cycles is not None:
+            if cycle >= self._max_cycles:
+                reason = 'cycle budget'
+            self._next_check = min(self._next_check, self._max_cycles)
+        if self._cancel.is_set():
+            reason = 'cancelled'
+        if self._max_seconds is not None or self._progress:
+            now = time.time()
+            if self._max_seconds is not None and now - self._started >= self._max_seconds:
+                reason = 'time budget'
+            if self._progress and now >= self._next_progress:
+                self._next_progress = now + self._progress_interval
+                self._progress(self.progress(cycle))
+        # nothing is stopped if every process has already finished
+        if reason and any(proc.fin_time < 0 for proc in self._proc_list):
+            self._stopped = reason
+            return True
+        return False
+
+    # attributes not part of the engine state: the record, output caches, callbacks and the snapshots themselves
+    UNSAVED = frozenset(['_record', '_record_cycles', '_next_kept_step', '_reservoir', '_reformat', '_stat', '_observers', '_recordCycle',
+                         '_cancel', '_progress', '_snapshots'])
+    
+    def setSnapshots(self, interval=4096):
+        """
+        Keep the engine state every interval cycles (rounded up to CHECK_CYCLES) so that a finished run
+        can be resumed from the middle with changed processes (see scripts/whatif.py); to be called before start()
+        """
+        self._snapshot_interval = max(interval, 1)
+        self._next_snapshot = 0
+        self._snapshots = []
+    
+    def saveState(self):
+        """
+        Return a copy of the engine state (at the start of a cycle: queues, processes, arrivals, counters)
+            Finished processes never change again, so they are shared instead of copied
+        """
+        state = dict((key, value) for key, value in self.__dict__.iteritems() if key not in self.UNSAVED)
+        memo = dict((id(proc), proc) for proc in self._proc_list if proc.fin_time >= 0)
+        return copy.deepcopy(state, memo)
+    
+    def restoreState(self, state):
+        """
+        Restore an engine state returned by saveState() (the state itself is left unchanged, so it can be restored again)
+        """
+        memo = dict((id(proc), proc) for proc in state['_proc_list'] if proc.fin_time >= 0)
+        self.__dict__.update(copy.deepcopy(state, memo))
+    
+    def setDevices(self, count, discipline='fifo', priority='io'):
+        """
+        Serve I/O bursts with count devices, each with its own queue, instead of infinitely parallel I/O
+        (to be called before start(); see scripts/devices.py)
+            * discipline: 'fifo' or 'priority' (smallest priority key first: 'io', 'cpu' or 'id')
+        """
+        self._devices = devices.DeviceModel(count, discipline, priority)
+    
+    def deviceStat(self):
+        """
+        Return the statistics of the I/O devices (see DeviceModel.stat()), or None without devices
+        """
+        if self._devices is None:
+            return None
+        return self._devices.stat(self._end_time)
+    
+    def _deviceLines(self):
+        """
+        Return the summary lines of the I/O devices (none without devices)
+        """
+        if self._devices is None:
+            return []
+        return self._devices.lines(self._end_time)
+    
+    SAMPLE_CAPACITY = 100000  # cycles kept at most by the 'sample' recording mode unless given
+    
+    def setRecording(self, mode='full', capacity=None, every=None, rate=None, seed=0):
+        """
+        Choose which cycles are kept in the record (to be called before start())
+            * 'full'   : every cycle (default)
+            * 'ring'   : only the most recent capacity cycles
+            * 'sample' : every Nth cycle (every=N), or a random subset with probability rate (rate=P, seeded),
+                         at most capacity cycles (default SAMPLE_CAPACITY): every=N keeps the most recent ones,
+                         rate=P a uniform random subset of the sampled cycles (reservoir sampling)
+            * 'none'   : no cycle, only statistics
+            Statistics (finishing time, CPU utilization, turnaround) are exact in every mode;
+            output() and the other writers show only the kept cycles.
+            Memory for the record is bounded by capacity in the 'ring' and 'sample' modes.
+        """
+        self._reservoir = None
+        if mode == 'full':
+            self._record = []
+            self._record_cycles = None
+        elif mode == 'ring':
+            if not capacity or capacity < 1:
+                raise ValueError("ring recording needs a positive capacity")
+            self._record = collections.deque(maxlen=capacity)
+            self._record_cycles = collections.deque(maxlen=capacity)
+            self._next_kept_step = lambda cycle: cycle + 1
+        elif mode == 'sample':
+            capacity = self.SAMPLE_CAPACITY if capacity is None else capacity
+            if capacity < 1:
+                raise ValueError("sample recording needs a positive capacity")
+            if every and every >= 1 and not rate:
+                self._record = collections.deque(maxlen=capacity)
+                self._record_cycles = collections.deque(maxlen=capacity)
+                self._next_kept_step = lambda cycle: cycle + every
+            elif rate and 0 < rate <= 1 and not every:
+                self._record = []
+                self._record_cycles = []
+                rng = random.Random(seed)
+                self._reservoir = (capacity, rng)
+                self._sampled = 0  # cycles sampled so far (kept or not)
+                log_miss = math.log(1.0 - rate) if rate < 1 else None
+                # geometric gaps between kept cycles: one random draw per kept cycle, not per cycle
+                self._next_kept_step = lambda cycle: cycle + 1 + (int(math.log(1.0 - rng.random()) / log_miss) if log_miss else 0)
+                self._next_kept = self._next_kept_step(-1)
+            else:
+                raise ValueError("sample recording needs either every >= 1 or 0 < rate <= 1")
+        elif mode == 'none':
+            self._record = []
+            self._record_cycles = []
+            self._next_kept = None
+        else:
+            raise ValueError("unknown recording mode: %s" % mode)
+        self._record_mode = mode
+    
+    def _iterRecord(self):
+        """
+        Generate (cycle, record) for each kept record
+        """
+        if self._record_cycles is None:
+            return enumerate(self._record)
+        if self._reservoir is not None:  # slots are replaced at random: by cycle
+            order = sorted(xrange(len(self._record_cycles)), key=self._record_cycles.__getitem__)
+            return ((self._record_cycles[i], self._record[i]) for i in order)
+        return itertools.izip(self._record_cycles, self._record)
          
     def _mapArrival(self):
         """
@@ -227,6 +811,25 @@ class Scheduler(object):
             arr_times_set.add(proc.arr_time)          # add arrival time to set   
         self._arr_times = sorted(list(arr_times_set))  # save the set into sorted list for arrival times
     
+    def _addArrival(self, proc):
+        """
+        Add a process that has not arrived yet to the arrivals
+        """
+        if proc.arr_time not in self._arrivals:
+            self._arrivals[proc.arr_time] = []
+            bisect.insort(self._arr_times, proc.arr_time)
+        self._arrivals[proc.arr_time].append(proc)
+    
+    def _removeArrival(self, proc):
+        """
+        Remove a process that has not arrived yet from the arrivals
+        """
+        procs = self._arrivals[proc.arr_time]
+        procs.remove(proc)
+        if not procs:
+            del self._arrivals[proc.arr_time]
+            self._arr_times.remove(proc.arr_time)
+    
     def prolog(self):
         """
         Things to be done before start()
@@ -237,7 +840,11 @@ class Scheduler(object):
         """
         To be overridden in derived classes
         """
-        self.prolog()
+        self._started = time.time()
+        self._next_progress = self._started + self._progress_interval
+        if not self._prepared:
+            self.prolog()
+            self._prepared = True
         
     def _getArrivalProcs(self, arr_time):
         """
@@ -245,7 +852,11 @@ class Scheduler(object):
             Then, remove (pop) this item
         """
         if self._arrivals.has_key(arr_time):
-            return sorted(self._arrivals.pop(arr_time), key=lambda p: p.proc_id)  # return a list of processes sorted by process ID
+            procs = sorted(self._arrivals.pop(arr_time), key=lambda p: p.proc_id)  # return a list of processes sorted by process ID
+            if self._observers:
+                for proc in procs:
+                    self._notify('onArrival', arr_time, proc.proc_id)
+            return procs
         else:
             return []
     
@@ -329,11 +940,23 @@ class Scheduler(object):
         ##!! Can be moved to Scheduler class
         """
         sc_blocked_procs = self._getScBlockedProcs()          # get list of scheduled 'Blocked' processes if any
+        if self._devices is not None:
+            return sc_blocked_procs                           # served by the devices: nothing to do per process
         if sc_blocked_procs:                                  # execute scheduled 'Blocked' processes if any
             for proc in sc_blocked_procs:
                 proc.blocked()                                
         blocked_procs = sc_blocked_procs
         return copy.copy(blocked_procs)
+    
+    def _finishedIO(self, blocked_procs, this_cycle):
+        """
+        Return the 'Blocked' processes whose I/O burst ends with this_cycle ('Ready' from the next cycle)
+            * without devices, every process of blocked_procs is checked
+            * with devices, only the completions due at this_cycle are taken from the device model
+        """
+        if self._devices is not None:
+            return self._devices.finished(this_cycle)
+        return [proc for proc in blocked_procs if not proc.isBlocked()]
         
     def _recordCycle(self, running_proc=None, blocked_procs=[], ready_procs=[]):
         """
@@ -341,6 +964,37 @@ class Scheduler(object):
             * do not record those cycles that have nothing (no key for that kind of cycle)
             * record only process IDs
         """
+        cycle = self._cycle
+        self._cycle += 1
+        if running_proc != None:
+            self._cpu_work += 1
+            running_proc.dispatch(cycle)
+        if self._record_cycles is not None:
+            if cycle != self._next_kept:
+                return
+            self._next_kept = self._next_kept_step(cycle)
+            if self._reservoir is not None:
+                # reservoir sampling (algorithm R): each sampled cycle ends up kept with equal probability
+                capacity, rng = self._reservoir
+                self._sampled += 1
+                if len(self._record) < capacity:
+                    slot = len(self._record)
+                    self._record_cycles.append(cycle)
+                    self._record.append(None)
+                else:
+                    slot = rng.randrange(self._sampled)
+                    if slot >= capacity:
+                        return
+                    self._record_cycles[slot] = cycle
+                self._record[slot] = self._cycleRecord(running_proc, blocked_procs, ready_procs)
+                return
+            self._record_cycles.append(cycle)
+        self._record.append(self._cycleRecord(running_proc, blocked_procs, ready_procs))
+    
+    def _cycleRecord(self, running_proc, blocked_procs, ready_procs):
+        """
+        Return the record of one cycle (None if nothing happens in it)
+        """
         record = collections.OrderedDict()
         if running_proc != None:
             record['Running'] = running_proc.proc_id
@@ -353,10 +1007,9 @@ class Scheduler(object):
         #print record  # testing
         
         # If nothing is to record at this cycle, then do not record this cycle
-        if not (running_proc == None and blocked_procs == [] and ready_procs == []):
-            self._record.append(record)
-        else:
-            self._record.append(None)
+        if running_proc != None or record['Blocked'] or record['Ready']:
+            return record
+        return None
         
     def _terminate(self, cycle):
         self._end_time = cycle - 1
@@ -367,7 +1020,7 @@ class Scheduler(object):
         Reformat original cycle record for output
         """
         reformat_record = []
-        for record in self._record:
+        for cycle, record in self._iterRecord():
             rfm =  {} # reformatted dict
             #print record
             if record != None:
@@ -399,14 +1052,23 @@ class Scheduler(object):
             item_str_list.append(item_str)
         return item_str_list
     
+    def _iterPrintable(self):
+        """
+        Generate (cycle, printable form) of each kept cycle (same strings as _printable()) without keeping them
+        """
+        for cycle, record in self._iterRecord():
+            states = self._cycleStates(record)
+            yield cycle, "".join(["%d: %s " % (proc_id, states[proc_id]) for proc_id in sorted(states)])
+    
     def output(self):
         """
         Return the output as a string
         """
         items = self._printable()
+        cycles = [cycle for cycle, record in self._iterRecord()]
         output = ""
-        for i in range(len(items)):
-            output += "%d " % i + items[i] + "\n"
+        for cycle, item in itertools.izip(cycles, items):
+            output += "%d " % cycle + item + "\n"
         
         self._getStat()
         output += "\n"
@@ -414,24 +1076,93 @@ class Scheduler(object):
         output += "CPU utilization: %.2f\n" % self._stat[1]
         for item in self._stat[2].items():
             output += "Turnaround process %d: %d\n" % (item[0], item[1])
+        for line in self._deviceLines():
+            output += line + "\n"
+        if self._stopped:
+            output += self._stoppedLine() + "\n"
         return output
     
+    def _stoppedLine(self):
+        return "Stopped (%s) at cycle %d: %d of %d processes finished" % \
+            (self._stopped, self._end_time + 1, len(self._stat[2]), len(self._proc_list))
+    
     def _getStat(self):
         """
         Generate statistics
         """
+        self._stat = []
         self._stat.append(self._end_time)
-        cpu_work = 0
-        for record in self._record:
-            if record:
-                if record['Running'] != None:
-                    cpu_work += 1
-        cpu_util = utilities.roundup_2(float(cpu_work) / (self._end_time + 1))  # round up two digits, e.g. 0.66666666 => 0.67
+        cpu_work = self._cpuWork()
+        cycles = self._end_time + 1  # 0 when stopped before the first cycle
+        cpu_util = utilities.roundup_2(float(cpu_work) / cycles) if cycles > 0 else 0  # round up two digits, e.g. 0.66666666 => 0.67
         self._stat.append(cpu_util)
         turnaround = {}
         for proc in self._proc_list:
-            turnaround[proc.proc_id] = proc.fin_time - proc.arr_time + 1
+            if proc.fin_time >= 0:  # unfinished processes (stopped simulation) have no turnaround
+                turnaround[proc.proc_id] = proc.fin_time - proc.arr_time + 1
         self._stat.append(turnaround)
+    
+    def _cpuWork(self):
+        """
+        Count cycles in which some process was 'Running' (counted as cycles are recorded)
+        """
+        return self._cpu_work
+    
+    def getStat(self):
+        """
+        Return statistics as a list: [finishing time, CPU utilization, {proc_id: turnaround}]
+        """
+        self._getStat()
+        return self._stat
+    
+    def _cycleStates(self, record):
+        """
+        Map process IDs to their states ('running', 'blocked' or 'ready') in one recorded cycle
+        """
+        states = {}
+        if record != None:
+            if record['Running'] != None:
+                states[record['Running']] = 'running'
+            for proc_id in record['Blocked']:
+                states[proc_id] = 'blocked'
+            for proc_id in record['Ready']:
+                states[proc_id] = 'ready'
+        return states
+    
+    def intervals(self):
+        """
+        Generate state intervals from the cycle record
+            * yield (proc_id, state, start, end) tuples, with start and end cycles inclusive
+            * an interval is yielded as soon as it closes, so only one open interval per process is kept
+            * intervals only span consecutive kept cycles (see setRecording())
+        """
+        opened = {}  # proc_id => (state, start)
+        cycle = -1
+        for kept_cycle, record in self._iterRecord():
+            if kept_cycle != cycle + 1:  # gap between kept cycles: close everything
+                for proc_id, (state, start) in sorted(opened.items()):
+                    yield (proc_id, state, start, cycle)
+                opened = {}
+            cycle = kept_cycle
+            states = self._cycleStates(record)
+            for proc_id, (state, start) in opened.items():
+                if states.get(proc_id) != state:
+                    del opened[proc_id]
+                    yield (proc_id, state, start, cycle - 1)
+            for proc_id, state in states.iteritems():
+                if proc_id not in opened:
+                    opened[proc_id] = (state, cycle)
+        for proc_id, (state, start) in sorted(opened.items()):
+            yield (proc_id, state, start, cycle)
+    
+    def summary(self):
+        """
+        Generate per-process summaries as (proc_id, arr_time, fin_time, turnaround) tuples sorted by process ID
+            * unfinished processes (stopped simulation) have fin_time and turnaround -1
+        """
+        for proc in sorted(self._proc_list, key=attrgetter('proc_id')):
+            turnaround = proc.fin_time - proc.arr_time + 1 if proc.fin_time >= 0 else -1
+            yield (proc.proc_id, proc.arr_time, proc.fin_time, turnaround)
         
 
 class FCFS(Scheduler):
@@ -460,8 +1191,13 @@ class FCFS(Scheduler):
         """
         super(FCFS, self).start()
         
-        # main iteration
-        for i in itertools.count():
+        # main iteration (from the cycle of the restored state when resumed)
+        for i in itertools.count(self._cycle):
+            
+            # budgets, cancellation and progress (every CHECK_CYCLES cycles)
+            if i >= self._next_check and self._checkpoint(i):
+                self._terminate(i)
+                break
 
             sc_running_proc = self._getScRunningProc()
             sc_blocked_procs = self._getScBlockedProcs()
@@ -562,7 +1298,7 @@ class FCFS(Scheduler):
             if running_proc.hasNoIO():
                 if running_proc.toTerminate():
                     self._unsetScRunningProc()            # to terminate
-                    running_proc.finish(this_cycle)
+                    self._finish(running_proc, this_cycle)
                     
                 else:
                     self._setScRunningProc(running_proc)  # keep 'Running'
@@ -572,12 +1308,12 @@ class FCFS(Scheduler):
                 # from 'Running' to 'Blocked'
                 if running_proc.toBlocked():             
                     self._unsetScRunningProc()             # unset scheduled 'Running' process
-                    self._setScBlockedProc(running_proc)   # add it to scheduled 'Blocked' processes
+                    self._block(running_proc, this_cycle)   # add it to scheduled 'Blocked' processes
                     
                 # from 'Running' to Terminate 
                 elif running_proc.toTerminate():          
                     self._unsetScRunningProc()             # unset scheduled 'Running' process
-                    running_proc.finish(this_cycle)        # update process fin_time
+                    self._finish(running_proc, this_cycle)        # update process fin_time
                 # keep 'Running' (still in first half, or )
                 else:
                     self._setScRunningProc(running_proc)
@@ -586,16 +1322,10 @@ class FCFS(Scheduler):
 
         # for each of the 'Blocked' processes
         if blocked_procs:
-            temp_procs = []  # temporary list processes to be enqueued
-            for proc in blocked_procs:
-                # keep 'Blocked'
-                if proc.isBlocked():                     
-                    self._setScBlockedProc(proc)
-                    
-                # from 'Blocked' to 'Ready' (Ready at next cycle)
-                else:                                    
-                    self._unsetScBlockedProc(proc)       # unset scheduled 'Blocked' process      
-                    temp_procs.append(proc)              # append this process to temporary queue
+            # from 'Blocked' to 'Ready' (Ready at next cycle); the others keep 'Blocked'
+            temp_procs = self._finishedIO(blocked_procs, this_cycle)  # temporary list processes to be enqueued
+            for proc in temp_procs:
+                self._unblock(proc, this_cycle)       # unset scheduled 'Blocked' process
             
             # This is for: "If two processes happen to be ready at the same time, give preference to the one with lower ID."
             self._enqueueListReady(this_cycle + 1, temp_procs)  # temp_procs may be empty
@@ -640,7 +1370,7 @@ class RR(FCFS):
             if running_proc.hasNoIO():
                 if running_proc.toTerminate():              # to terminate
                     self._unsetScRunningProc()
-                    running_proc.finish(this_cycle)             
+                    self._finish(running_proc, this_cycle)             
                     
                 elif running_proc.hasRunning(self.quantum):          # if it has already running for quantum cycles
                     self._unsetScRunningProc()                       # from 'Running' to 'Ready'
@@ -654,12 +1384,12 @@ class RR(FCFS):
                 # from 'Running' to 'Blocked'
                 if running_proc.toBlocked():
                     self._unsetScRunningProc()             # unset scheduled 'Running' process
-                    self._setScBlockedProc(running_proc)   # add it to scheduled 'Blocked' processes
+                    self._block(running_proc, this_cycle)   # add it to scheduled 'Blocked' processes
                     
                 # from 'Running' to Terminate 
                 elif running_proc.toTerminate():          
                     self._unsetScRunningProc()             # unset scheduled 'Running' process
-                    running_proc.finish(this_cycle)        # update process fin_time
+                    self._finish(running_proc, this_cycle)        # update process fin_time
 
                 # others
                 else:
@@ -676,16 +1406,10 @@ class RR(FCFS):
 
         # for each of the 'Blocked' processes
         if blocked_procs:
-            temp_procs = []  # temporary list processes to be enqueued
-            for proc in blocked_procs:
-                # keep 'Blocked'
-                if proc.isBlocked():                     
-                    self._setScBlockedProc(proc)
-                    
-                # from 'Blocked' to 'Ready' (Ready at next cycle)
-                else:                                    
-                    self._unsetScBlockedProc(proc)       # unset scheduled 'Blocked' process      
-                    temp_procs.append(proc)              # append this process to temporary queue
+            # from 'Blocked' to 'Ready' (Ready at next cycle); the others keep 'Blocked'
+            temp_procs = self._finishedIO(blocked_procs, this_cycle)  # temporary list processes to be enqueued
+            for proc in temp_procs:
+                self._unblock(proc, this_cycle)       # unset scheduled 'Blocked' process
             
             self._enqueueListReady(this_cycle + 1, temp_procs)  # temp_procs may be empty            
         
@@ -706,8 +1430,13 @@ class SRJF(Scheduler):
         """
         super(SRJF, self).start()
         
-        # main iteration
-        for i in itertools.count():
+        # main iteration (from the cycle of the restored state when resumed)
+        for i in itertools.count(self._cycle):
+            
+            # budgets, cancellation and progress (every CHECK_CYCLES cycles)
+            if i >= self._next_check and self._checkpoint(i):
+                self._terminate(i)
+                break
 
             # get scheduled 'Blocked' processes if any
             sc_blocked_procs = self._getScBlockedProcs()
@@ -776,13 +1505,13 @@ class SRJF(Scheduler):
                 
                 # from 'Running' to 'Blocked'
                 if running_proc.toBlocked():
-                    self._setScBlockedProc(running_proc)
+                    self._block(running_proc, this_cycle)
                     
                 # from 'Running' to terminate
 
                 elif running_proc.toTerminate():
                     #self._delReadyProc(running_proc)  # do not add to ready processes
-                    running_proc.finish(this_cycle)
+                    self._finish(running_proc, this_cycle)
                 
                 # others (add to ready processes)
                 else:
@@ -791,23 +1520,25 @@ class SRJF(Scheduler):
             # for those with no I/O time (no block needed)
             else:
                 if running_proc.toTerminate():
-                    running_proc.finish(this_cycle)
+                    self._finish(running_proc, this_cycle)
                     
                 else:
                     self._addReadyProc(running_proc)
 
-        # for 'Blocked' processes
+        # for 'Blocked' processes (by process ID, so that ties in remaining CPU time are broken the same way in every run)
         if blocked_procs:
 
-             for proc in blocked_procs:
-                # keep 'Blocked'
-                if proc.isBlocked():                     
-                    self._setScBlockedProc(proc)
-                # from 'Blocked' to 'Ready' (Ready at next cycle)
-                else:
-                    self._unsetScBlockedProc(proc)                   
-                    self._addReadyProc(proc)
+            # from 'Blocked' to 'Ready' (Ready at next cycle); the others keep 'Blocked'
+            for proc in sorted(self._finishedIO(blocked_procs, this_cycle), key=attrgetter('proc_id')):
+                self._unblock(proc, this_cycle)
+                self._addReadyProc(proc)
             
+def printProgress(progress):
+    """
+    Default progress callback: one line on standard error
+    """
+    utilities.output.progress("cycle %(cycle)d: %(finished)d processes finished, %(remaining)d remaining, %(rate).0f cycles/s" % progress)
+
 if __name__ == '__main__':
     utilities.output.warning("Please run main.py script from project's directory.")       
     
\ No newline at end of file
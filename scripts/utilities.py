@@ -1,6 +1,16 @@
 # -*- coding: utf-8  -*-
 import sys
+import os
 import decimal
+import gzip
+import bz2
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None  # .xz files need the backports.lzma package on Python 2
 
 class output(object):
     """
@@ -8,14 +18,17 @@ class output(object):
         * error (red)
         * warning (yellow)
         * debug (green)
+        * progress (cyan, to standard error)
     """
     
     RED     = 1
     GREEN   = 2
     YELLOW  = 3
+    CYAN    = 6
     ERROR   = 4
     DEBUG   = 5
     WARNING = 6
+    PROGRESS = 7
     @staticmethod
     def __out(type, msg):
         if type == output.ERROR:
@@ -24,6 +37,8 @@ class output(object):
             sys.stdout.write("\033[%dm [%s] %s\033[m\n" % (30 + output.GREEN, "Debug", msg))
         if type == output.WARNING:
             sys.stdout.write("\033[%dm [%s] %s\033[m\n" % (30 + output.YELLOW, "Warning", msg))
+        if type == output.PROGRESS:
+            sys.stderr.write("\033[%dm [%s] %s\033[m\n" % (30 + output.CYAN, "Progress", msg))
     @staticmethod
     def error(msg):
         output.__out(output.ERROR, msg)
@@ -33,6 +48,9 @@ class output(object):
     @staticmethod   
     def warning(msg):
         output.__out(output.WARNING, msg)
+    @staticmethod
+    def progress(msg):
+        output.__out(output.PROGRESS, msg)
         
 def roundup(number):
     """
@@ -46,6 +64,79 @@ def roundup_2(number):
     """
     return decimal.Decimal(number).quantize(decimal.Decimal('.01'), rounding=decimal.ROUND_HALF_UP)
 
+COMPRESSIONS = ['.gz', '.bz2', '.xz']
+MAGIC = {'.gz': '\x1f\x8b', '.bz2': 'BZh', '.xz': '\xfd7zXZ\x00'}  # leading bytes of each compressed format
+CHUNK = 1 << 20  # bytes read at a time by streaming parsers
+
+def compression(path):
+    """
+    Return the compression extension of a file name ('.gz', '.bz2' or '.xz'), or ''
+    """
+    ext = os.path.splitext(path)[1]
+    return ext if ext in COMPRESSIONS else ''
+
+def splitCompression(path):
+    """
+    Split a file name into (name without compression extension, compression extension), e.g. ('a.txt', '.gz')
+    """
+    ext = compression(path)
+    return (path[:-len(ext)] if ext else path), ext
+
+def openFile(path, mode='r'):
+    """
+    Open a plain or compressed (gzip, bzip2, xz) file as a stream
+        * reading: compression is detected from the leading (magic) bytes
+        * writing: compression is chosen by the extension
+        Compressed files are read and written as bytes, with no uncompressed copy on disk
+    """
+    if 'r' in mode:
+        f = open(path, 'rb')
+        try:
+            head = f.read(6)
+        finally:
+            f.close()
+        kind = ''
+        for ext in COMPRESSIONS:
+            if head.startswith(MAGIC[ext]):
+                kind = ext
+    else:
+        kind = compression(path)
+    binary_mode = mode[0] + 'b'
+    if kind == '.gz':
+        return gzip.open(path, binary_mode, 6)
+    if kind == '.bz2':
+        return bz2.BZ2File(path, binary_mode)
+    if kind == '.xz':
+        if lzma is None:
+            raise IOError("xz compression needs the backports.lzma package")
+        return lzma.LZMAFile(path, binary_mode)
+    return open(path, mode)
+
+def iterChunks(f, size=CHUNK):
+    """
+    Generate the content of a file object in chunks of size bytes
+    """
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            break
+        yield chunk
+
+def iterTokens(f, size=CHUNK):
+    """
+    Generate the whitespace-separated tokens of a file object, reading it in chunks
+    """
+    rest = ''
+    for chunk in iterChunks(f, size):
+        tokens = (rest + chunk).split()
+        rest = ''
+        if tokens and not chunk[-1].isspace():
+            rest = tokens.pop()  # may continue in the next chunk
+        for token in tokens:
+            yield token
+    if rest:
+        yield rest
+
 def check_version(): 
     version = sys.version_info
     if version[0] == 2:
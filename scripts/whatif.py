@@ -0,0 +1,106 @@
+# -*- coding: utf-8  -*-
+"""
+What-if re-simulation of a stored run
+
+A run started after Scheduler.setSnapshots() keeps its engine state every few thousand cycles.
+Changing or adding processes cannot influence any cycle before the earliest arrival involved,
+so WhatIf restores the last snapshot before that cycle, applies the changes, simulates only
+from there, and splices the new cycles after the stored ones.
+"""
+import bisect
+from scheduler import Process
+import utilities
+
+PLANNED = ['cpu_time', 'io_time', 'arr_time', 'bursts']  # planned parameters a change may set
+
+class WhatIf(object):
+    """
+    WhatIf: re-simulate a finished run (kept with setSnapshots(), and 'full' or 'none' recording)
+    with changed or added processes
+        * run() returns a new finished scheduler of the same kind; the stored run is unchanged
+          and can answer any number of what-if questions
+        * the re-simulation itself keeps no snapshots, unless keep_snapshots is True (to ask
+          further questions against its result)
+    """
+    def __init__(self, scheduler):
+        if not scheduler._snapshots:
+            raise ValueError("the run kept no snapshots (call setSnapshots() before start())")
+        if scheduler._record_mode not in ['full', 'none']:
+            raise ValueError("what-if needs 'full' or 'none' recording, not '%s'" % scheduler._record_mode)
+        self._base = scheduler
+        self._snapshot_cycles = [cycle for cycle, state in scheduler._snapshots]
+        self.resumed_from = None  # cycle the last run() resumed from
+
+    def run(self, changes=None, added=None, keep_snapshots=False):
+        """
+        Re-simulate with changes and return the new scheduler
+            * changes: dict mapping a process ID to a dict of new planned parameters
+              (cpu_time, io_time, arr_time or bursts), e.g. {17: {'cpu_time': 40}}
+            * added  : list of new Process objects with planned parameters set
+        """
+        changes = changes or {}
+        added = added or []
+        base = self._base
+        base_procs = dict((proc.proc_id, proc) for proc in base._proc_list)
+        first = None  # first cycle the changes can influence
+        for proc_id, params in changes.iteritems():
+            if proc_id not in base_procs:
+                raise ValueError("no process %d in the run" % proc_id)
+            unknown = set(params) - set(PLANNED)
+            if unknown:
+                raise ValueError("unknown planned parameter(s): %s" % ", ".join(sorted(unknown)))
+            arr_time = min(base_procs[proc_id].arr_time, params.get('arr_time', base_procs[proc_id].arr_time))
+            first = arr_time if first is None else min(first, arr_time)
+        for proc in added:
+            if proc.proc_id in base_procs:
+                raise ValueError("duplicate process ID %d" % proc.proc_id)
+            first = proc.arr_time if first is None else min(first, proc.arr_time)
+        if first is None:
+            return base
+
+        # the last snapshot at or before the first influenced cycle
+        k = bisect.bisect_right(self._snapshot_cycles, first) - 1
+        cycle, state = base._snapshots[k]
+        self.resumed_from = cycle
+
+        run = object.__new__(type(base))
+        run.__dict__.update(base.__dict__)    # settings: recording, budgets, callbacks
+        run.__dict__.pop('_recordCycle', None)  # no observers on the re-simulation
+        run._observers = []
+        run.restoreState(state)
+        if keep_snapshots:
+            run._snapshots = base._snapshots[:k + 1]
+        else:
+            run._snapshots = []
+            run._snapshot_interval = None
+        run._record = base._record[:cycle] if base._record_mode == 'full' else []
+        run._reformat = []
+        run._stat = []
+
+        procs = dict((proc.proc_id, proc) for proc in run._proc_list)
+        for proc_id, params in sorted(changes.iteritems()):
+            old = procs[proc_id]  # not arrived yet: still as planned
+            new = Process(proc_id)
+            if old.bursts is not None:
+                new.bursts = old.bursts
+            else:
+                new.cpu_time = old.cpu_time
+                new.io_time = old.io_time
+            new.arr_time = old.arr_time
+            for key in PLANNED:
+                if key in params:
+                    setattr(new, key, params[key])
+            new.propagate()
+            run._removeArrival(old)
+            run._proc_list[run._proc_list.index(old)] = new
+            run._addArrival(new)
+        for proc in added:
+            proc.propagate()
+            run._proc_list.append(proc)
+            run._addArrival(proc)
+
+        run.start()
+        return run
+
+if __name__ == '__main__':
+    utilities.output.warning("Please run main.py script from project's directory.")
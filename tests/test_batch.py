@@ -0,0 +1,108 @@
+# -*- coding: utf-8  -*-
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import main
+from scripts import batch
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "jobs.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def inputFile(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_claim_exclusive(self):
+        store = batch.JobStore(self.path)
+        for i in range(40):
+            store.add("input%d.txt" % i, '0')
+        store.close()
+        claims = []
+        def work(name):
+            worker_store = batch.JobStore(self.path)
+            try:
+                while True:
+                    job = worker_store.claim(name)
+                    if job is None:
+                        break
+                    claims.append((job[0], name))
+            finally:
+                worker_store.close()
+        threads = [threading.Thread(target=work, args=("worker%d" % i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(job_id for job_id, name in claims), range(1, 41))
+        store = batch.JobStore(self.path)
+        self.assertEqual(store.counts()['running'], 40)
+        self.assertEqual(set(row[5] for row in store.jobs()), set([1]))  # one attempt each
+        store.close()
+
+    def test_lease_expiry(self):
+        store = batch.JobStore(self.path)
+        store.add("input.txt", '0')
+        job = store.claim("a", lease=-1.0)
+        self.assertEqual(store.claim("b", lease=300.0, max_attempts=3), job)  # expired: claimed again
+        self.assertEqual(store.claim("c"), None)  # held by b
+        self.assertFalse(store.renew(job[0], "a"))
+        self.assertTrue(store.renew(job[0], "b", lease=-1.0))
+        self.assertEqual(store.claim("c", lease=-1.0, max_attempts=3), job)
+        # a third expired attempt gives the job up
+        self.assertEqual(store.claim("d", max_attempts=3), None)
+        self.assertEqual([(row[4], row[5], row[10]) for row in store.jobs()], [('failed', 3, 'lease expired')])
+        store.close()
+
+    def test_complete_after_lost_lease(self):
+        store = batch.JobStore(self.path)
+        store.add("input.txt", '0')
+        job_id = store.claim("a", lease=-1.0)[0]
+        self.assertEqual(store.claim("b")[0], job_id)
+        self.assertFalse(store.complete(job_id, "a", (10, 0.5), 4.0, None))
+        self.assertFalse(store.fail(job_id, "a", "late failure"))
+        self.assertTrue(store.complete(job_id, "b", (12, 0.25), 5.0, None))
+        self.assertEqual([row[4:8] for row in store.jobs()], [('done', 2, 12, 0.25)])
+        store.close()
+
+    def test_lost_lease_in_worker(self):
+        input_file = self.inputFile("input.txt", "0 3 0 0\n1 2 0 1\n")
+        store = batch.JobStore(self.path)
+        store.add(input_file, '0')
+        def load(path):
+            store.claim("other")  # takes the job over: the lease of the worker below has expired
+            return main.loadWorkload(path)
+        worker = batch.Worker(self.path, load, fmt=None, lease=-1.0, name="worker").run()
+        self.assertEqual((worker.done, worker.failed, worker.lost), (0, 0, 1))
+        self.assertEqual([row[4] for row in store.jobs()], ['running'])
+        store.close()
+
+    def test_failures(self):
+        store = batch.JobStore(self.path)
+        store.add(self.inputFile("invalid.txt", "0 x 0 0\n"), '0')
+        store.add(self.inputFile("valid.txt", "0 3 0 0\n"), 'rr', {'quantum': 0})
+        store.add(os.path.join(self.dir, "missing.txt"), '0')
+        store.add(self.inputFile("valid2.txt", "0 3 0 0\n"), '1')
+        store.close()
+        errors = []
+        worker = batch.Worker(self.path, main.loadWorkload, fmt=None, max_attempts=3)
+        worker.run(report=lambda job, error: errors.append((job[0], error)))
+        # invalid input and parameters fail at once, an unreadable file after max_attempts; failed counts jobs
+        self.assertEqual((worker.done, worker.failed, worker.lost), (1, 3, 0))
+        self.assertEqual([job_id for job_id, error in errors], [1, 2, 3, 3, 3, 4])
+        self.assertIn("non-integer element x", errors[0][1])
+        store = batch.JobStore(self.path)
+        self.assertEqual([(row[4], row[5]) for row in store.jobs()], [('failed', 1), ('failed', 1), ('failed', 3), ('done', 1)])
+        self.assertEqual(store.counts()['failed'], worker.failed)
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8  -*-
+import unittest
+from scripts import compare
+from scripts import generator
+from scripts import policies
+from scripts.scheduler import Workload
+
+def run(workload, name, **options):
+    scheduler = policies.PolicyScheduler(workload, policies.makePolicy(name, **options))
+    scheduler.start()
+    return scheduler
+
+def cycleStates(scheduler):
+    """
+    Return the states of every recorded cycle, one {proc_id: state} per cycle
+    """
+    return [scheduler._cycleStates(record) for cycle, record in scheduler._iterRecord()]
+
+def running(states):
+    for proc_id, state in states.items():
+        if state == 'running':
+            return proc_id
+    return None
+
+def bruteForce(a, b):
+    """
+    Diff two recorded runs cycle by cycle: (first divergent cycle, processes differing at it, running ranges)
+    """
+    states_a, states_b = cycleStates(a), cycleStates(b)
+    cycles = max(len(states_a), len(states_b))
+    states_a += [{}] * (cycles - len(states_a))
+    states_b += [{}] * (cycles - len(states_b))
+    first, procs = None, set()
+    ranges = []
+    for cycle in range(cycles):
+        if first is None and states_a[cycle] != states_b[cycle]:
+            first = cycle
+            procs = set(proc_id for proc_id in set(states_a[cycle]) | set(states_b[cycle])
+                        if states_a[cycle].get(proc_id) != states_b[cycle].get(proc_id))
+        if running(states_a[cycle]) != running(states_b[cycle]):
+            if ranges and ranges[-1][1] == cycle - 1:
+                ranges[-1][1] = cycle
+            else:
+                ranges.append([cycle, cycle])
+    return first, procs, [tuple(r) for r in ranges]
+
+class TimelineDiffTest(unittest.TestCase):
+    def check(self, a, b):
+        ranges = []
+        diff = compare.TimelineDiff.fromSchedulers(a, b).run(lambda first, last: ranges.append((first, last)))
+        first, procs, expected_ranges = bruteForce(a, b)
+        self.assertEqual(diff.first_divergence, first)
+        if first is not None:
+            self.assertTrue(diff.diverged_proc in procs)
+        self.assertEqual(ranges, expected_ranges)
+        self.assertEqual(diff.running_ranges, len(expected_ranges))
+        self.assertEqual(diff.running_cycles, sum(last - first + 1 for first, last in expected_ranges))
+        summaries = [dict((s[0], s[2:]) for s in run.summary()) for run in [a, b]]  # proc_id => (fin, turnaround)
+        expected = []
+        for proc_id in sorted(set(summaries[0]) | set(summaries[1])):
+            fin_a, turnaround_a = summaries[0].get(proc_id, (-1, -1))
+            fin_b, turnaround_b = summaries[1].get(proc_id, (-1, -1))
+            if (fin_a, turnaround_a) != (fin_b, turnaround_b):
+                expected.append((proc_id, fin_a, fin_b, turnaround_a, turnaround_b))
+        self.assertEqual(list(diff.processes()), expected)
+
+    def test_random_pairs(self):
+        pairs = [('fcfs', {}, 'rr', {}), ('rr', {}, 'rr', {'quantum': 3}), ('srjf', {}, 'mlfq', {}),
+                 ('fcfs', {}, 'priority', {}), ('lottery', {'seed': 1}, 'lottery', {'seed': 2})]
+        for seed in range(10):
+            records = list(generator.WorkloadGenerator(25, seed=seed, arrival='bursty', rate=0.3, burst=5, idle=15,
+                                                       cpu_max=30, io_fraction=0.5))
+            workload = Workload.fromRecords(records)
+            for name_a, options_a, name_b, options_b in pairs:
+                self.check(run(workload, name_a, **options_a), run(workload, name_b, **options_b))
+
+    def test_bounded_queue(self):
+        # every dispatch but the first follows a 'ready' interval, so the fcfs run is known cycle by cycle
+        # while rr switches processes every cycle
+        class PeakDiff(compare.TimelineDiff):
+            peak = 0
+            def _sweep(self):
+                PeakDiff.peak = max(PeakDiff.peak, len(self._running[0]), len(self._running[1]))
+                compare.TimelineDiff._sweep(self)
+        workload = Workload.fromRecords([(0, 2, 0, 0), (1, 300, 0, 0), (2, 300, 0, 0), (3, 300, 0, 1)])
+        a, b = run(workload, 'fcfs'), run(workload, 'rr', quantum=1)
+        diff = PeakDiff.fromSchedulers(a, b).run()
+        self.assertTrue(diff.running_cycles > 600)
+        self.assertTrue(PeakDiff.peak <= 4)
+        self.check(a, b)
+
+    def test_identical(self):
+        workload = Workload.fromRecords([(0, 4, 2, 0), (1, 3, 0, 1), (2, 2, 0, 9)])
+        diff = compare.TimelineDiff.fromSchedulers(run(workload, 'fcfs'), run(workload, 'fcfs')).run()
+        self.assertEqual(diff.first_divergence, None)
+        self.assertEqual(diff.running_cycles, 0)
+        self.assertEqual(list(diff.processes()), [])
+
+    def test_different_lengths(self):
+        # the second run also has process 2, arriving after the first run has ended
+        a = run(Workload.fromRecords([(0, 4, 0, 0), (1, 3, 0, 1)]), 'rr')
+        b = run(Workload.fromRecords([(0, 4, 0, 0), (1, 3, 0, 1), (2, 2, 0, 9)]), 'rr')
+        self.check(a, b)
+        self.check(b, a)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+# -*- coding: utf-8  -*-
+import StringIO
+import unittest
+from scripts import generator
+
+class WorkloadGeneratorTest(unittest.TestCase):
+    def test_strided_bound(self):
+        # the largest ID is (count - 1) * stride
+        ids = [record[0] for record in generator.WorkloadGenerator(2, layout='strided', stride=generator.INT32_MAX)]
+        self.assertEqual(ids, [0, generator.INT32_MAX])
+        self.assertRaises(ValueError, generator.WorkloadGenerator, 3, layout='strided', stride=2 ** 30)
+        for stride in [0, -1]:
+            self.assertRaises(ValueError, generator.WorkloadGenerator, 4, layout='strided', stride=stride)
+        generator.WorkloadGenerator(4, stride=0)  # only used by the strided layout
+
+    def test_binary_overflow(self):
+        workload = generator.WorkloadGenerator(3, rate=1e-9)  # arrivals past INT32_MAX
+        f = StringIO.StringIO()
+        self.assertRaises(ValueError, generator.writeBinary, workload, f)
+        self.assertEqual(f.getvalue(), "")  # nothing written
+        records = list(generator.WorkloadGenerator(5, cpu_min=2 ** 32))
+        self.assertEqual([record[1] for record in records], [generator.INT32_MAX] * 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,13 @@
+# -*- coding: utf-8  -*-
+import StringIO
+import unittest
+import main
+
+class BurstsInputTest(unittest.TestCase):
+    def test_leading_blank_lines(self):
+        for text in ["#bursts\n0 0 3 2 3\n", "\n#bursts\n0 0 3 2 3\n", "  \n\n#bursts\n\n0 0 3 2 3\n"]:
+            procs = main.parseBursts(StringIO.StringIO(text))
+            self.assertEqual([(proc.proc_id, proc.arr_time, proc.bursts) for proc in procs], [(0, 0, [3, 2, 3])])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8  -*-
+import collections
+import random
+import unittest
+from scripts import lockstep
+from scripts.scheduler import Workload, FCFS, RR, SRJF
+
+SCHEDULERS = {'fcfs': FCFS, 'rr': RR, 'srjf': SRJF}
+
+def randomWorkload(rand):
+    """
+    A small workload; some have long idle gaps, so workloads of a batch go idle at different cycles
+    """
+    procs = rand.randint(1, 12)
+    gap = rand.choice([1, 3, 40])
+    arr_times = sorted(rand.randint(0, gap * procs) for i in range(procs))
+    proc_ids = rand.sample(range(100), procs)
+    return [(proc_id, rand.randint(1, 9), rand.choice([0, 0, rand.randint(1, 6)]), arr_time)
+            for proc_id, arr_time in zip(proc_ids, arr_times)]
+
+def readyCycles(scheduler):
+    """
+    Return {proc_id: cycles spent 'Ready'} counted from the record
+    """
+    ready = collections.Counter()
+    for cycle, record in scheduler._iterRecord():
+        ready.update(proc_id for proc_id, state in scheduler._cycleStates(record).items() if state == 'ready')
+    return ready
+
+class LockstepTest(unittest.TestCase):
+    """
+    Every workload of a batch gets the statistics of its own Scheduler run
+    """
+    def test_random_batches(self):
+        rand = random.Random(5)
+        workloads = [randomWorkload(rand) for i in range(150)]
+        workloads.append([(0, 3, 0, 500)])  # starts long after the others have finished
+        for algorithm, scheduler_class in sorted(SCHEDULERS.items()):
+            for chunk in [7, 4096]:
+                batch = lockstep.LockstepBatch(workloads, algorithm, chunk=chunk).run()
+                for w, workload in enumerate(workloads):
+                    scheduler = scheduler_class(Workload.fromRecords(workload))
+                    scheduler.start()
+                    self.assertEqual(batch.getStat(w), scheduler.getStat(), "%s, workload %d" % (algorithm, w))
+                    # waiting: turnaround less the (rounded) CPU time and the I/O time
+                    turnaround = batch.turnaround(w)
+                    ready = readyCycles(scheduler)
+                    for proc_id, cpu_time, io_time, arr_time in workload:
+                        if io_time:
+                            cpu_time = 2 * ((cpu_time + 1) // 2)
+                        self.assertEqual(turnaround[proc_id] - cpu_time - io_time, ready[proc_id])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, lockstep.LockstepBatch, [[(0, 2, 0, 0)]], 'lottery')
+        self.assertRaises(ValueError, lockstep.LockstepBatch, [[(0, 0, 0, 0)]])
+
+if __name__ == '__main__':
+    unittest.main()
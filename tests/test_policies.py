@@ -0,0 +1,88 @@
+# -*- coding: utf-8  -*-
+import random
+import unittest
+from scripts import generator
+from scripts import policies
+from scripts.scheduler import Workload, FCFS, RR, SRJF
+
+def workloads(count=20, procs=30):
+    """
+    Yield small random workloads (seeded), some of them with idle gaps between arrivals
+    """
+    for seed in range(count):
+        records = generator.WorkloadGenerator(procs, seed=seed, arrival='bursty' if seed % 2 else 'poisson',
+                                              rate=0.3, burst=5, idle=20, cpu_max=40, io_fraction=0.5)
+        yield Workload.fromRecords(list(records))
+
+class LegacyEquivalenceTest(unittest.TestCase):
+    """
+    fcfs, rr and srjf policies give the same schedules as the FCFS, RR and SRJF schedulers
+    """
+    def check(self, legacy, name):
+        for workload in workloads():
+            expected = legacy(workload)
+            expected.start()
+            scheduler = policies.PolicyScheduler(workload, policies.makePolicy(name))
+            scheduler.start()
+            self.assertEqual(scheduler.output(), expected.output())
+
+    def test_fcfs(self):
+        self.check(FCFS, 'fcfs')
+
+    def test_rr(self):
+        self.check(RR, 'rr')
+
+    def test_srjf(self):
+        self.check(SRJF, 'srjf')
+
+class TicketTreeTest(unittest.TestCase):
+    def test_draw(self):
+        rand = random.Random(1)
+        for size in [1, 2, 3, 7, 64, 65, 200]:  # past the initial capacity, so the tree is grown
+            tickets = [rand.randint(1, 5) for i in range(size)]
+            prefix = [0]
+            for count in tickets:
+                prefix.append(prefix[-1] + count)
+            for slot in range(size):
+                for number in range(prefix[slot], prefix[slot + 1]):
+                    tree = policies.TicketTree()
+                    for i, count in enumerate(tickets):
+                        tree.add(i, count)
+                    self.assertEqual(tree.draw(number), slot)
+                    self.assertEqual(tree.total, prefix[-1] - tickets[slot])
+                    self.assertEqual(len(tree), size - 1)
+
+    def test_reuse(self):
+        tree = policies.TicketTree(capacity=2)
+        for proc in 'abc':
+            tree.add(proc, 2)
+        self.assertEqual(tree.draw(2), 'b')
+        tree.add('d', 3)  # takes the freed slot of b
+        self.assertEqual([tree.draw(0), tree.draw(0), tree.draw(0)], ['a', 'd', 'c'])
+        self.assertEqual(tree.total, 0)
+
+class OptionsTest(unittest.TestCase):
+    def test_invalid_values(self):
+        for name, options in [('rr', {'quantum': 0}), ('rr', {'quantum': -1}), ('rr', {'quantum': 2.5}),
+                              ('lottery', {'quantum': 'abc'}), ('mlfq', {'quanta': 0}), ('mlfq', {'quanta': (3, 0)}),
+                              ('mlfq', {'boost': 0}), ('priority', {'aging': -1}), ('lottery', {'tickets': 0}),
+                              ('lottery', {'tickets': {1: 2.5}}), ('priority', {'priority': 'high'})]:
+            self.assertRaises(ValueError, policies.makePolicy, name, **options)
+
+    def test_unknown_option(self):
+        self.assertRaises(TypeError, policies.makePolicy, 'fcfs', quantum=2)
+
+    def test_per_process_options(self):
+        workload = Workload.fromRecords([(0, 4, 0, 0), (1, 1, 0, 0), (2, 2, 0, 0)])
+        for priority, expected in [(None, [(0, 7), (1, 1), (2, 3)]), (3, [(0, 4), (1, 5), (2, 7)]),
+                                   ({0: 1, 2: 0}, [(0, 6), (1, 7), (2, 2)])]:  # process 1 keeps its CPU time, 1
+            scheduler = policies.PolicyScheduler(workload, policies.makePolicy('priority', priority=priority))
+            scheduler.start()
+            self.assertEqual(sorted(scheduler.getStat()[2].items()), expected)
+        for tickets in [3, {1: 2}]:
+            scheduler = policies.PolicyScheduler(workload, policies.makePolicy('lottery', tickets=tickets))
+            scheduler.start()
+            self.assertEqual(len(scheduler.getStat()[2]), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8  -*-
+import random
+import unittest
+from scripts import query
+
+# process 1 runs at 0-2 and 6-7, process 2 runs at 3-5 (between them process 1 is blocked at 3-4, ready at 5),
+# process 2 is ready at 1-2 and blocked at 6-9, process 3 runs at 10 (the CPU is idle at 8-9)
+INTERVALS = [(1, 'running', 0, 2), (2, 'ready', 1, 2), (1, 'blocked', 3, 4), (1, 'ready', 5, 5),
+             (2, 'running', 3, 5), (1, 'running', 6, 7), (2, 'blocked', 6, 9), (3, 'running', 10, 10)]
+
+class IntervalTreeTest(unittest.TestCase):
+    def test_overlapping(self):
+        rand = random.Random(2)
+        for size in [0, 1, 2, 5, 33]:
+            intervals = []
+            for proc_id in range(size):
+                start = rand.randint(0, 50)
+                intervals.append((proc_id, start, start + rand.randint(0, 10)))
+            tree = query.IntervalTree(intervals)
+            self.assertEqual(tree.maxEnd(), max([end for proc_id, start, end in intervals] or [-1]))
+            for first in range(-1, 63):
+                for last in range(first, 63, 7):
+                    expected = sorted([(s, p, e) for p, s, e in intervals if s <= last and e >= first])
+                    found = list(tree.overlapping(first, last))
+                    self.assertEqual(sorted((s, p, e) for p, s, e in found), expected)
+                    self.assertEqual([s for p, s, e in found], sorted(s for p, s, e in found))  # by start
+
+class TimelineIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = query.TimelineIndex(INTERVALS)
+
+    def test_at(self):
+        self.assertEqual(self.index.at(-1), [])
+        self.assertEqual(self.index.at(0), [(1, 'running')])
+        self.assertEqual(self.index.at(2), [(1, 'running'), (2, 'ready')])  # closed end
+        self.assertEqual(self.index.at(3), [(1, 'blocked'), (2, 'running')])  # start
+        self.assertEqual(self.index.at(5), [(1, 'ready'), (2, 'running')])  # one-cycle interval
+        self.assertEqual(self.index.at(8), [(2, 'blocked')])
+        self.assertEqual(self.index.at(10), [(3, 'running')])
+        self.assertEqual(self.index.at(11), [])
+        self.assertEqual(self.index.end_time, 10)
+
+    def test_runningAt(self):
+        expected = [None, 1, 1, 1, 2, 2, 2, 1, 1, None, None, 3, None]
+        self.assertEqual([self.index.runningAt(cycle) for cycle in range(-1, 12)], expected)
+
+    def test_stateAt(self):
+        self.assertEqual([self.index.stateAt(2, cycle) for cycle in [0, 1, 2, 3, 5, 6, 9, 10]],
+                         [None, 'ready', 'ready', 'running', 'running', 'blocked', 'blocked', None])
+        self.assertRaises(KeyError, self.index.stateAt, 4, 0)
+
+    def test_during(self):
+        during = self.index.during
+        self.assertEqual(during('running', 2, 3), [1, 2])  # the end of one interval, the start of the next
+        self.assertEqual(during('running', 8, 9), [])  # idle
+        self.assertEqual(during('running', 9, 10), [3])
+        self.assertEqual(during('blocked', 0, 2), [])
+        self.assertEqual(during('blocked', 4, 6), [1, 2])
+        self.assertEqual(during('blocked', 5, 5), [])  # between the two blocked intervals
+        self.assertRaises(KeyError, during, 'waiting', 0, 1)
+
+    def test_during_whole(self):
+        during = self.index.during
+        self.assertEqual(during('running', 3, 5, whole=True), [2])  # exactly the interval
+        self.assertEqual(during('running', 4, 4, whole=True), [2])
+        self.assertEqual(during('running', 2, 5, whole=True), [])  # starts before it
+        self.assertEqual(during('running', 3, 6, whole=True), [])  # ends after it
+        self.assertEqual(during('running', 0, 7, whole=True), [])  # process 1 runs at both ends, not in between
+        self.assertEqual(during('blocked', 6, 9, whole=True), [2])
+        self.assertEqual(during('blocked', 6, 10, whole=True), [])
+
+    def test_history(self):
+        self.assertEqual(self.index.history(1), [('running', 0, 2), ('blocked', 3, 4), ('ready', 5, 5), ('running', 6, 7)])
+        self.assertEqual(self.index.processes(), [1, 2, 3])
+
+if __name__ == '__main__':
+    unittest.main()
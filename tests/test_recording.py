@@ -0,0 +1,57 @@
+# -*- coding: utf-8  -*-
+import unittest
+from scripts import generator
+from scripts.scheduler import Workload, FCFS, RR
+
+def run(mode='full', scheduler_class=RR, **options):
+    scheduler = scheduler_class(Workload.fromRecords(list(generator.WorkloadGenerator(200, seed=4))))
+    scheduler.setRecording(mode, **options)
+    scheduler.start()
+    return scheduler
+
+class RecordingTest(unittest.TestCase):
+    """
+    Bounded recording modes keep a subset of the full record, and exact statistics
+    """
+    def setUp(self):
+        self.full = run()
+        self.cycles = self.full._end_time + 1
+        self.assertTrue(self.cycles > 500)
+
+    def check(self, scheduler):
+        kept = list(scheduler._iterRecord())
+        cycles = [cycle for cycle, record in kept]
+        self.assertEqual(cycles, sorted(set(cycles)))
+        for cycle, record in kept:
+            self.assertEqual(scheduler._cycleStates(record), self.full._cycleStates(self.full._record[cycle]))
+        self.assertEqual(scheduler.getStat(), self.full.getStat())
+        self.assertEqual([line.split()[0] for line in scheduler.output().split("\n\n")[0].splitlines()],
+                         [str(cycle) for cycle in cycles])
+        return cycles
+
+    def test_ring(self):
+        self.assertEqual(self.check(run('ring', capacity=50)), range(self.cycles - 50, self.cycles))
+
+    def test_every(self):
+        self.assertEqual(self.check(run('sample', every=7)), range(0, self.cycles, 7))
+        cycles = self.check(run('sample', every=7, capacity=10))
+        self.assertEqual(cycles, range(0, self.cycles, 7)[-10:])
+
+    def test_rate(self):
+        unbounded = self.check(run('sample', rate=0.2, seed=3))
+        self.assertTrue(len(unbounded) > 40)
+        # a capacity that is never reached keeps the same cycles
+        self.assertEqual(self.check(run('sample', rate=0.2, seed=3, capacity=len(unbounded))), unbounded)
+        bounded = self.check(run('sample', rate=0.2, seed=3, capacity=20))
+        self.assertEqual(len(bounded), 20)
+        self.assertTrue(bounded[-1] > unbounded[len(unbounded) // 2])  # spread over the run, not only its start
+        self.assertEqual(bounded, self.check(run('sample', rate=0.2, seed=3, capacity=20)))  # seeded
+
+    def test_invalid(self):
+        scheduler = FCFS([])
+        self.assertRaises(ValueError, scheduler.setRecording, 'sample', every=2, capacity=0)
+        self.assertRaises(ValueError, scheduler.setRecording, 'sample', every=2, rate=0.5)
+        self.assertRaises(ValueError, scheduler.setRecording, 'ring')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8  -*-
+import unittest
+from scripts import generator
+from scripts import policies
+from scripts import whatif
+from scripts.scheduler import Workload, Process, FCFS, RR, SRJF
+
+ENGINES = [('FCFS', lambda w: FCFS(w)), ('RR', lambda w: RR(w)), ('SRJF', lambda w: SRJF(w)),
+           ('mlfq', lambda w: policies.PolicyScheduler(w, policies.makePolicy('mlfq'))),
+           ('lottery', lambda w: policies.PolicyScheduler(w, policies.makePolicy('lottery', seed=3)))]
+
+def records(seed):
+    return list(generator.WorkloadGenerator(300, seed=seed, rate=0.12, cpu_max=20, io_fraction=0.4))
+
+def newProcess(proc_id, cpu_time, io_time, arr_time):
+    proc = Process(proc_id)
+    proc.cpu_time = cpu_time
+    proc.io_time = io_time
+    proc.arr_time = arr_time
+    return proc
+
+class WhatIfTest(unittest.TestCase):
+    """
+    A what-if run resumed from a snapshot gives the same timeline and statistics as a full re-simulation
+    """
+    def start(self, make, records, devices=None, recording='full', snapshots=None):
+        scheduler = make(Workload.fromRecords(records))
+        scheduler.setRecording(recording)
+        if snapshots:
+            scheduler.setSnapshots(snapshots)
+        if devices:
+            scheduler.setDevices(devices)
+        scheduler.start()
+        return scheduler
+
+    def check(self, make, records, changes, added, devices=None, recording='full', what=None):
+        """
+        Compare a what-if run (of what, or of a new stored run) with a full re-simulation; return the resumed cycle
+        """
+        if what is None:
+            what = whatif.WhatIf(self.start(make, records, devices, recording, snapshots=256))
+        result = what.run(changes, [newProcess(*record) for record in added])
+        changed = []
+        for proc_id, cpu_time, io_time, arr_time in records:
+            params = changes.get(proc_id, {})
+            changed.append((proc_id, params.get('cpu_time', cpu_time), params.get('io_time', io_time),
+                            params.get('arr_time', arr_time)))
+        full = self.start(make, changed + added, devices, recording)
+        self.assertEqual(result.getStat(), full.getStat())
+        self.assertEqual(list(result.intervals()), list(full.intervals()))
+        return what.resumed_from
+
+    def test_equivalence(self):
+        for seed in range(2):
+            base_records = records(seed)
+            last_arrival = base_records[-1][3]
+            late = base_records[-10][0]
+            cases = [
+                # a late process gets more CPU time and no I/O: resumed from a late snapshot
+                ({late: {'cpu_time': 15, 'io_time': 0}}, []),
+                # a late process moved to arrive first, before the second snapshot: resumed from cycle 0
+                ({late: {'arr_time': 1}}, []),
+                # an early change and a process added at the end
+                ({base_records[2][0]: {'io_time': 5}}, [(1000, 7, 2, last_arrival - 30)]),
+                # only an added process, arriving before anything else
+                ({}, [(1000, 4, 1, 0)]),
+            ]
+            for name, make in ENGINES:
+                for devices in [None, 1]:
+                    base = self.start(make, base_records, devices, snapshots=256)
+                    self.assertTrue(len(base._snapshots) > 2)
+                    what = whatif.WhatIf(base)  # answers every question of the cases
+                    resumed = [self.check(make, base_records, changes, added, devices, what=what)
+                               for changes, added in cases]
+                    self.assertTrue(resumed[0] > 0)
+                    self.assertEqual(resumed[1], 0)
+                    self.assertEqual(resumed[3], 0)
+
+    def test_no_recording(self):
+        for name, make in ENGINES:
+            self.check(make, records(7), {3: {'arr_time': 400}}, [(1000, 9, 3, 2)], recording='none')
+
+    def test_no_changes(self):
+        base = FCFS(Workload.fromRecords(records(0)))
+        base.setSnapshots(256)
+        base.start()
+        self.assertTrue(whatif.WhatIf(base).run() is base)
+
+if __name__ == '__main__':
+    unittest.main()